@@ -0,0 +1,285 @@
+"""
+Async HTTP API for the Aviation Weather Agent
+
+One asyncio process serves many users: chat turns and report lookups are
+coroutines, not threads. Upstream calls share the async_http connection
+pool and one AsyncOpenAI client, and every request runs under a deadline
+that also bounds the upstream requests it makes.
+
+Endpoints:
+    POST /chat            {"message": "...", "session_id": "..."} -> {"session_id", "reply"}
+    GET  /metar/{icao}
+    GET  /taf/{icao}
+    GET  /notams/{icao}   ?keyword=RWY&hours=12
+    GET  /metrics
+
+Clients may shorten or extend the deadline with an X-Request-Timeout
+header (seconds, up to API_MAX_DEADLINE).
+
+Run with:
+    python app/api_server.py
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+import openai
+from aiohttp import web
+from dotenv import load_dotenv
+
+import async_http
+from circuit_breaker import STALE_PREFIX
+from config import (
+    DEFAULT_MODEL,
+    API_HOST,
+    API_PORT,
+    API_REQUEST_DEADLINE,
+    API_CHAT_DEADLINE,
+    API_MAX_DEADLINE,
+    API_MAX_SESSIONS,
+    API_SESSION_TTL,
+    BULK_INGEST_ENABLED,
+)
+from history import ConversationHistory
+from metar_fetcher import fetch_metar_async
+from metrics import LLM_SECONDS, record_usage, render_metrics, span, trace_turn, start_metrics_server
+from notam_fetcher import get_notams_async
+from prefetch import AsyncPrefetcher
+from refresher import start_refresher
+from taf_fetcher import get_taf_async
+from tool_executor import run_tool_calls_async
+from tool_registry import get_tool_schemas, dispatch_async
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SYSTEM_PROMPT = "You are a helpful aviation weather assistant. You can fetch METAR reports, TAF forecasts, NOTAMs, and interpret weather data to help pilots with flight planning and weather analysis."
+
+functions = get_tool_schemas()
+_client = None
+
+
+def get_client() -> openai.AsyncOpenAI:
+    """
+    Process-wide AsyncOpenAI client; its connection pool is shared by every session
+    """
+    global _client
+    if _client is None:
+        _client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+
+async def complete(**kwargs):
+    """
+    Create a chat completion, recording its latency and token usage
+    """
+    model = kwargs["model"]
+    with span("llm.completion", model=model):
+        with LLM_SECONDS.time(model=model):
+            response = await get_client().chat.completions.create(**kwargs)
+        record_usage(model, response.usage)
+    return response
+
+
+class SessionStore:
+    """
+    Conversation histories by session ID, dropped when idle or over capacity
+
+    Each session has a lock so two requests for one conversation run their
+    turns one after the other.
+    """
+
+    def __init__(self, max_sessions: int = API_MAX_SESSIONS, ttl: float = API_SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, dict] = OrderedDict()
+
+    def get(self, session_id: str = None) -> tuple[str, dict]:
+        now = time.monotonic()
+        # Oldest first; a session mid-turn is skipped so it cannot pin the rest
+        for oldest_id, oldest in list(self._sessions.items()):
+            if now - oldest["used_at"] < self.ttl and len(self._sessions) < self.max_sessions:
+                break
+            if not oldest["lock"].locked():
+                del self._sessions[oldest_id]
+
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session_id = session_id or uuid.uuid4().hex
+            session = self._sessions[session_id] = {
+                "history": ConversationHistory([{"role": "system", "content": SYSTEM_PROMPT}]),
+                "lock": asyncio.Lock(),
+                "used_at": now,
+            }
+        session["used_at"] = now
+        self._sessions.move_to_end(session_id)
+        return session_id, session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+sessions = SessionStore()
+
+
+async def run_turn(history: ConversationHistory, user_input: str) -> str:
+    """
+    Async counterpart of app.run_turn: completion, tool calls and follow-up
+    """
+    user_message = {"role": "user", "content": user_input}
+    history.append(user_message)
+
+    try:
+        with trace_turn():
+            prefetcher = AsyncPrefetcher(dispatch_async).start(user_input)
+            try:
+                response = await complete(
+                    model=DEFAULT_MODEL,
+                    messages=history.for_completion(),
+                    tools=functions,
+                    tool_choice="auto"
+                )
+
+                reply = response.choices[0].message
+
+                if reply.tool_calls:
+                    history.append({
+                        "role": "assistant",
+                        "content": reply.content or "",
+                        "tool_calls": [tc.model_dump() for tc in reply.tool_calls]
+                    })
+                    with span("tools", count=len(reply.tool_calls)):
+                        history.extend(await run_tool_calls_async(reply.tool_calls, prefetcher.dispatch))
+
+                    followup = await complete(
+                        model=DEFAULT_MODEL,
+                        messages=history.for_completion()
+                    )
+
+                    reply = followup.choices[0].message
+            finally:
+                prefetcher.close()
+    except BaseException:
+        # A failed or timed-out turn must not leave tool calls without results
+        history.discard_from(user_message)
+        raise
+
+    history.append({"role": "assistant", "content": reply.content or ""})
+    return reply.content
+
+
+# 🌐 Handlers
+
+def _report_response(icao: str, text: str) -> web.Response:
+    """
+    JSON for a fetcher result; ❌ results become error statuses
+    """
+    if text.startswith("❌ Invalid ICAO"):
+        return web.json_response({"error": text}, status=400)
+    if text.startswith("❌ Timeout"):
+        return web.json_response({"error": text}, status=504)
+    if text.startswith("❌"):
+        return web.json_response({"error": text}, status=502)
+    return web.json_response({"icao": icao.upper(), "report": text, "stale": text.startswith(STALE_PREFIX)})
+
+
+async def handle_metar(request: web.Request) -> web.Response:
+    icao = request.match_info["icao"]
+    return _report_response(icao, await fetch_metar_async(icao))
+
+
+async def handle_taf(request: web.Request) -> web.Response:
+    icao = request.match_info["icao"]
+    return _report_response(icao, await get_taf_async(icao))
+
+
+async def handle_notams(request: web.Request) -> web.Response:
+    icao = request.match_info["icao"]
+    keyword = request.query.get("keyword")
+    try:
+        hours = float(request.query["hours"]) if "hours" in request.query else None
+    except ValueError:
+        return web.json_response({"error": "❌ hours must be a number"}, status=400)
+    return _report_response(icao, await get_notams_async(icao, keyword.upper() if keyword else None, hours))
+
+
+async def handle_chat(request: web.Request) -> web.Response:
+    try:
+        body = await request.json()
+    except ValueError:
+        return web.json_response({"error": "❌ Request body must be JSON"}, status=400)
+    message = body.get("message") if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return web.json_response({"error": "❌ message is required"}, status=400)
+
+    session_id, session = sessions.get(body.get("session_id"))
+    async with session["lock"]:
+        try:
+            reply = await run_turn(session["history"], message)
+        except openai.OpenAIError as e:
+            logger.error(f"Chat turn failed for session {session_id}: {e}")
+            return web.json_response({"session_id": session_id, "error": f"❌ Model request failed: {e}"}, status=502)
+    return web.json_response({"session_id": session_id, "reply": reply})
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain")
+
+
+@web.middleware
+async def deadline_middleware(request: web.Request, handler):
+    """
+    Run each request under its deadline; upstream calls inherit it through async_http
+    """
+    seconds = API_CHAT_DEADLINE if request.path == "/chat" else API_REQUEST_DEADLINE
+    requested = request.headers.get("X-Request-Timeout")
+    if requested:
+        try:
+            seconds = min(max(float(requested), 0.1), API_MAX_DEADLINE)
+        except ValueError:
+            return web.json_response({"error": "❌ X-Request-Timeout must be a number of seconds"}, status=400)
+
+    with async_http.deadline(seconds):
+        try:
+            async with asyncio.timeout(seconds):
+                return await handler(request)
+        except TimeoutError:
+            return web.json_response({"error": f"⏱️ Request did not finish within {seconds:g}s"}, status=504)
+
+
+async def _on_startup(app: web.Application):
+    start_metrics_server()
+    start_refresher()
+    if BULK_INGEST_ENABLED:
+        from bulk_ingest import start_background_refresh
+        start_background_refresh()
+
+
+async def _on_cleanup(app: web.Application):
+    await async_http.close()
+    if _client is not None:
+        await _client.close()
+
+
+def create_app() -> web.Application:
+    app = web.Application(middlewares=[deadline_middleware])
+    app.add_routes([
+        web.post("/chat", handle_chat),
+        web.get("/metar/{icao}", handle_metar),
+        web.get("/taf/{icao}", handle_taf),
+        web.get("/notams/{icao}", handle_notams),
+        web.get("/metrics", handle_metrics),
+    ])
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"🛫 Aviation Weather Agent API on http://{API_HOST}:{API_PORT}")
+    web.run_app(create_app(), host=API_HOST, port=API_PORT, print=None)
@@ -131,122 +131,47 @@
 import os
 import openai
 from dotenv import load_dotenv
-from metar_fetcher import fetch_metar
-from metar_interpreter import interpret_metar
-from taf_fetcher import get_taf
-from taf_interpreter import interpret_taf
-from notam_fetcher import get_notams
-from web_search import search_web
+from config import BULK_INGEST_ENABLED
+from tool_registry import get_tool_schemas, dispatch
+from tool_executor import run_tool_calls
+from prefetch import Prefetcher
+from history import ConversationHistory
+from metrics import LLM_SECONDS, record_usage, span, trace_turn, start_metrics_server
 
 load_dotenv()
 
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-functions = [
-    {
-        "name": "fetch_metar",
-        "description": "Fetch the latest METAR report from an ICAO airport code.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "icao": {
-                    "type": "string",
-                    "description": "The ICAO code for the airport (e.g. KSEA, KSFO)"
-                }
-            },
-            "required": ["icao"]
-        }
-    },
-    {
-        "name": "get_taf",
-        "description": "Fetch the latest TAF forecast for an ICAO airport code.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "icao": {
-                    "type": "string",
-                    "description": "The ICAO code for the airport (e.g. KSEA, KSFO)"
-                }
-            },
-            "required": ["icao"]
-        }
-    },
-    {
-        "name": "interpret_metar",
-        "description": "Interpret a raw METAR weather report into human-friendly flight conditions.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "metar": {
-                    "type": "string",
-                    "description": "The raw METAR string to interpret."
-                }
-            },
-            "required": ["metar"]
-        }
-    },
-    {
-        "name": "interpret_taf",
-        "description": "Interpret a raw TAF forecast into human-friendly flight conditions.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "taf": {
-                    "type": "string",
-                    "description": "The raw TAF string to interpret."
-                }
-            },
-            "required": ["taf"]
-        }
-    },
-    {
-        "name": "get_notams",
-        "description": "Get NOTAMs for an ICAO airport code.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "icao": {
-                    "type": "string",
-                    "description": "The ICAO code for the airport (e.g. KSEA, KSFO)"
-                }
-            },
-            "required": ["icao"]
-        }
-    },
-    {
-        "name": "search_web",
-        "description": "Search the web for aviation information.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "query": {
-                    "type": "string",
-                    "description": "The search query."
-                }
-            },
-            "required": ["query"]
-        }
-    }
-]
-
-def chat():
-    messages = [
-        {"role": "system", "content": "You are a helpful aviation weather assistant. You can fetch METAR reports, TAF forecasts, NOTAMs, and interpret weather data to help pilots with flight planning and weather analysis."}
-    ]
-
-    print("🛫 Aviation Weather Agent — Ask me anything (type 'exit' or 'quit' to quit)")
-
-    while True:
+functions = get_tool_schemas()
+
+def complete(**kwargs):
+    """
+    Create a chat completion, recording its latency and token usage
+    """
+    model = kwargs["model"]
+    with span("llm.completion", model=model):
+        with LLM_SECONDS.time(model=model):
+            response = client.chat.completions.create(**kwargs)
+        record_usage(model, response.usage)
+    return response
+
+def run_turn(history, user_input):
+    """
+    Run one user turn: completion, tool calls and follow-up
+
+    Appends the user message, tool traffic and reply to history and
+    returns the reply text. History is compacted to its token budget
+    before each completion.
+    """
+    history.append({"role": "user", "content": user_input})
+
+    with trace_turn():
+        # Fetch weather for airports in the question while the model decides
+        prefetcher = Prefetcher(dispatch).start(user_input)
         try:
-            user_input = input("\n🧑 You: ")
-            if user_input.lower() in ["exit", "quit"]:
-                break
-
-            messages.append({"role": "user", "content": user_input})
-
-            response = client.chat.completions.create(
+            response = complete(
                 model="gpt-4o-mini",
-                messages=messages,
+                messages=history.for_completion(),
                 tools=functions,
                 tool_choice="auto"
             )
@@ -254,46 +179,41 @@ def chat():
             reply = response.choices[0].message
 
             if reply.tool_calls:
-                for tool_call in reply.tool_calls:
-                    func_name = tool_call.function.name
-                    args = tool_call.function.arguments
-
-                    try:
-                        from json import loads
-                        args = loads(args)
-                        
-                        if func_name == "fetch_metar":
-                            result = fetch_metar(**args)
-                        elif func_name == "get_taf":
-                            result = get_taf(**args)
-                        elif func_name == "interpret_metar":
-                            result = interpret_metar(**args)
-                        elif func_name == "interpret_taf":
-                            result = interpret_taf(**args)
-                        elif func_name == "get_notams":
-                            result = get_notams(**args)
-                        elif func_name == "search_web":
-                            result = search_web(**args)
-                        else:
-                            result = f"❌ Unknown tool: {func_name}"
-                    except Exception as e:
-                        result = f"❌ Error executing {func_name}: {str(e)}"
-
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": result
-                    })
-
-                followup = client.chat.completions.create(
+                history.append({
+                    "role": "assistant",
+                    "content": reply.content or "",
+                    "tool_calls": [tc.model_dump() for tc in reply.tool_calls]
+                })
+                with span("tools", count=len(reply.tool_calls)):
+                    history.extend(run_tool_calls(reply.tool_calls, prefetcher.dispatch))
+
+                followup = complete(
                     model="gpt-4o-mini",
-                    messages=messages
+                    messages=history.for_completion()
                 )
 
                 reply = followup.choices[0].message
+        finally:
+            prefetcher.close()
+
+    history.append({"role": "assistant", "content": reply.content or ""})
+    return reply.content
+
+def chat():
+    history = ConversationHistory([
+        {"role": "system", "content": "You are a helpful aviation weather assistant. You can fetch METAR reports, TAF forecasts, NOTAMs, and interpret weather data to help pilots with flight planning and weather analysis."}
+    ])
+
+    print("🛫 Aviation Weather Agent — Ask me anything (type 'exit' or 'quit' to quit)")
+
+    while True:
+        try:
+            user_input = input("\n🧑 You: ")
+            if user_input.lower() in ["exit", "quit"]:
+                break
 
-            print(f"\n🤖 AI: {reply.content}")
-            messages.append(reply)
+            reply = run_turn(history, user_input)
+            print(f"\n🤖 AI: {reply}")
             
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
@@ -304,6 +224,12 @@ def chat():
 
 if __name__ == "__main__":
     try:
+        start_metrics_server()
+        from refresher import start_refresher
+        start_refresher()
+        if BULK_INGEST_ENABLED:
+            from bulk_ingest import start_background_refresh
+            start_background_refresh()
         chat()
     except Exception as e:
         print(f"❌ Fatal error: {str(e)}")
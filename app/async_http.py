@@ -0,0 +1,194 @@
+"""
+Shared asyncio HTTP client for the API service
+
+The asyncio counterpart of http_client: one aiohttp session per process
+with a bounded keep-alive pool, the same per-service timeouts, retries,
+circuit breakers and metrics. Failures are raised as requests exceptions
+so the fetchers share their error handling and stale serving between the
+two clients.
+
+Each request is also bounded by the caller's deadline (see deadline()),
+so a slow upstream cannot hold an API request past its budget.
+"""
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import aiohttp
+import requests
+
+from config import USER_AGENT, HTTP_MAX_RETRIES, ASYNC_HTTP_MAX_CONNECTIONS, ASYNC_HTTP_MAX_PER_HOST
+from circuit_breaker import CircuitOpenError
+from http_client import SERVICE_TIMEOUTS, DEFAULT_TIMEOUT, IDEMPOTENT_METHODS, RETRY_STATUS_CODES, breaker, backoff_delay
+from metrics import HTTP_SECONDS, HTTP_RESPONSES, HTTP_RETRIES, span
+
+_session: Optional[aiohttp.ClientSession] = None
+
+# Event loop time by which the current API request must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Return the process-wide session, creating it on first use inside the running loop
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=ASYNC_HTTP_MAX_CONNECTIONS,
+            limit_per_host=ASYNC_HTTP_MAX_PER_HOST,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+    return _session
+
+
+async def close():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Bound every request made in this context to finish within seconds
+    """
+    token = _deadline.set(asyncio.get_running_loop().time() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the current deadline, or None without one
+    """
+    deadline_at = _deadline.get()
+    return None if deadline_at is None else deadline_at - asyncio.get_running_loop().time()
+
+
+class Response:
+    """
+    Fully read response with the parts of requests.Response the fetchers use
+    """
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes, encoding: Optional[str]):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            error = requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}")
+            # Fetchers read e.response.status_code
+            error.response = self
+            raise error
+
+
+def _as_requests_error(error: Exception) -> requests.exceptions.RequestException:
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ServerTimeoutError)):
+        return requests.exceptions.Timeout(str(error) or "Request timed out")
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return requests.exceptions.ConnectionError(str(error))
+    return requests.exceptions.RequestException(str(error))
+
+
+async def request(method: str, url: str, service: str, retries: int = None,
+                  timeout: Optional[float] = None, **kwargs) -> Response:
+    """
+    Send a request through the shared session
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        service: Service name used to pick the timeout (see http_client.SERVICE_TIMEOUTS)
+        retries: Number of retries; defaults to HTTP_MAX_RETRIES for
+            idempotent methods and 0 otherwise
+        timeout: Per-attempt timeout; defaults to the service timeout
+        **kwargs: Passed through to aiohttp.ClientSession.request
+
+    Returns:
+        The final response, read into memory
+
+    Raises:
+        circuit_breaker.CircuitOpenError: If the service's circuit is open
+        requests.exceptions.Timeout: If the deadline passes first
+        requests.exceptions.RequestException: If the request cannot be completed
+    """
+    method = method.upper()
+    timeout = timeout if timeout is not None else SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUT)
+    if retries is None:
+        retries = HTTP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+    session = get_session()
+    circuit = breaker(service)
+    attempt = 0
+    started = time.perf_counter()
+    with span(f"http.{service}", method=method) as trace_span:
+        while True:
+            left = remaining()
+            if left is not None and left <= 0:
+                HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                raise requests.exceptions.Timeout(f"Deadline passed before {service} request")
+            try:
+                probe = circuit.before_request()
+            except CircuitOpenError:
+                HTTP_RESPONSES.inc(service=service, status="circuit_open")
+                HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                raise
+            attempt_timeout = timeout if left is None else min(timeout, left)
+            attempt_started = time.perf_counter()
+            try:
+                async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=attempt_timeout),
+                                           **kwargs) as raw:
+                    response = Response(str(raw.url), raw.status, raw.headers, await raw.read(), raw.charset)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = _as_requests_error(e)
+                if isinstance(error, requests.exceptions.Timeout) and attempt_timeout < timeout:
+                    # The caller's deadline ran out, not the service's own timeout
+                    circuit.release(probe)
+                    HTTP_RESPONSES.inc(service=service, status="deadline")
+                    HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                    raise error from e
+                circuit.record(False)
+                HTTP_RESPONSES.inc(service=service, status=type(error).__name__)
+                if not isinstance(error, requests.exceptions.ConnectionError) or attempt >= retries:
+                    HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                    raise error from e
+            except BaseException:
+                # Cancelled by a tool timeout or the request deadline; that says
+                # nothing about the upstream, but a probe must not stay in flight
+                circuit.release(probe)
+                HTTP_RESPONSES.inc(service=service, status="cancelled")
+                raise
+            else:
+                circuit.record(response.status_code not in RETRY_STATUS_CODES, time.perf_counter() - attempt_started)
+                HTTP_RESPONSES.inc(service=service, status=str(response.status_code))
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                    if trace_span is not None:
+                        trace_span["attrs"].update(status=response.status_code, attempts=attempt + 1)
+                    return response
+
+            HTTP_RETRIES.inc(service=service)
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+
+async def get(url: str, service: str, **kwargs) -> Response:
+    return await request("GET", url, service, **kwargs)
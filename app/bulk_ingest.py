@@ -0,0 +1,290 @@
+"""
+Bulk METAR/TAF ingest from aviationweather.gov cache files
+
+The cache files (metars.cache.csv.gz, tafs.cache.xml.gz) hold the latest
+report for every reporting station. They are streamed, decompressed and
+parsed incrementally, so a full pull never holds the whole file in memory.
+"""
+import csv
+import gzip
+import io
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import http_client
+from config import BULK_INGEST_ENABLED, BULK_METAR_URL, BULK_TAF_URL, BULK_REFRESH_INTERVAL
+from obs_timeseries import obs_series
+from report_cache import parse_report_time, metar_expiry, taf_expiry
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+CHUNK_SIZE = 64 * 1024
+
+# CSV columns kept from the METAR cache file
+METAR_COLUMNS = ("raw_text", "station_id", "observation_time", "latitude", "longitude", "flight_category")
+
+
+class BulkReportStore:
+    """
+    Latest bulk-ingested report per (product, icao)
+    """
+
+    def __init__(self):
+        self._reports = {}
+        self._lock = threading.Lock()
+        self.last_refresh = {}
+
+    def put(self, product: str, icao: str, raw: str, observed, expires_at: float, **fields):
+        record = {"raw": raw, "observed": observed, "expires_at": expires_at, **fields}
+        with self._lock:
+            current = self._reports.get((product, icao))
+            # Never replace a newer report with an older one from a lagging file
+            if current and current["observed"] and observed and current["observed"] > observed:
+                return
+            self._reports[(product, icao)] = record
+
+    def get_record(self, product: str, icao: str) -> Optional[dict]:
+        """
+        Return the stored record if it has not expired
+        """
+        with self._lock:
+            record = self._reports.get((product, icao))
+        if record is None or record["expires_at"] <= time.time():
+            return None
+        return record
+
+    def get(self, product: str, icao: str) -> Optional[str]:
+        record = self.get_record(product, icao)
+        return record["raw"] if record else None
+
+    def records(self, product: str) -> list[tuple[str, dict]]:
+        """
+        Snapshot of all (icao, record) pairs for a product, expired or not
+        """
+        with self._lock:
+            return [(icao, record) for (kind, icao), record in self._reports.items() if kind == product]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._reports)
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    Raw binary stream over an iterator of byte chunks
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b""
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+@contextmanager
+def _open_source(source: str):
+    """
+    Open a local path or http(s) URL as a binary stream
+    """
+    if source.startswith(("http://", "https://")):
+        response = http_client.get(source, "bulk", stream=True)
+        try:
+            response.raise_for_status()
+            yield io.BufferedReader(_ChunkStream(response.iter_content(CHUNK_SIZE)))
+        finally:
+            response.close()
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+def _decompressed(stream) -> io.BufferedReader:
+    """
+    Wrap a binary stream, decompressing it on the fly if it is gzipped
+
+    Servers sometimes apply Content-Encoding to .gz files, in which case the
+    HTTP layer has already decompressed it; checking the magic bytes handles
+    both cases.
+    """
+    buffered = stream if hasattr(stream, "peek") else io.BufferedReader(stream)
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        return io.BufferedReader(gzip.GzipFile(fileobj=buffered))
+    return buffered
+
+
+def iter_metar_rows(stream) -> Iterator[dict]:
+    """
+    Yield one dict per METAR from a metars.cache.csv stream
+
+    Older cache files start with a few status lines before the header, so
+    everything up to the raw_text header row is skipped.
+    """
+    text = io.TextIOWrapper(_decompressed(stream), encoding="utf-8", errors="replace", newline="")
+    header = None
+    for line in text:
+        if line.startswith("raw_text"):
+            header = next(csv.reader([line]))
+            break
+    if header is None:
+        return
+
+    # Duplicate column names (sky_cover, cloud_base_ft_agl) exist, so look
+    # up each wanted column by its first position.
+    positions = {name: header.index(name) for name in METAR_COLUMNS if name in header}
+    for row in csv.reader(text):
+        if not row:
+            continue
+        yield {name: row[index] if index < len(row) else "" for name, index in positions.items()}
+
+
+def iter_taf_rows(stream) -> Iterator[dict]:
+    """
+    Yield one dict per TAF from a tafs.cache.xml stream
+    """
+    open_elements = []
+    for event, elem in ET.iterparse(_decompressed(stream), events=("start", "end")):
+        if event == "start":
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        if elem.tag == "TAF":
+            yield {
+                "raw_text": (elem.findtext("raw_text") or "").strip(),
+                "station_id": elem.findtext("station_id") or "",
+                "issue_time": elem.findtext("issue_time") or "",
+                "latitude": elem.findtext("latitude") or "",
+                "longitude": elem.findtext("longitude") or "",
+            }
+            # Drop parsed elements so memory stays flat across the file
+            elem.clear()
+            if open_elements:
+                open_elements[-1].remove(elem)
+
+
+def _float_or_none(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def ingest_metars(source: str = BULK_METAR_URL, store: "BulkReportStore" = None) -> int:
+    """
+    Stream a METAR cache file into the store
+
+    Args:
+        source: URL or local path of a metars.cache.csv(.gz) file
+        store: Target store; defaults to the shared bulk_store
+
+    Returns:
+        Number of METARs ingested
+    """
+    store = bulk_store if store is None else store
+    count = 0
+    with _open_source(source) as stream:
+        for row in iter_metar_rows(stream):
+            icao = row.get("station_id", "").strip().upper()
+            raw = row.get("raw_text", "").strip()
+            if not icao or not raw:
+                continue
+            observed = parse_report_time(row.get("observation_time"))
+            store.put(
+                "metar", icao, raw, observed, metar_expiry(observed),
+                latitude=_float_or_none(row.get("latitude")),
+                longitude=_float_or_none(row.get("longitude")),
+                flight_category=row.get("flight_category") or None,
+            )
+            if store is bulk_store and observed is not None:
+                obs_series.record(icao, raw, observed.timestamp())
+            count += 1
+    store.last_refresh["metar"] = time.time()
+    return count
+
+
+def ingest_tafs(source: str = BULK_TAF_URL, store: "BulkReportStore" = None) -> int:
+    """
+    Stream a TAF cache file into the store
+
+    Args:
+        source: URL or local path of a tafs.cache.xml(.gz) file
+        store: Target store; defaults to the shared bulk_store
+
+    Returns:
+        Number of TAFs ingested
+    """
+    store = bulk_store if store is None else store
+    count = 0
+    with _open_source(source) as stream:
+        for row in iter_taf_rows(stream):
+            icao = row["station_id"].strip().upper()
+            if not icao or not row["raw_text"]:
+                continue
+            issued = parse_report_time(row["issue_time"])
+            store.put(
+                "taf", icao, row["raw_text"], issued, taf_expiry(issued),
+                latitude=_float_or_none(row["latitude"]),
+                longitude=_float_or_none(row["longitude"]),
+            )
+            count += 1
+    store.last_refresh["taf"] = time.time()
+    return count
+
+
+def refresh_all():
+    """
+    Pull both bulk files once, logging rather than raising on failure
+    """
+    for product, ingest in (("metar", ingest_metars), ("taf", ingest_tafs)):
+        started = time.monotonic()
+        try:
+            count = ingest()
+            logger.info(f"Bulk {product} ingest: {count} reports in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Bulk {product} ingest failed: {e}")
+
+
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+
+
+def start_background_refresh(interval: float = BULK_REFRESH_INTERVAL) -> bool:
+    """
+    Start the periodic bulk refresh thread if enabled and not already running
+
+    Returns:
+        True if the refresher is running
+    """
+    global _refresh_thread
+    if not BULK_INGEST_ENABLED:
+        return False
+    with _refresh_lock:
+        if _refresh_thread is None:
+            def loop():
+                while True:
+                    refresh_all()
+                    time.sleep(interval)
+
+            _refresh_thread = threading.Thread(target=loop, name="bulk-ingest", daemon=True)
+            _refresh_thread.start()
+    return True
+
+
+# Shared store read by fetch_metar and get_taf before going to the network
+bulk_store = BulkReportStore()
@@ -0,0 +1,236 @@
+"""
+Flight category map over every station with a current observation
+
+The newest ceiling and visibility of each station in the observation
+series are gathered into columns next to the station coordinates, and
+VFR/MVFR/IFR/LIFR is computed for all of them with NumPy in one pass.
+The columns are rebuilt only when new observations arrive, so a
+diversion query is a vectorized distance filter plus a sort. Without
+bulk ingest the map only holds stations already fetched, so a query
+first fetches METARs for the nearest known stations it has no current
+observation for.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+
+import numpy as np
+
+import metrics
+from config import (
+    ALTERNATE_RADIUS_NM,
+    ALTERNATE_MAX_RADIUS_NM,
+    ALTERNATE_MAX_RESULTS,
+    ALTERNATE_MAX_OBS_AGE,
+    ALTERNATE_FETCH_MAX_STATIONS,
+    ALTERNATE_FETCH_WORKERS,
+    ALTERNATE_FETCH_DEADLINE,
+    METAR_CACHE_DEFAULT_TTL,
+)
+from bulk_ingest import bulk_store
+from obs_timeseries import obs_series, FIELDS, NO_CEILING_FT
+from stations import station_db, lookup_station
+from utils import validate_icao, EARTH_RADIUS_NM
+
+# Category codes; higher is better so VFR sorts last in comparisons
+CATEGORIES = ("LIFR", "IFR", "MVFR", "VFR")
+UNKNOWN, LIFR, IFR, MVFR, VFR = -1, 0, 1, 2, 3
+
+_CEILING = FIELDS.index("ceiling_ft")
+_VISIBILITY = FIELDS.index("visibility_sm")
+
+
+def flight_categories(ceiling_ft: np.ndarray, visibility_sm: np.ndarray) -> np.ndarray:
+    """
+    Category code per station, matching metar_interpreter.flight_category
+
+    NaN is treated as unrestricted; UNKNOWN where both values are missing.
+    """
+    ceiling = np.nan_to_num(ceiling_ft, nan=np.inf)
+    visibility = np.nan_to_num(visibility_sm, nan=np.inf)
+    codes = np.full(ceiling.shape, VFR, dtype=np.int8)
+    codes[(ceiling <= 3000) | (visibility <= 5)] = MVFR
+    codes[(ceiling < 1000) | (visibility < 3)] = IFR
+    codes[(ceiling < 500) | (visibility < 1)] = LIFR
+    codes[np.isnan(ceiling_ft) & np.isnan(visibility_sm)] = UNKNOWN
+    return codes
+
+
+def distances_nm(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance from one point to many (vectorized haversine_nm)
+    """
+    phi1, phi2 = np.radians(latitude), np.radians(latitudes)
+    dphi = phi2 - phi1
+    dlambda = np.radians(longitudes - longitude)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class CategoryMap:
+    """
+    Column snapshot of the latest observation per station, rebuilt when the
+    observation series changes
+    """
+
+    def __init__(self):
+        self._version = None
+        self._columns = None
+        self._lock = threading.Lock()
+
+    def _coordinates(self, icaos: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        # Bulk METAR rows carry positions for every reporting station; the
+        # bundled station table covers the rest
+        positions = {
+            icao: (record.get("latitude"), record.get("longitude"))
+            for icao, record in bulk_store.records("metar")
+        }
+        latitudes = np.full(len(icaos), np.nan)
+        longitudes = np.full(len(icaos), np.nan)
+        for index, icao in enumerate(icaos):
+            latitude, longitude = positions.get(icao, (None, None))
+            if latitude is None or longitude is None:
+                station = station_db.get(icao)
+                if station is None:
+                    continue
+                latitude, longitude = station["latitude"], station["longitude"]
+            latitudes[index], longitudes[index] = latitude, longitude
+        return latitudes, longitudes
+
+    def columns(self) -> dict:
+        """
+        icao, latitude, longitude, observed, ceiling, visibility and category
+        arrays for every station with a known position and category
+        """
+        with self._lock:
+            if self._columns is None or self._version != obs_series.version:
+                version = obs_series.version
+                icaos, times, values = obs_series.latest()
+                latitudes, longitudes = self._coordinates(icaos)
+                ceiling, visibility = values[:, _CEILING], values[:, _VISIBILITY]
+                categories = flight_categories(ceiling, visibility)
+                keep = ~np.isnan(latitudes) & (categories != UNKNOWN)
+                self._columns = {
+                    "icao": np.array(icaos, dtype=object)[keep],
+                    "latitude": latitudes[keep],
+                    "longitude": longitudes[keep],
+                    "observed": times[keep],
+                    "ceiling_ft": ceiling[keep],
+                    "visibility_sm": visibility[keep],
+                    "category": categories[keep],
+                }
+                self._version = version
+            return self._columns
+
+    def nearby(self, latitude: float, longitude: float, radius_nm: float,
+               max_age: float = ALTERNATE_MAX_OBS_AGE, exclude: tuple = ()) -> dict:
+        """
+        Columns for stations within radius_nm with a recent observation,
+        nearest first, plus a "distance_nm" column
+        """
+        columns = self.columns()
+        distance = distances_nm(latitude, longitude, columns["latitude"], columns["longitude"])
+        mask = (distance <= radius_nm) & (columns["observed"] >= time.time() - max_age)
+        if exclude:
+            mask &= ~np.isin(columns["icao"], list(exclude))
+        indices = np.flatnonzero(mask)
+        indices = indices[np.argsort(distance[indices], kind="stable")]
+        selected = {name: column[indices] for name, column in columns.items()}
+        selected["distance_nm"] = distance[indices]
+        return selected
+
+
+# Separate from the tool executor so a query never waits on its own pool
+_executor = ThreadPoolExecutor(max_workers=ALTERNATE_FETCH_WORKERS, thread_name_prefix="alternates")
+_attempted: dict[str, float] = {}  # ICAO -> monotonic time of the last fetch from here
+
+
+def _position(icao: str) -> Optional[tuple[float, float]]:
+    record = bulk_store.get_record("metar", icao)
+    if record and record.get("latitude") is not None and record.get("longitude") is not None:
+        return record["latitude"], record["longitude"]
+    station = lookup_station(icao)
+    if station is not None:
+        return station["latitude"], station["longitude"]
+    return None
+
+
+def _fetch_missing(latitude: float, longitude: float, radius_nm: float, reporting, exclude: tuple = ()) -> int:
+    """
+    Fetch METARs for the nearest known stations within radius_nm that have
+    no current observation on the map; fetch_metar adds them to obs_series
+
+    Returns:
+        Number of stations fetched
+    """
+    from tool_registry import dispatch
+
+    now = time.monotonic()
+    skip = set(reporting) | set(exclude)
+    missing = [
+        station["icao"]
+        for station in station_db.within(latitude, longitude, radius_nm)
+        # Stations that had no METAR a moment ago are not asked again each query
+        if station["icao"] not in skip and now - _attempted.get(station["icao"], -np.inf) >= METAR_CACHE_DEFAULT_TTL
+    ][:ALTERNATE_FETCH_MAX_STATIONS]
+    if missing:
+        _attempted.update((code, now) for code in missing)
+        futures = [metrics.submit(_executor, "alternates", dispatch, "fetch_metar", {"icao": code}) for code in missing]
+        # Slow stations are left out rather than holding up the answer
+        wait(futures, timeout=ALTERNATE_FETCH_DEADLINE)
+    return len(missing)
+
+
+def _format_station(columns: dict, index: int) -> str:
+    ceiling = columns["ceiling_ft"][index]
+    visibility = columns["visibility_sm"][index]
+    ceiling_text = "none" if np.isnan(ceiling) or ceiling >= NO_CEILING_FT else f"{ceiling:.0f} ft"
+    visibility_text = "?" if np.isnan(visibility) else f"{visibility:g} SM"
+    observed = time.strftime("%H%MZ", time.gmtime(columns["observed"][index]))
+    name = station_db.get(columns["icao"][index])
+    label = f"{columns['icao'][index]} {name['name']}" if name and name.get("name") else columns["icao"][index]
+    return (
+        f"{label}: {columns['distance_nm'][index]:.0f} nm, {CATEGORIES[columns['category'][index]]}, "
+        f"ceiling {ceiling_text}, visibility {visibility_text} (obs {observed})"
+    )
+
+
+def find_vfr_alternates(icao: str, radius_nm: Optional[float] = None, limit: Optional[int] = None) -> str:
+    """
+    Nearest stations currently reporting VFR within radius_nm of an airport
+    """
+    valid, result = validate_icao(icao)
+    if not valid:
+        return result
+    icao = result
+    position = _position(icao)
+    if position is None:
+        return f"❌ Unknown position for {icao}. It is not in the station database or bulk METAR data."
+    radius = max(1.0, min(radius_nm if radius_nm is not None else ALTERNATE_RADIUS_NM, ALTERNATE_MAX_RADIUS_NM))
+    limit = max(1, min(int(limit) if limit is not None else ALTERNATE_MAX_RESULTS, 20))
+
+    columns = category_map.nearby(*position, radius, exclude=(icao,))
+    if _fetch_missing(*position, radius, columns["icao"], exclude=(icao,)):
+        columns = category_map.nearby(*position, radius, exclude=(icao,))
+    reporting = len(columns["icao"])
+    if not reporting:
+        return f"⚠️ No current observations within {radius:g} nm of {icao}."
+
+    counts = np.bincount(columns["category"], minlength=len(CATEGORIES))
+    summary = ", ".join(f"{counts[code]} {name}" for code, name in reversed(list(enumerate(CATEGORIES))))
+    vfr = np.flatnonzero(columns["category"] == VFR)[:limit]
+    if vfr.size:
+        lines = [f"🛬 Nearest VFR alternates within {radius:g} nm of {icao} ({reporting} stations reporting: {summary}):"]
+        lines += [f"{rank}. {_format_station(columns, index)}" for rank, index in enumerate(vfr, 1)]
+        return "\n".join(lines)
+
+    # No VFR anywhere nearby: show the best conditions available instead
+    best = np.lexsort((columns["distance_nm"], -columns["category"]))[:limit]
+    lines = [f"⚠️ No VFR stations within {radius:g} nm of {icao} ({reporting} stations reporting: {summary}). Best available:"]
+    lines += [f"{rank}. {_format_station(columns, index)}" for rank, index in enumerate(best, 1)]
+    return "\n".join(lines)
+
+
+# Shared snapshot over obs_series
+category_map = CategoryMap()
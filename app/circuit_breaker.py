@@ -0,0 +1,230 @@
+"""
+Per-upstream circuit breakers and stale-result serving for the Aviation Weather Agent
+
+A service's circuit opens after CIRCUIT_FAILURE_THRESHOLD consecutive
+failed or slow calls. While open, requests fail immediately with
+CircuitOpenError instead of waiting out the timeout; after
+CIRCUIT_OPEN_SECONDS a single probe is let through (half-open) and its
+outcome closes or re-opens the circuit; a probe whose outcome is not
+recorded within the service timeout counts as failed. Fetchers answer upstream failures
+with their last good result, marked stale, and refresh it in the background.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import requests
+
+from config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_SLOW_CALL_FRACTION,
+    CIRCUIT_OPEN_SECONDS,
+    STALE_REFRESH_WORKERS,
+)
+from metrics import counter
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STALE_PREFIX = "⚠️ STALE"
+
+CIRCUIT_TRANSITIONS = counter("awa_circuit_transitions_total", "Circuit state changes by service and new state")
+STALE_SERVED = counter("awa_stale_served_total", "Stale results served during upstream failures, by product")
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of sending a request while a service's circuit is open
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, service: str, slow_call_seconds: float, probe_timeout: float,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, open_seconds: float = CIRCUIT_OPEN_SECONDS):
+        self.service = service
+        self.slow_call_seconds = slow_call_seconds
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit for {self.service}: {self.state} → {state}")
+            CIRCUIT_TRANSITIONS.inc(service=self.service, state=state)
+            self.state = state
+
+    def retry_in(self) -> float:
+        """
+        Seconds until the next probe is allowed; 0 when requests may be sent
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def before_request(self) -> bool:
+        """
+        Admit a request or raise CircuitOpenError
+
+        Returns:
+            True if the request is the half-open probe; pass it to release()
+            if the request ends without an outcome
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            now = time.monotonic()
+            if self._probing and now - self._probe_started > self.probe_timeout:
+                # The probe's caller never reported back (e.g. it was cancelled)
+                logger.warning(f"Circuit probe for {self.service} expired; treating it as failed")
+                self._probing = False
+                self.opened_at = now
+                self._set_state(OPEN)
+            if self.state == OPEN and self.retry_in() == 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self._probe_started = now
+                return True
+            wait = self.retry_in()
+        raise CircuitOpenError(
+            f"{self.service} is failing; requests suspended"
+            + (f" for {wait:.0f}s" if wait else " while a probe is in flight")
+        )
+
+    def release(self, probe: bool):
+        """
+        End an admitted request that has no outcome (e.g. it was cancelled),
+        letting the next request probe in its place
+        """
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def record(self, ok: bool, seconds: float = 0.0):
+        """
+        Record the outcome of an admitted request; slow calls count as failures
+        """
+        failed = not ok or seconds > self.slow_call_seconds
+        with self._lock:
+            self._probing = False
+            if not failed:
+                self.failures = 0
+                self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(service: str, timeout: float) -> CircuitBreaker:
+    """
+    The breaker for service, created on first use
+
+    Args:
+        timeout: The service's default timeout; calls slower than
+            CIRCUIT_SLOW_CALL_FRACTION of it count as failures, and a
+            half-open probe unanswered after it counts as failed
+    """
+    breaker = _breakers.get(service)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(service, CircuitBreaker(service, timeout * CIRCUIT_SLOW_CALL_FRACTION, timeout))
+    return breaker
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """
+    True for errors that mean the upstream is unhealthy, as opposed to a bad
+    request (404, 401) that a stale result would only hide
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status == 429 or status >= 500
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, CircuitOpenError))
+
+
+def format_age(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "under a minute"
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes // 60} h {minutes % 60:02d} min"
+
+
+def serve_stale(product: str, error: Exception, last_good: Optional[tuple], refresh_key,
+                refresh: Callable[[], object], breaker: Optional[CircuitBreaker] = None) -> Optional[str]:
+    """
+    Answer an upstream failure with the last good result and refresh it in the background
+
+    Args:
+        product: Label shown to the user (e.g. "METAR")
+        error: The exception the live fetch raised
+        last_good: (text, age in seconds), or None if nothing usable is kept
+        refresh_key, refresh, breaker: See refresh_in_background
+
+    Returns:
+        The text behind a STALE banner line, or None if the error is not an
+        upstream failure or there is nothing to serve
+    """
+    if last_good is None or not is_upstream_failure(error):
+        return None
+    text, age = last_good
+    refresh_in_background(refresh_key, refresh, breaker)
+    STALE_SERVED.inc(product=product)
+    reason = "suspended" if isinstance(error, CircuitOpenError) else "failing"
+    return f"{STALE_PREFIX}: live {product} source {reason}; last good data from {format_age(age)} ago:\n{text}"
+
+
+def split_stale(text: str) -> tuple[str, Optional[str]]:
+    """
+    Return (original text, banner) for a stale result, or (text, None)
+    """
+    if text.startswith(STALE_PREFIX):
+        banner, _, body = text.partition("\n")
+        return body, banner
+    return text, None
+
+
+_refresh_executor = ThreadPoolExecutor(max_workers=STALE_REFRESH_WORKERS, thread_name_prefix="stale-refresh")
+_refreshing: set = set()
+_refreshing_lock = threading.Lock()
+
+
+def refresh_in_background(key, refresh: Callable[[], object], breaker: Optional[CircuitBreaker] = None):
+    """
+    Run refresh once the breaker admits requests again, at most once per key at a time
+
+    A failing refresh is not rescheduled; the next request for the same data
+    schedules another.
+    """
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            if breaker is not None:
+                time.sleep(breaker.retry_in())
+            refresh()
+        except Exception as e:
+            logger.info(f"Background refresh of {key} failed: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _refresh_executor.submit(run)
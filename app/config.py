@@ -15,20 +15,156 @@ AVWX_API_KEY = os.getenv("AVWX_API_KEY")
 DEFAULT_MODEL = "gpt-4o-mini"
 FALLBACK_MODEL = "gpt-3.5-turbo-1106"
 
+# Tool Execution
+TOOL_MAX_WORKERS = 8  # Concurrent tool calls across all sessions
+
+# Speculative Prefetch
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_TOOLS = ("fetch_metar", "get_taf", "get_notams")
+PREFETCH_MAX_STATIONS = 4  # Airports prefetched per user message
+PREFETCH_MAX_WORKERS = 6
+
+# Conversation History
+HISTORY_TOKEN_BUDGET = 12000  # Approximate prompt tokens kept per completion
+HISTORY_COMPACT_TARGET = 0.75  # Compact down to this fraction of the budget
+HISTORY_KEEP_RECENT_TURNS = 2  # Most recent user turns are never compacted
+HISTORY_STUB_CHARS = 160  # Characters kept from a compacted tool result
+HISTORY_RENDER_WINDOW = 30  # Chat messages drawn per page in the Streamlit UI
+
 # Request Timeouts (seconds)
 METAR_TIMEOUT = 10
 TAF_TIMEOUT = 10
 NOTAM_TIMEOUT = 15
 WEB_SEARCH_TIMEOUT = 10
+BULK_TIMEOUT = 60
 
 # User Agent
 USER_AGENT = "AviationWeatherAgent/1.0"
 
+# HTTP Client Configuration
+HTTP_POOL_CONNECTIONS = 10  # Number of hosts to keep connection pools for
+HTTP_POOL_MAXSIZE = 20  # Keep-alive connections per host
+HTTP_MAX_RETRIES = 2  # Retries for idempotent requests
+HTTP_BACKOFF_BASE = 0.3  # Seconds, doubled on each retry
+HTTP_BACKOFF_MAX = 4.0
+ASYNC_HTTP_MAX_CONNECTIONS = 200  # Total connections in the API service's asyncio pool
+ASYNC_HTTP_MAX_PER_HOST = 50  # Sessions share it, so this is higher than HTTP_POOL_MAXSIZE
+
+# Async API Service (app/api_server.py)
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+API_REQUEST_DEADLINE = 20  # Seconds for /metar, /taf and /notams requests
+API_CHAT_DEADLINE = 60  # Seconds for a whole /chat turn
+API_MAX_DEADLINE = 120  # Upper bound for a client's X-Request-Timeout header
+API_MAX_SESSIONS = 1000  # Chat histories kept; least recently used are dropped
+API_SESSION_TTL = 3600  # Seconds an idle chat session is kept
+
 # NOTAM Configuration
-MAX_NOTAMS_DISPLAY = 5
+MAX_NOTAMS_DISPLAY = 10  # After relevance sorting
+NOTAM_DEFAULT_WINDOW_HOURS = 24  # Window used when the caller gives no hours
+NOTAM_SYNC_MIN_INTERVAL = 120  # Seconds before re-checking PilotWeb for an airport
+NOTAM_CHANGE_RETENTION = 86400  # Seconds cancelled NOTAMs are remembered for diffs
+NOTAM_UPDATES_DEFAULT_MINUTES = 30
 
 # TAF Configuration
 NEARBY_AIRPORT_RADIUS = 10  # Number of nearby airports to check
+TAF_NEARBY_SEARCH_DEADLINE = 12  # Seconds for the whole nearby-airport fallback
+
+# Station Database
+STATION_DB_PATH = os.getenv(
+    "STATION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "stations.csv")
+)
+STATION_INDEX_CELL_DEGREES = 1.0  # Grid cell size of the spatial index
+STATION_LOOKUP_TIMEOUT = 5  # AVWX station API, for airports missing from the table
+STATION_LOOKUP_MISS_TTL = 3600  # Seconds an unknown ICAO is not looked up again
+
+# Route Briefing
+ROUTE_DEFAULT_CORRIDOR_NM = 25  # Half-width of the corridor either side of the track
+ROUTE_MAX_CORRIDOR_NM = 100
+ROUTE_MAX_STATIONS = 10  # Including departure and destination
+ROUTE_MAX_WORKERS = 8
+ROUTE_FETCH_DEADLINE = 20  # Seconds to wait for all corridor reports
+ROUTE_TAF_HOURS = 6  # Hours of endpoint TAF summarized from now
+ROUTE_NOTAM_HOURS = 6
+
+# Bulk Ingest Configuration (aviationweather.gov cache files)
+BULK_INGEST_ENABLED = os.getenv("BULK_INGEST_ENABLED", "false").lower() in ("1", "true", "yes")
+BULK_METAR_URL = os.getenv("BULK_METAR_URL", "https://aviationweather.gov/data/cache/metars.cache.csv.gz")
+BULK_TAF_URL = os.getenv("BULK_TAF_URL", "https://aviationweather.gov/data/cache/tafs.cache.xml.gz")
+BULK_REFRESH_INTERVAL = 300  # Seconds between bulk pulls
+
+# Persistent Report Store (SQLite, shared by every process on the host)
+REPORT_STORE_ENABLED = os.getenv("REPORT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+REPORT_STORE_PATH = os.getenv(
+    "REPORT_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reports.db")
+)
+REPORT_STORE_RETENTION_HOURS = 72  # Rolling history kept for trend questions
+REPORT_STORE_BATCH_SIZE = 200  # Rows per write transaction
+REPORT_STORE_FLUSH_INTERVAL = 0.5  # Seconds a write waits for more rows to batch with
+REPORT_STORE_FLUSH_TIMEOUT = 5.0  # Longest flush() waits for queued writes, e.g. at exit
+REPORT_HISTORY_DEFAULT_HOURS = 12
+
+# Observation Time Series (decoded METAR fields per station, in memory)
+OBS_SERIES_CAPACITY = 128  # Observations per station; ~48 h of routine METARs plus SPECIs
+OBS_SERIES_MAX_STATIONS = 5000  # ~5 KB each; least recently updated stations are dropped beyond this
+OBS_TREND_DEFAULT_HOURS = 6
+OBS_TREND_MAX_HOURS = 48
+
+# Flight Category Map (VFR alternates from the latest observation of every station)
+ALTERNATE_RADIUS_NM = 150
+ALTERNATE_MAX_RADIUS_NM = 500
+ALTERNATE_MAX_RESULTS = 5
+ALTERNATE_MAX_OBS_AGE = 7200  # Observations older than this (seconds) are left off the map
+ALTERNATE_FETCH_MAX_STATIONS = 20  # Nearest stations without a current observation fetched per query
+ALTERNATE_FETCH_WORKERS = 8
+ALTERNATE_FETCH_DEADLINE = 15  # Seconds to wait for those METARs
+
+# Report Cache Configuration
+REPORT_CACHE_MAX_ENTRIES = 512
+METAR_ISSUE_MINUTE = 50  # Routine METARs are issued between :50 and :59
+METAR_CACHE_DEFAULT_TTL = 300  # Used when the observation time is unknown
+METAR_CACHE_MIN_TTL = 60  # Floor so a late METAR does not trigger a refetch storm
+METAR_CACHE_MAX_TTL = 3600
+TAF_ISSUE_INTERVAL_HOURS = 6
+TAF_CACHE_DEFAULT_TTL = 900
+TAF_CACHE_MIN_TTL = 60
+TAF_CACHE_MAX_TTL = 1800  # Amendments can be issued at any time
+
+# Upstream Endpoints (overridable for local stand-ins, e.g. benchmarks/)
+AVWX_BASE_URL = os.getenv("AVWX_BASE_URL", "https://avwx.rest/api").rstrip("/")
+PILOTWEB_URL = os.getenv("PILOTWEB_URL", "https://pilotweb.nas.faa.gov/PilotWeb/notamsRetrievalByICAOAction.do")
+
+# Web Search Configuration
+WEB_SEARCH_URL = os.getenv("WEB_SEARCH_URL", "https://html.duckduckgo.com/html/")
+WEB_SEARCH_MAX_RESULTS = 3
+WEB_SEARCH_CACHE_TTL = 86400  # Regulation lookups rarely change within a day
+WEB_SEARCH_CACHE_MAX_ENTRIES = 256
+WEB_SEARCH_MAX_WORKERS = 4
+
+# Watchlist Refresher (keeps these airports' METAR/TAF warm in the background)
+WATCHLIST = [code.strip().upper() for code in os.getenv("WATCHLIST", "").split(",") if code.strip()]
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE")  # One ICAO per line; added to WATCHLIST
+REFRESH_PRODUCTS = {"fetch_metar": "metar", "get_taf": "taf"}  # Tool -> report cache product
+REFRESH_JITTER_SECONDS = 90  # Random delay after a report's expiry so stations do not refresh in lockstep
+REFRESH_RETRY_SECONDS = 120  # Delay after a failed refresh
+REFRESH_EMPTY_SECONDS = 1800  # Delay when a station has no report of that kind
+REFRESH_RATE_PER_SECOND = 2.0  # Upstream requests per second across the watchlist
+REFRESH_BURST = 5
+REFRESH_MAX_WORKERS = 4
+
+# Circuit Breaker and Stale Serving
+CIRCUIT_FAILURE_THRESHOLD = 3  # Consecutive failed or slow calls that open a service's circuit
+CIRCUIT_SLOW_CALL_FRACTION = 0.5  # Calls slower than this fraction of the service timeout count as failures
+CIRCUIT_OPEN_SECONDS = 30  # Time an open circuit waits before letting one probe through
+STALE_MAX_AGE = 7200  # Oldest last-good report served while an upstream is down (seconds)
+STALE_REFRESH_WORKERS = 2
+
+# Metrics and Tracing
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Set to 0.0.0.0 to let other hosts scrape
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Serves /metrics and /traces; 0 disables the endpoint
+METRICS_TRACE_HISTORY = 50  # Finished turn traces kept for /traces
 
 # Validation
 ICAO_PATTERN = r'^[A-Z]{4}$'
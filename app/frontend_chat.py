@@ -2,43 +2,81 @@ import streamlit as st
 from streamlit_chat import message
 import openai
 import os
-import json
+import time
 import yaml
 from dotenv import load_dotenv
 
-from metar_fetcher import fetch_metar
-from taf_fetcher import get_taf
-from metar_interpreter import interpret_metar
-from taf_interpreter import interpret_taf
-from notam_fetcher import get_notams
-from web_search import search_web
+from config import BULK_INGEST_ENABLED, HISTORY_RENDER_WINDOW
+from tool_registry import get_tool_schemas, dispatch
+from tool_executor import run_tool_calls
+from prefetch import Prefetcher
+from history import ConversationHistory
+from metrics import LLM_SECONDS, LLM_FIRST_TOKEN_SECONDS, record_usage, span, trace_turn, start_metrics_server
 
 # 🌍 Load environment
 load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# 📜 Load prompt
-try:
+# 🛫 Streamlit config; must run before any other Streamlit command,
+# including the cache_resource spinners below
+st.set_page_config(page_title="Aviation Weather & Flight Co-Pilot", page_icon="🛩️")
+
+# ♻️ Process-wide resources, built once and reused across reruns and sessions
+@st.cache_resource
+def get_client():
+    return openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+@st.cache_resource
+def start_bulk_ingest():
+    if BULK_INGEST_ENABLED:
+        from bulk_ingest import start_background_refresh
+        start_background_refresh()
+
+@st.cache_resource
+def start_metrics():
+    start_metrics_server()
+
+@st.cache_resource
+def start_watchlist_refresh():
+    from refresher import start_refresher
+    start_refresher()
+
+@st.cache_resource
+def load_prompt():
     # Try relative path first, then absolute
     prompt_path = "app/prompt.yaml"
     if not os.path.exists(prompt_path):
         prompt_path = "prompt.yaml"
-    
+
     with open(prompt_path, "r") as f:
-        prompt_data = yaml.safe_load(f)
+        return yaml.safe_load(f)
+
+@st.cache_resource
+def get_functions():
+    return get_tool_schemas()
+
+client = get_client()
+start_bulk_ingest()
+start_metrics()
+start_watchlist_refresh()
+functions = get_functions()
+
+# 📜 Load prompt (failures are not cached, so a fixed file is picked up on rerun)
+try:
+    prompt_data, prompt_error = load_prompt(), None
 except Exception as e:
-    st.error(f"Failed to load prompt configuration: {e}")
-    prompt_data = {"system": "You are an aviation weather assistant."}
+    prompt_data, prompt_error = {"system": "You are an aviation weather assistant."}, e
 
-# 🛫 Streamlit config
-st.set_page_config(page_title="Aviation Weather & Flight Co-Pilot", page_icon="🛩️")
 st.title("🧠 Aviation Weather & Flight Co-Pilot")
 st.markdown(
     "I'm your assistant for **weather**, **regulations**, and **flight planning**.\n\n"
     "Ask for METARs, TAFs, regulation lookups, VFR decisions, or route briefings."
 )
+if prompt_error:
+    st.error(f"Failed to load prompt configuration: {prompt_error}")
 
 # 💬 Chat history
+# messages is the full transcript shown on screen; history is the
+# token-budgeted copy sent to the model
 if "messages" not in st.session_state:
     st.session_state.messages = [
         {"role": "system", "content": prompt_data["system"]},
@@ -47,169 +85,135 @@ if "messages" not in st.session_state:
             "content": "👋 Hello, pilot. I'm your AI Co-Pilot. Ready to help with weather, planning, or FAA questions. Just type your question below to begin."
         }
     ]
-
-# 🔧 Available tools
-functions = [
-    {
-        "type": "function",
-        "function": {
-            "name": "fetch_metar",
-            "description": "Get the latest METAR for a given ICAO airport code.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "icao": {"type": "string", "description": "The ICAO code (e.g. KSEA)"}
-                },
-                "required": ["icao"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_taf",
-            "description": "Get the latest TAF forecast for a given ICAO airport code.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "icao": {"type": "string", "description": "The ICAO code (e.g. KSFO)"}
-                },
-                "required": ["icao"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "interpret_metar",
-            "description": "Interpret a raw METAR weather report.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "metar": {"type": "string", "description": "Raw METAR string"}
-                },
-                "required": ["metar"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "interpret_taf",
-            "description": "Interpret a raw TAF forecast.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "taf": {"type": "string", "description": "Raw TAF string"}
-                },
-                "required": ["taf"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_notams",
-            "description": "Get NOTAMs for a given ICAO airport code.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "icao": {"type": "string", "description": "The ICAO code (e.g. KORD)"}
-                },
-                "required": ["icao"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_web",
-            "description": "Search the web for recent aviation updates, news, or regulations.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "The search query"}
-                },
-                "required": ["query"]
-            }
-        }
-    }
-]
+if "history" not in st.session_state:
+    st.session_state.history = ConversationHistory(st.session_state.messages)
+
+def remember(*msgs):
+    """Record messages in both the on-screen transcript and the model history"""
+    st.session_state.messages.extend(msgs)
+    st.session_state.history.extend(msgs)
+
+# 📡 Streamed completions
+STREAM_RENDER_INTERVAL = 0.05  # Seconds between placeholder redraws
+
+def stream_completion(placeholder, **kwargs):
+    """
+    Stream a chat completion, rendering content into placeholder as it arrives
+
+    Tool-call deltas are accumulated by index. Returns (content, tool_calls),
+    with tool_calls as a list of dicts in the API's message format.
+    """
+    with span("llm.completion", model=kwargs["model"], stream=True):
+        return _stream_completion(placeholder, **kwargs)
+
+def _stream_completion(placeholder, **kwargs):
+    content = ""
+    tool_calls = {}
+    last_render = 0.0
+    model = kwargs["model"]
+    started = time.perf_counter()
+    first_token = None
+
+    # The usage block arrives in a final chunk with no choices
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    for chunk in stream:
+        if chunk.usage:
+            record_usage(model, chunk.usage)
+        if not chunk.choices:
+            continue
+        if first_token is None:
+            first_token = time.perf_counter() - started
+            LLM_FIRST_TOKEN_SECONDS.observe(first_token, model=model)
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            content += delta.content
+            now = time.monotonic()
+            if now - last_render >= STREAM_RENDER_INTERVAL:
+                placeholder.markdown(content + "▌")
+                last_render = now
+
+        for tc in delta.tool_calls or []:
+            call = tool_calls.setdefault(tc.index, {
+                "id": "",
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function:
+                call["function"]["name"] += tc.function.name or ""
+                call["function"]["arguments"] += tc.function.arguments or ""
+
+    LLM_SECONDS.observe(time.perf_counter() - started, model=model)
+    if content:
+        placeholder.markdown(content)
+    return content, [tool_calls[index] for index in sorted(tool_calls)]
 
 # 💬 Show chat
-for i, msg in enumerate(st.session_state.messages):
-    if isinstance(msg, dict):
-        role = msg.get("role")
-        content = msg.get("content")
-    else:
-        role = getattr(msg, "role", None)
-        content = getattr(msg, "content", None)
-
-    if role in ("user", "assistant", "tool") and content:
-        message(content, is_user=(role == "user"), key=f"msg-{i}")
+# Only the newest render_window messages are drawn so reruns stay cheap as
+# the conversation grows; older ones load a page at a time on request
+if "render_window" not in st.session_state:
+    st.session_state.render_window = HISTORY_RENDER_WINDOW
+
+shown = []
+has_earlier = False
+for i in range(len(st.session_state.messages) - 1, -1, -1):
+    msg = st.session_state.messages[i]
+    if msg.get("role") in ("user", "assistant", "tool") and msg.get("content"):
+        if len(shown) == st.session_state.render_window:
+            has_earlier = True
+            break
+        shown.append((i, msg))
+
+if has_earlier and st.button("⬆️ Load earlier messages"):
+    st.session_state.render_window += HISTORY_RENDER_WINDOW
+    st.rerun()
+
+for i, msg in reversed(shown):
+    message(msg["content"], is_user=(msg["role"] == "user"), key=f"msg-{i}")
 
 # ✏️ User input
 user_input = st.chat_input("Type a flight planning or aviation question...")
 if user_input:
-    st.session_state.messages.append({"role": "user", "content": user_input})
+    remember({"role": "user", "content": user_input})
     message(user_input, is_user=True, key=f"user-{len(st.session_state.messages)}")
 
-    with st.spinner("🧠 Analyzing..."):
+    with trace_turn():
+        # Fetch weather for airports in the question while the model decides
+        prefetcher = Prefetcher(dispatch).start(user_input)
         try:
-            response = client.chat.completions.create(
+            placeholder = st.empty()
+            content, tool_calls = stream_completion(
+                placeholder,
                 model="gpt-4o-mini",
-                messages=st.session_state.messages,
+                messages=st.session_state.history.for_completion(),
                 tools=functions,
                 tool_choice="auto"
             )
 
-            reply = response.choices[0].message
-
-            if reply.tool_calls:
-                st.session_state.messages.append({
+            if tool_calls:
+                remember({
                     "role": "assistant",
-                    "content": reply.content or "",
-                    "tool_calls": [tc.model_dump() for tc in reply.tool_calls]
+                    "content": content,
+                    "tool_calls": tool_calls
                 })
 
-                for tool_call in reply.tool_calls:
-                    func_name = tool_call.function.name
-                    args = json.loads(tool_call.function.arguments)
-
-                    try:
-                        if func_name == "fetch_metar":
-                            result = fetch_metar(**args)
-                        elif func_name == "get_taf":
-                            result = get_taf(**args)
-                        elif func_name == "interpret_metar":
-                            result = interpret_metar(**args)
-                        elif func_name == "interpret_taf":
-                            result = interpret_taf(**args)
-                        elif func_name == "get_notams":
-                            result = get_notams(**args)
-                        elif func_name == "search_web":
-                            result = search_web(**args)
-                        else:
-                            result = f"❌ Unknown tool: {func_name}"
-                    except Exception as e:
-                        result = f"❌ Error executing {func_name}: {str(e)}"
-
-                    st.session_state.messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": result
-                    })
-
-                followup = client.chat.completions.create(
+                with st.spinner("🛰️ Fetching flight data..."):
+                    with span("tools", count=len(tool_calls)):
+                        remember(*run_tool_calls(tool_calls, prefetcher.dispatch))
+
+                content, _ = stream_completion(
+                    placeholder,
                     model="gpt-4o-mini",
-                    messages=st.session_state.messages
+                    messages=st.session_state.history.for_completion()
                 )
-                reply = followup.choices[0].message
 
-            st.session_state.messages.append(reply)
-            message(reply.content, is_user=False, key=f"msg-{len(st.session_state.messages)}")
-            
+            remember({"role": "assistant", "content": content})
+
         except Exception as e:
             error_msg = f"❌ Error: {str(e)}"
             st.error(error_msg)
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+            remember({"role": "assistant", "content": error_msg})
+        finally:
+            prefetcher.close()
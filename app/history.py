@@ -0,0 +1,193 @@
+"""
+Token-budgeted conversation history for the Aviation Weather Agent
+"""
+import json
+from typing import Optional
+
+from config import (
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_COMPACT_TARGET,
+    HISTORY_KEEP_RECENT_TURNS,
+    HISTORY_STUB_CHARS,
+)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to a character estimate
+    _encoding = None
+
+# Per-message framing overhead in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tool results that a newer call for the same station makes obsolete
+SUPERSEDABLE_TOOLS = frozenset({"fetch_metar", "get_taf", "get_notams"})
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def _as_dict(message) -> dict:
+    """
+    Normalize SDK message objects to plain dicts
+    """
+    if isinstance(message, dict):
+        return message
+    return message.model_dump(exclude_none=True)
+
+
+def _message_tokens(message: dict) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call.get("function", {})
+        tokens += count_tokens(function.get("name", "")) + count_tokens(function.get("arguments", ""))
+    return tokens
+
+
+class ConversationHistory:
+    """
+    Conversation messages with incremental token accounting
+
+    Token counts are computed once per message on append. When the total
+    exceeds the budget, history is compacted down to HISTORY_COMPACT_TARGET
+    of the budget in one pass, so compaction happens rarely and the cached
+    prompt prefix stays stable between compactions. The first message (the
+    system prompt) is never modified.
+    """
+
+    def __init__(self, messages: Optional[list] = None, token_budget: int = HISTORY_TOKEN_BUDGET,
+                 keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.messages = []
+        self._tokens = []
+        self.compactions = 0
+        self.extend(messages or [])
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self._tokens)
+
+    def append(self, message):
+        message = _as_dict(message)
+        self.messages.append(message)
+        self._tokens.append(_message_tokens(message))
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def discard_from(self, message: dict):
+        """
+        Drop message and everything after it, e.g. the rest of an interrupted turn
+        """
+        for index in range(len(self.messages) - 1, 0, -1):
+            if self.messages[index] is message:
+                del self.messages[index:]
+                del self._tokens[index:]
+                return
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def for_completion(self) -> list[dict]:
+        """
+        Return the messages to send, compacting first if over budget
+        """
+        if self.total_tokens > self.token_budget:
+            self.compact()
+        return self.messages
+
+    def _set_content(self, index: int, content: str):
+        self.messages[index] = {**self.messages[index], "content": content}
+        self._tokens[index] = _message_tokens(self.messages[index])
+
+    def _tool_calls_by_id(self) -> dict:
+        calls = {}
+        for message in self.messages:
+            for tool_call in message.get("tool_calls") or []:
+                function = tool_call.get("function", {})
+                try:
+                    args = json.loads(function.get("arguments") or "{}")
+                except ValueError:
+                    args = {}
+                calls[tool_call.get("id")] = (function.get("name"), args)
+        return calls
+
+    def _protected_start(self) -> int:
+        """
+        Index of the first message in the most recent keep_recent_turns turns
+        """
+        if self.keep_recent_turns <= 0:
+            return len(self.messages)
+        user_indexes = [i for i, m in enumerate(self.messages) if m.get("role") == "user"]
+        if len(user_indexes) < self.keep_recent_turns:
+            return 1
+        return user_indexes[-self.keep_recent_turns]
+
+    def compact(self) -> int:
+        """
+        Shrink history to the compaction target
+
+        Steps, stopping as soon as the target is met:
+        1. Replace tool results superseded by a newer call for the same
+           tool and station (e.g. an older METAR for KSEA).
+        2. Replace older tool results with a short stub.
+        3. Drop the oldest whole turns.
+
+        Returns:
+            Number of tokens removed
+        """
+        before = self.total_tokens
+        target = int(self.token_budget * HISTORY_COMPACT_TARGET)
+        calls = self._tool_calls_by_id()
+        protected = self._protected_start()
+
+        # 1. Superseded station lookups, newest result wins
+        seen = set()
+        for index in range(len(self.messages) - 1, 0, -1):
+            message = self.messages[index]
+            if message.get("role") != "tool":
+                continue
+            name, args = calls.get(message.get("tool_call_id"), (None, {}))
+            if name not in SUPERSEDABLE_TOOLS or not isinstance(args.get("icao"), str):
+                continue
+            key = (name, args["icao"].strip().upper())
+            if key in seen:
+                self._set_content(index, f"[superseded by a newer {name} result for {key[1]}]")
+            seen.add(key)
+        if self.total_tokens <= target:
+            return self._finish(before)
+
+        # 2. Stub out tool results outside the protected recent turns
+        for index in range(1, protected):
+            message = self.messages[index]
+            content = message.get("content") or ""
+            if message.get("role") != "tool" or len(content) <= HISTORY_STUB_CHARS:
+                continue
+            self._set_content(index, content[:HISTORY_STUB_CHARS].rstrip() + " … [older tool output truncated]")
+            if self.total_tokens <= target:
+                return self._finish(before)
+
+        # 3. Drop whole turns, oldest first, keeping tool calls paired with results
+        while self.total_tokens > target:
+            user_indexes = [i for i, m in enumerate(self.messages) if m.get("role") == "user"]
+            if len(user_indexes) <= max(1, self.keep_recent_turns):
+                break
+            start, end = user_indexes[0], user_indexes[1]
+            del self.messages[start:end]
+            del self._tokens[start:end]
+
+        return self._finish(before)
+
+    def _finish(self, before: int) -> int:
+        self.compactions += 1
+        return before - self.total_tokens
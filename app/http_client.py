@@ -0,0 +1,158 @@
+"""
+Shared, connection-pooled HTTP client for the Aviation Weather Agent
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    METAR_TIMEOUT,
+    TAF_TIMEOUT,
+    NOTAM_TIMEOUT,
+    WEB_SEARCH_TIMEOUT,
+    BULK_TIMEOUT,
+    STATION_LOOKUP_TIMEOUT,
+    USER_AGENT,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+)
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from metrics import HTTP_SECONDS, HTTP_RESPONSES, HTTP_RETRIES, span
+
+# Per-service request timeouts (seconds)
+SERVICE_TIMEOUTS = {
+    "metar": METAR_TIMEOUT,
+    "taf": TAF_TIMEOUT,
+    # Nearby-TAF probes run on shrunken timeouts without retries, so they
+    # get their own breaker rather than opening "taf" for every user
+    "taf_nearby": TAF_TIMEOUT,
+    "notam": NOTAM_TIMEOUT,
+    "web_search": WEB_SEARCH_TIMEOUT,
+    "bulk": BULK_TIMEOUT,
+    "station": STATION_LOOKUP_TIMEOUT,
+}
+DEFAULT_TIMEOUT = 10
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide session, creating it on first use
+
+    The session keeps a pool of keep-alive connections per host, so repeat
+    calls to avwx.rest, PilotWeb and DuckDuckGo skip the TCP/TLS handshake.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+
+def breaker(service: str) -> CircuitBreaker:
+    """
+    The circuit breaker guarding service
+    """
+    return get_breaker(service, SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUT))
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter
+    """
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method: str, url: str, service: str, retries: int = None, **kwargs) -> requests.Response:
+    """
+    Send a request through the shared session
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        service: Service name used to pick the timeout (see SERVICE_TIMEOUTS)
+        retries: Number of retries; defaults to HTTP_MAX_RETRIES for
+            idempotent methods and 0 otherwise
+        **kwargs: Passed through to requests.Session.request
+
+    Returns:
+        The final response. Retryable status codes are returned as-is once
+        retries are exhausted so callers can still use raise_for_status().
+
+    Raises:
+        circuit_breaker.CircuitOpenError: If the service's circuit is open,
+            before or between attempts
+        requests.exceptions.RequestException: If the request cannot be completed
+    """
+    method = method.upper()
+    kwargs.setdefault("timeout", SERVICE_TIMEOUTS.get(service, DEFAULT_TIMEOUT))
+    if retries is None:
+        retries = HTTP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+    session = get_session()
+    circuit = breaker(service)
+    attempt = 0
+    started = time.perf_counter()
+    with span(f"http.{service}", method=method) as trace_span:
+        while True:
+            try:
+                probe = circuit.before_request()
+            except CircuitOpenError:
+                HTTP_RESPONSES.inc(service=service, status="circuit_open")
+                HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                raise
+            attempt_started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                circuit.record(False)
+                HTTP_RESPONSES.inc(service=service, status=type(e).__name__)
+                # Connection failures (including connect timeouts) are safe to
+                # retry; read timeouts are not, as they would multiply the wait.
+                if not isinstance(e, requests.exceptions.ConnectionError) or attempt >= retries:
+                    HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                    raise
+            except BaseException:
+                circuit.release(probe)
+                raise
+            else:
+                circuit.record(response.status_code not in RETRY_STATUS_CODES, time.perf_counter() - attempt_started)
+                HTTP_RESPONSES.inc(service=service, status=str(response.status_code))
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    HTTP_SECONDS.observe(time.perf_counter() - started, service=service)
+                    if trace_span is not None:
+                        trace_span["attrs"].update(status=response.status_code, attempts=attempt + 1)
+                    return response
+                response.close()
+
+            HTTP_RETRIES.inc(service=service)
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+
+def get(url: str, service: str, **kwargs) -> requests.Response:
+    return request("GET", url, service, **kwargs)
+
+
+def post(url: str, service: str, **kwargs) -> requests.Response:
+    return request("POST", url, service, **kwargs)
@@ -1,50 +1,131 @@
 import os
 import requests
 import re
+import http_client
+from report_cache import report_cache, parse_report_time, metar_expiry
+from report_store import report_store, last_good
+from bulk_ingest import bulk_store
+from obs_timeseries import obs_series
+from circuit_breaker import serve_stale
+from config import AVWX_BASE_URL
+
+def _local_metar(icao):
+    """
+    METAR from the cache, the shared store or bulk ingest, or None
+    """
+    cached = report_cache.get(("metar", icao))
+    if cached is not None:
+        return cached
+
+    stored = report_store.get_fresh("metar", icao)
+    if stored is not None:
+        report_cache.put(("metar", icao), stored["text"], stored["expires_at"])
+        # Possibly fetched by another process, so this one's series has not seen it
+        obs_series.record(icao, stored["text"], stored["observed"])
+        return stored["text"]
+
+    bulk = bulk_store.get_record("metar", icao)
+    if bulk is not None:
+        report_cache.put(("metar", icao), bulk["raw"], bulk["expires_at"])
+        return bulk["raw"]
+    return None
+
+def _headers(api_key):
+    return {
+        "Authorization": api_key,
+        "Accept": "application/json",
+        "User-Agent": "AviationWeatherAgent/1.0"
+    }
+
+def _remember(icao, data):
+    """
+    Cache and store the METAR from an AVWX response
+    """
+    raw_metar = data.get("raw")
+    if not raw_metar:
+        return f"⚠️ No METAR data available for {icao}."
+
+    observed = parse_report_time(data.get("time"))
+    expires_at = metar_expiry(observed)
+    report_cache.put(("metar", icao), raw_metar, expires_at)
+    report_store.put("metar", icao, raw_metar, observed.timestamp() if observed else None, expires_at)
+    obs_series.record(icao, raw_metar, observed.timestamp() if observed else None)
+    return raw_metar
+
+def _failure(icao, e):
+    stale = serve_stale("METAR", e, last_good("metar", icao), ("metar", icao),
+                        lambda: fetch_metar(icao), http_client.breaker("metar"))
+    if stale is not None:
+        return stale
+    if isinstance(e, requests.exceptions.Timeout):
+        return f"❌ Timeout fetching METAR for {icao}. Please try again."
+    if isinstance(e, requests.exceptions.HTTPError):
+        status_code = e.response.status_code if e.response is not None else None
+        if status_code == 404:
+            return f"⚠️ METAR not found for {icao}. Please verify the airport code."
+        elif status_code == 401:
+            return f"❌ Authentication failed. Please check your AVWX API key."
+        else:
+            return f"❌ HTTP error {status_code} for {icao}: {e}"
+    return f"❌ Network error fetching METAR for {icao}: {e}"
 
 def fetch_metar(icao):
     # Validate ICAO code
     if not icao or not isinstance(icao, str):
         return "❌ Invalid ICAO code provided."
-    
+
     # Clean and validate ICAO format (4 letters, uppercase)
     icao = icao.strip().upper()
     if not re.match(r'^[A-Z]{4}$', icao):
         return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
-    
+
+    local = _local_metar(icao)
+    if local is not None:
+        return local
+
     api_key = os.getenv("AVWX_API_KEY")
     if not api_key:
         return "❌ AVWX API key not set. Please check your environment variables."
 
-    url = f"https://avwx.rest/api/metar/{icao}"
-    headers = {
-        "Authorization": api_key,
-        "Accept": "application/json",
-        "User-Agent": "AviationWeatherAgent/1.0"
-    }
+    url = f"{AVWX_BASE_URL}/metar/{icao}"
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_client.get(url, "metar", headers=_headers(api_key))
         response.raise_for_status()
+        return _remember(icao, response.json())
+
+    except requests.exceptions.RequestException as e:
+        return _failure(icao, e)
+    except Exception as e:
+        return f"❌ Unexpected error fetching METAR for {icao}: {e}"
+
+async def fetch_metar_async(icao):
+    """
+    fetch_metar for the async API service; the network call goes through async_http
+    """
+    import async_http
+
+    if not icao or not isinstance(icao, str):
+        return "❌ Invalid ICAO code provided."
+
+    icao = icao.strip().upper()
+    if not re.match(r'^[A-Z]{4}$', icao):
+        return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
+
+    local = _local_metar(icao)
+    if local is not None:
+        return local
+
+    api_key = os.getenv("AVWX_API_KEY")
+    if not api_key:
+        return "❌ AVWX API key not set. Please check your environment variables."
+
+    try:
+        response = await async_http.get(f"{AVWX_BASE_URL}/metar/{icao}", "metar", headers=_headers(api_key))
+        response.raise_for_status()
+        return _remember(icao, response.json())
 
-        data = response.json()
-        raw_metar = data.get("raw")
-        
-        if not raw_metar:
-            return f"⚠️ No METAR data available for {icao}."
-            
-        return raw_metar
-        
-    except requests.exceptions.Timeout:
-        return f"❌ Timeout fetching METAR for {icao}. Please try again."
-    except requests.exceptions.HTTPError as http_err:
-        if response.status_code == 404:
-            return f"⚠️ METAR not found for {icao}. Please verify the airport code."
-        elif response.status_code == 401:
-            return f"❌ Authentication failed. Please check your AVWX API key."
-        else:
-            return f"❌ HTTP error {response.status_code} for {icao}: {http_err}"
     except requests.exceptions.RequestException as e:
-        return f"❌ Network error fetching METAR for {icao}: {e}"
+        return _failure(icao, e)
     except Exception as e:
         return f"❌ Unexpected error fetching METAR for {icao}: {e}"
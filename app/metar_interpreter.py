@@ -1,12 +1,356 @@
 # app/interpret_metar.py
 
+import re
+from typing import Optional
+
+# One alternation over every body group; fullmatch + lastgroup tells us which
+# group a token is in a single regex call.
+_BODY_TOKEN = re.compile(
+    r"(?P<wind>(?P<wind_dir>\d{3}|VRB)(?P<wind_speed>\d{2,3})(?:G(?P<wind_gust>\d{2,3}))?(?P<wind_unit>KT|MPS|KMH))"
+    r"|(?P<wind_var>(?P<var_from>\d{3})V(?P<var_to>\d{3}))"
+    r"|(?P<vis_sm>(?P<vis_sm_mod>[PM])?(?P<vis_sm_value>\d{1,2}(?:/\d{1,2})?|\d/\d{1,2})SM)"
+    r"|(?P<vis_m>(?P<vis_m_value>\d{4})(?:NDV)?)"
+    r"|(?P<cavok>CAVOK)"
+    r"|(?P<rvr>R(?P<rvr_runway>\d{2}[LRC]?)/(?P<rvr_low>[PM]?\d{4})(?:V(?P<rvr_high>[PM]?\d{4}))?(?P<rvr_unit>FT)?/?(?P<rvr_trend>[UDN])?)"
+    r"|(?P<sky_clear>SKC|CLR|NSC|NCD)"
+    r"|(?P<nsw>NSW)"
+    r"|(?P<cloud>(?P<cloud_cover>FEW|SCT|BKN|OVC|VV)(?P<cloud_base>\d{3}|///)(?P<cloud_type>CB|TCU|///)?)"
+    r"|(?P<temp>(?P<temp_value>M?\d{2})/(?P<dew_value>M?\d{2})?)"
+    r"|(?P<altimeter>(?P<alt_unit>[AQ])(?P<alt_value>\d{4}))"
+    r"|(?P<wx>(?P<wx_intensity>[-+]|VC)?(?P<wx_descriptor>MI|PR|BC|DR|BL|SH|TS|FZ)?"
+    r"(?P<wx_phenomena>(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)*))"
+)
+_STATION = re.compile(r"[A-Z][A-Z0-9]{3}")
+_TIME = re.compile(r"(\d{2})(\d{2})(\d{2})Z")
+_WHOLE_NUMBER = re.compile(r"\d")
+_FRACTION_SM = re.compile(r"M?\d/\d{1,2}SM")
+_REMARK_TEMPERATURE = re.compile(r"T([01])(\d{3})([01])(\d{3})")
+
+TREND_MARKERS = frozenset({"NOSIG", "BECMG", "TEMPO"})
+
+INTENSITY_TEXT = {"-": "light", "+": "heavy", "VC": "in the vicinity"}
+DESCRIPTOR_TEXT = {
+    "MI": "shallow", "PR": "partial", "BC": "patches of", "DR": "low drifting",
+    "BL": "blowing", "SH": "showers", "TS": "thunderstorm", "FZ": "freezing",
+}
+PHENOMENON_TEXT = {
+    "DZ": "drizzle", "RA": "rain", "SN": "snow", "SG": "snow grains", "IC": "ice crystals",
+    "PL": "ice pellets", "GR": "hail", "GS": "small hail", "UP": "unknown precipitation",
+    "BR": "mist", "FG": "fog", "FU": "smoke", "VA": "volcanic ash", "DU": "dust",
+    "SA": "sand", "HZ": "haze", "PY": "spray", "PO": "dust whirls", "SQ": "squalls",
+    "FC": "funnel cloud", "SS": "sandstorm", "DS": "duststorm",
+}
+COVER_TEXT = {"FEW": "few", "SCT": "scattered", "BKN": "broken", "OVC": "overcast", "VV": "vertical visibility"}
+CEILING_COVERS = frozenset({"BKN", "OVC", "VV"})
+
+METERS_PER_SM = 1609.344
+KT_PER_MPS = 1.943844
+KT_PER_KMH = 0.539957
+
+
+def flight_category(ceiling_ft: Optional[float], visibility_sm: Optional[float]) -> Optional[str]:
+    """
+    FAA flight category from ceiling and visibility
+
+    Missing values are treated as unrestricted; returns None if both are missing.
+    """
+    if ceiling_ft is None and visibility_sm is None:
+        return None
+    ceiling = float("inf") if ceiling_ft is None else ceiling_ft
+    visibility = float("inf") if visibility_sm is None else visibility_sm
+    if ceiling < 500 or visibility < 1:
+        return "LIFR"
+    if ceiling < 1000 or visibility < 3:
+        return "IFR"
+    if ceiling <= 3000 or visibility <= 5:
+        return "MVFR"
+    return "VFR"
+
+
+def _parse_fraction(value: str) -> float:
+    if "/" in value:
+        numerator, denominator = value.split("/")
+        return int(numerator) / int(denominator)
+    return float(value)
+
+
+def _parse_temperature(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    return -int(value[1:]) if value[0] == "M" else int(value)
+
+
+def _describe_weather(intensity: Optional[str], descriptor: Optional[str], phenomena: str) -> str:
+    words = []
+    if intensity and intensity != "VC":
+        words.append(INTENSITY_TEXT[intensity])
+    phenomena_words = [PHENOMENON_TEXT[phenomena[i:i + 2]] for i in range(0, len(phenomena), 2)]
+    if descriptor == "SH":
+        # "SHRA" reads as "rain showers"
+        words.extend(phenomena_words)
+        words.append(DESCRIPTOR_TEXT[descriptor])
+    else:
+        if descriptor:
+            words.append(DESCRIPTOR_TEXT[descriptor] + (" with" if descriptor == "TS" and phenomena else ""))
+        words.extend(phenomena_words)
+    if intensity == "VC":
+        words.append(INTENSITY_TEXT["VC"])
+    return " ".join(words)
+
+
+def decode_groups(tokens: list[str]) -> dict:
+    """
+    Decode METAR-style weather groups (wind, visibility, RVR, weather,
+    clouds, temperature, altimeter)
+
+    Shared by the METAR decoder and the TAF parser. Only fields present in
+    the tokens appear in the result, so a TAF change group can be layered
+    over the conditions it modifies. Decoding stops at a trend marker
+    (NOSIG/BECMG/TEMPO), whose text is returned as "trend".
+    """
+    result = {}
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+
+        if token == "AUTO":
+            result["auto"] = True
+            continue
+        if token in ("COR", "CCA"):
+            result["corrected"] = True
+            continue
+        if token in TREND_MARKERS:
+            result["trend"] = " ".join(tokens[i - 1:])
+            break
+        # Split visibility such as "1 1/2SM"
+        if _WHOLE_NUMBER.fullmatch(token) and i < len(tokens) and _FRACTION_SM.fullmatch(tokens[i]):
+            result["visibility_sm"] = int(token) + _parse_fraction(tokens[i].lstrip("M")[:-2])
+            result["visibility_modifier"] = None
+            i += 1
+            continue
+
+        match = _BODY_TOKEN.fullmatch(token)
+        group = match.lastgroup if match else None
+        # The weather alternative can match an empty string; reject it
+        if group is None or (group == "wx" and not (match["wx_descriptor"] or match["wx_phenomena"])):
+            result.setdefault("unparsed", []).append(token)
+            continue
+
+        if group == "wind":
+            speed = int(match["wind_speed"])
+            gust = int(match["wind_gust"]) if match["wind_gust"] else None
+            factor = {"KT": 1, "MPS": KT_PER_MPS, "KMH": KT_PER_KMH}[match["wind_unit"]]
+            if factor != 1:
+                speed = round(speed * factor)
+                gust = round(gust * factor) if gust is not None else None
+            result["wind"] = {
+                "direction": None if match["wind_dir"] == "VRB" else int(match["wind_dir"]),
+                "variable": match["wind_dir"] == "VRB",
+                "speed_kt": speed,
+                "gust_kt": gust,
+                "variable_from": None,
+                "variable_to": None,
+            }
+        elif group == "wind_var":
+            if result.get("wind") is not None:
+                result["wind"]["variable_from"] = int(match["var_from"])
+                result["wind"]["variable_to"] = int(match["var_to"])
+        elif group == "vis_sm":
+            result["visibility_sm"] = _parse_fraction(match["vis_sm_value"])
+            result["visibility_modifier"] = {"P": "greater_than", "M": "less_than"}.get(match["vis_sm_mod"])
+        elif group == "vis_m":
+            meters = int(match["vis_m_value"])
+            result["visibility_modifier"] = None
+            if meters == 9999:
+                result["visibility_modifier"] = "greater_than"
+                meters = 10000
+            result["visibility_sm"] = round(meters / METERS_PER_SM, 2)
+        elif group == "cavok":
+            result["visibility_sm"] = round(10000 / METERS_PER_SM, 2)
+            result["visibility_modifier"] = "greater_than"
+            result["clouds"] = []
+            result["weather"] = []
+        elif group == "rvr":
+            result.setdefault("rvr", []).append({
+                "runway": match["rvr_runway"],
+                "low": match["rvr_low"],
+                "high": match["rvr_high"],
+                "unit": "ft" if match["rvr_unit"] else "m",
+                "trend": match["rvr_trend"],
+            })
+        elif group == "sky_clear":
+            result.setdefault("clouds", [])
+        elif group == "nsw":
+            result["weather"] = []
+        elif group == "cloud":
+            base = None if match["cloud_base"] == "///" else int(match["cloud_base"]) * 100
+            cloud_type = match["cloud_type"] if match["cloud_type"] != "///" else None
+            result.setdefault("clouds", []).append({"cover": match["cloud_cover"], "base_ft": base, "type": cloud_type})
+        elif group == "temp":
+            result["temperature_c"] = _parse_temperature(match["temp_value"])
+            result["dewpoint_c"] = _parse_temperature(match["dew_value"])
+        elif group == "altimeter":
+            value = int(match["alt_value"])
+            result["altimeter_inhg"] = value / 100 if match["alt_unit"] == "A" else round(value / 33.8639, 2)
+        elif group == "wx":
+            result.setdefault("weather", []).append({
+                "code": token,
+                "intensity": match["wx_intensity"],
+                "descriptor": match["wx_descriptor"],
+                "text": _describe_weather(match["wx_intensity"], match["wx_descriptor"], match["wx_phenomena"]),
+            })
+
+    if "clouds" in result:
+        result["ceiling_ft"] = ceiling_from_clouds(result["clouds"])
+    return result
+
+
+def ceiling_from_clouds(clouds: list[dict]) -> Optional[int]:
+    """
+    Lowest broken, overcast or vertical-visibility layer, in feet
+    """
+    bases = [c["base_ft"] for c in clouds if c["cover"] in CEILING_COVERS and c["base_ft"] is not None]
+    return min(bases) if bases else None
+
+
+def decode_metar(metar: str) -> dict:
+    """
+    Decode a raw METAR into structured fields
+
+    Args:
+        metar: Raw METAR/SPECI string
+
+    Returns:
+        Dict with station, time, wind, visibility, RVR, weather, clouds,
+        ceiling, temperature/dewpoint, altimeter, remarks and flight
+        category. Tokens that could not be decoded are listed in "unparsed".
+    """
+    body, _, remarks = metar.strip().partition(" RMK")
+    tokens = body.split()
+    result = {
+        "raw": metar.strip(),
+        "type": "METAR",
+        "station": None,
+        "time": None,
+        "auto": False,
+        "corrected": False,
+        "wind": None,
+        "visibility_sm": None,
+        "visibility_modifier": None,
+        "rvr": [],
+        "weather": [],
+        "clouds": [],
+        "ceiling_ft": None,
+        "temperature_c": None,
+        "dewpoint_c": None,
+        "altimeter_inhg": None,
+        "trend": None,
+        "remarks": remarks.strip() or None,
+        "flight_category": None,
+        "unparsed": [],
+    }
+
+    i = 0
+    if tokens and tokens[0] in ("METAR", "SPECI"):
+        result["type"] = tokens[0]
+        i = 1
+    if i < len(tokens) and _STATION.fullmatch(tokens[i]):
+        result["station"] = tokens[i]
+        i += 1
+    if i < len(tokens):
+        match = _TIME.fullmatch(tokens[i])
+        if match:
+            day, hour, minute = (int(g) for g in match.groups())
+            result["time"] = {"day": day, "hour": hour, "minute": minute, "repr": tokens[i]}
+            i += 1
+
+    result.update(decode_groups(tokens[i:]))
+
+    # Prefer the tenths-of-a-degree temperature group from the remarks
+    if remarks:
+        match = _REMARK_TEMPERATURE.search(remarks)
+        if match:
+            sign_t, temp, sign_d, dew = match.groups()
+            result["temperature_c"] = (-1 if sign_t == "1" else 1) * int(temp) / 10
+            result["dewpoint_c"] = (-1 if sign_d == "1" else 1) * int(dew) / 10
+
+    result["flight_category"] = flight_category(result["ceiling_ft"], result["visibility_sm"])
+    return result
+
+
+def _format_visibility(decoded: dict) -> str:
+    value = decoded["visibility_sm"]
+    text = f"{value:g} SM"
+    if decoded["visibility_modifier"] == "greater_than":
+        return f"greater than {text}"
+    if decoded["visibility_modifier"] == "less_than":
+        return f"less than {text}"
+    return text
+
+
+def _format_wind(wind: dict) -> str:
+    if wind["speed_kt"] == 0:
+        return "calm"
+    direction = "variable" if wind["variable"] else f"{wind['direction']:03d}°"
+    text = f"{direction} at {wind['speed_kt']} kt"
+    if wind["gust_kt"]:
+        text += f", gusting {wind['gust_kt']} kt"
+    if wind["variable_from"] is not None:
+        text += f" (varying {wind['variable_from']:03d}°–{wind['variable_to']:03d}°)"
+    return text
+
+
 def interpret_metar(metar: str) -> str:
     if not metar.strip():
         return "❌ No METAR provided for interpretation."
 
-    return (
-        f"📝 Please interpret the following METAR in plain English:\n\n"
-        f"{metar}\n\n"
-        "Break down the wind, visibility, temperature, altimeter setting, cloud layers, and any special weather remarks. "
-        "Mention if conditions are VFR, MVFR, or IFR."
+    decoded = decode_metar(metar)
+    # A station code and at least one decoded observation group, as for TAFs
+    observed = (
+        decoded["wind"] or decoded["visibility_sm"] is not None or decoded["weather"] or decoded["clouds"]
+        or decoded["temperature_c"] is not None or decoded["altimeter_inhg"] is not None
     )
+    if decoded["station"] is None or not observed:
+        return f"⚠️ Could not decode METAR: {metar.strip()}"
+    station = decoded["station"]
+    header = f"📝 Decoded {decoded['type']} for {station}"
+    if decoded["time"]:
+        t = decoded["time"]
+        header += f" (day {t['day']:02d}, {t['hour']:02d}:{t['minute']:02d}Z)"
+
+    lines = [header + ":"]
+    lines.append(f"- Flight category: {decoded['flight_category'] or 'unknown'}")
+    if decoded["wind"]:
+        lines.append(f"- Wind: {_format_wind(decoded['wind'])}")
+    if decoded["visibility_sm"] is not None:
+        lines.append(f"- Visibility: {_format_visibility(decoded)}")
+    for rvr in decoded["rvr"]:
+        value = rvr["low"] + (f" to {rvr['high']}" if rvr["high"] else "")
+        lines.append(f"- RVR runway {rvr['runway']}: {value} {rvr['unit']}")
+    if decoded["weather"]:
+        lines.append("- Weather: " + ", ".join(w["text"] for w in decoded["weather"]))
+    if decoded["clouds"]:
+        layers = []
+        for cloud in decoded["clouds"]:
+            base = f"{cloud['base_ft']:,} ft" if cloud["base_ft"] is not None else "unknown height"
+            layers.append(f"{COVER_TEXT[cloud['cover']]} at {base}" + (f" ({cloud['type']})" if cloud["type"] else ""))
+        lines.append("- Clouds: " + "; ".join(layers))
+    else:
+        lines.append("- Clouds: none reported")
+    lines.append(f"- Ceiling: {decoded['ceiling_ft']:,} ft" if decoded["ceiling_ft"] is not None else "- Ceiling: none")
+    if decoded["temperature_c"] is not None:
+        text = f"- Temperature/Dewpoint: {decoded['temperature_c']:g}°C"
+        if decoded["dewpoint_c"] is not None:
+            spread = decoded["temperature_c"] - decoded["dewpoint_c"]
+            text += f" / {decoded['dewpoint_c']:g}°C (spread {spread:g}°C)"
+        lines.append(text)
+    if decoded["altimeter_inhg"] is not None:
+        lines.append(f"- Altimeter: {decoded['altimeter_inhg']:.2f} inHg")
+    if decoded["trend"]:
+        lines.append(f"- Trend: {decoded['trend']}")
+    if decoded["remarks"]:
+        lines.append(f"- Remarks: {decoded['remarks']}")
+    if decoded["unparsed"]:
+        lines.append(f"- Not decoded: {' '.join(decoded['unparsed'])}")
+    return "\n".join(lines)
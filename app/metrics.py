@@ -0,0 +1,310 @@
+"""
+Lightweight metrics and per-turn tracing for the Aviation Weather Agent
+
+Counters and histograms are kept in process and exposed in the Prometheus
+text format; each user turn can be traced as a tree of timed spans.
+Recording costs one lock and a bisect, so instrumentation stays on in
+production. No third-party client library is needed.
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from config import METRICS_HOST, METRICS_PORT, METRICS_TRACE_HISTORY
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers cache hits (sub-ms) through slow upstreams and LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: Optional[tuple] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for name, value in items)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {value:g}" for key, value in items)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+_registry: dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, help_text: str) -> Counter:
+    return _register(Counter(name, help_text))
+
+
+def histogram(name: str, help_text: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help_text, buckets))
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Shared metrics; modules record into these rather than defining their own
+TOOL_SECONDS = histogram("awa_tool_call_seconds", "Tool execution time by tool")
+TOOL_CALLS = counter("awa_tool_calls_total", "Tool calls by tool and outcome")
+QUEUE_WAIT_SECONDS = histogram("awa_queue_wait_seconds", "Time tasks waited for a worker, by pool")
+HTTP_SECONDS = histogram("awa_http_request_seconds", "Upstream request time including retries, by service")
+HTTP_RESPONSES = counter("awa_http_responses_total", "Upstream responses by service and status code")
+HTTP_RETRIES = counter("awa_http_retries_total", "Upstream request retries by service")
+CACHE_LOOKUPS = counter("awa_cache_lookups_total", "Cache lookups by cache and result")
+LLM_SECONDS = histogram("awa_llm_completion_seconds", "LLM completion time by model", DEFAULT_BUCKETS + (60.0,))
+LLM_FIRST_TOKEN_SECONDS = histogram("awa_llm_first_token_seconds", "Time to first streamed token by model")
+LLM_TOKENS = counter("awa_llm_tokens_total", "LLM tokens by model and kind (prompt/completion)")
+
+
+def record_usage(model: str, usage):
+    """
+    Count prompt and completion tokens from an OpenAI usage block
+    """
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None)
+    completion = getattr(usage, "completion_tokens", None)
+    if prompt:
+        LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, model=model, kind="completion")
+    current_span_attrs(prompt_tokens=prompt, completion_tokens=completion)
+
+
+# 🧵 Tracing
+
+class Trace:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started = time.time()
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return {"id": self.id, "name": self.name, "started": self.started, "spans": spans}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("awa_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("awa_span", default=None)
+recent_traces: deque = deque(maxlen=METRICS_TRACE_HISTORY)
+
+
+@contextmanager
+def trace_turn(name: str = "turn"):
+    """
+    Collect the spans of one user turn; finished traces go to recent_traces
+    """
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        recent_traces.append(trace.to_dict())
+        logger.info(f"Trace {trace.id} {name}: {(time.perf_counter() - start) * 1000:.0f} ms, {len(trace.spans)} spans")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time a block as a span of the current trace; a no-op outside a trace
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    record = {
+        "name": name,
+        "id": uuid.uuid4().hex[:8],
+        "parent": parent["id"] if parent else None,
+        "start_ms": (time.time() - trace.started) * 1000,
+        "attrs": attrs,
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["attrs"]["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration_ms"] = (time.perf_counter() - start) * 1000
+        _current_span.reset(token)
+        trace.add(record)
+
+
+def current_span_attrs(**attrs):
+    """
+    Attach attributes to the innermost open span, if any
+    """
+    record = _current_span.get()
+    if record is not None:
+        record["attrs"].update({k: v for k, v in attrs.items() if v is not None})
+
+
+def submit(executor, pool: str, fn: Callable, *args, **kwargs):
+    """
+    executor.submit that records queue wait and carries the current trace
+
+    Worker threads do not inherit context variables, so the task runs in a
+    copy of the submitter's context and its spans join the same trace.
+    """
+    context = contextvars.copy_context()
+    queued = time.perf_counter()
+
+    def run():
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued, pool=pool)
+        return context.run(fn, *args, **kwargs)
+
+    return executor.submit(run)
+
+
+# 📡 Scrape endpoint
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body = render_metrics().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.startswith("/traces"):
+            body = json.dumps(list(recent_traces)).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> bool:
+    """
+    Serve /metrics and /traces on host:port in a daemon thread, once per process
+
+    Returns:
+        True if the server is running; False if disabled (port 0) or the
+        port is taken (e.g. by another Streamlit worker)
+    """
+    global _server
+    if not port:
+        return False
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning(f"Metrics server not started on port {port}: {e}")
+                return False
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info(f"Metrics on http://{host}:{port}/metrics")
+    return True
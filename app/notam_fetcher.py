@@ -2,44 +2,150 @@
 
 import requests
 import re
-from bs4 import BeautifulSoup
+import time
+from datetime import datetime, timezone
+from typing import Optional
 
-def get_notams(icao: str) -> str:
+import http_client
+from circuit_breaker import serve_stale
+from config import MAX_NOTAMS_DISPLAY, NOTAM_DEFAULT_WINDOW_HOURS, NOTAM_UPDATES_DEFAULT_MINUTES
+from notam_parser import NotamIndex, format_notam, priority
+from notam_store import notam_store
+
+
+def format_notams(icao: str, records: list[dict], keyword: Optional[str] = None,
+                  hours: Optional[float] = None) -> str:
+    """
+    Render the most relevant NOTAMs for the LLM
+    """
+    if not records:
+        return f"✅ No NOTAMs found for {icao}."
+
+    index = NotamIndex(records)
+    window = hours if hours is not None else NOTAM_DEFAULT_WINDOW_HOURS
+    matches = index.query([keyword] if keyword else None, window)
+
+    scope = f"{keyword.upper()} " if keyword else ""
+    if not matches:
+        return f"✅ No {scope}NOTAMs for {icao} active in the next {window:g} hours ({len(index)} total)."
+
+    shown = matches[:MAX_NOTAMS_DISPLAY]
+    header = (
+        f"📢 {scope}NOTAMs for {icao} active in the next {window:g} hours "
+        f"(showing {len(shown)} of {len(matches)}, most relevant first):"
+    )
+    body = "\n\n".join(format_notam(record) for record in shown)
+    if len(matches) > len(shown):
+        counts = ", ".join(f"{k} {n}" for k, n in sorted(index.keywords().items()))
+        body += f"\n\n… {len(matches) - len(shown)} more. Ask for a keyword to narrow down ({counts})."
+    return f"{header}\n\n{body}"
+
+
+def _notam_failure(icao: str, e: requests.exceptions.RequestException,
+                   keyword: Optional[str], hours: Optional[float]) -> str:
+    # Fall back to the last synced snapshot
+    snapshot = notam_store.snapshot(icao)
+    last_good = None
+    if snapshot is not None:
+        last_good = (format_notams(icao, list(snapshot["records"].values()), keyword, hours),
+                     time.time() - snapshot["synced_at"])
+    stale = serve_stale("NOTAM", e, last_good, ("notam", icao),
+                        lambda: notam_store.sync(icao, force=True), http_client.breaker("notam"))
+    if stale is not None:
+        return stale
+    if isinstance(e, requests.exceptions.Timeout):
+        return f"❌ Timeout fetching NOTAMs for {icao}. Please try again."
+    if isinstance(e, requests.exceptions.HTTPError):
+        return f"❌ HTTP error fetching NOTAMs for {icao}: {e}"
+    return f"❌ Network error fetching NOTAMs for {icao}: {e}"
+
+
+def get_notams(icao: str, keyword: Optional[str] = None, hours: Optional[float] = None) -> str:
     # Validate ICAO code
     if not icao or not isinstance(icao, str):
         return "❌ Invalid ICAO code provided."
-    
+
     # Clean and validate ICAO format (4 letters, uppercase)
     icao = icao.strip().upper()
     if not re.match(r'^[A-Z]{4}$', icao):
         return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
-    
-    url = (
-        "https://pilotweb.nas.faa.gov/PilotWeb/notamsRetrievalByICAOAction.do"
-        f"?method=displayByICAOs&reportType=RAW&formatType=DOMESTIC&retrieveLocId={icao}"
-    )
 
     try:
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        snapshot = notam_store.sync(icao)
+        if snapshot is None:
+            return f"⚠️ Could not find NOTAM block for {icao}."
+        return format_notams(icao, list(snapshot["records"].values()), keyword, hours)
+
+    except requests.exceptions.RequestException as e:
+        return _notam_failure(icao, e, keyword, hours)
+    except Exception as e:
+        return f"❌ Unexpected error fetching NOTAMs for {icao}: {e}"
+
+
+async def get_notams_async(icao: str, keyword: Optional[str] = None, hours: Optional[float] = None) -> str:
+    """
+    get_notams for the async API service
+    """
+    if not icao or not isinstance(icao, str):
+        return "❌ Invalid ICAO code provided."
+
+    icao = icao.strip().upper()
+    if not re.match(r'^[A-Z]{4}$', icao):
+        return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
 
-        # Try <pre> tag first
-        pre = soup.find("pre")
-        if not pre:
+    try:
+        snapshot = await notam_store.sync_async(icao)
+        if snapshot is None:
             return f"⚠️ Could not find NOTAM block for {icao}."
+        return format_notams(icao, list(snapshot["records"].values()), keyword, hours)
+
+    except requests.exceptions.RequestException as e:
+        return _notam_failure(icao, e, keyword, hours)
+    except Exception as e:
+        return f"❌ Unexpected error fetching NOTAMs for {icao}: {e}"
+
+
+def get_notam_updates(icao: str, since_minutes: Optional[float] = None) -> str:
+    """
+    Report only NOTAMs that are new, changed or cancelled in the last since_minutes
+    """
+    if not icao or not isinstance(icao, str):
+        return "❌ Invalid ICAO code provided."
 
-        raw_text = pre.get_text().strip()
+    icao = icao.strip().upper()
+    if not re.match(r'^[A-Z]{4}$', icao):
+        return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
 
-        if "NO NOTAM" in raw_text.upper():
-            return f"✅ No NOTAMs found for {icao}."
+    minutes = since_minutes if since_minutes is not None else NOTAM_UPDATES_DEFAULT_MINUTES
+    try:
+        first_check = notam_store.snapshot(icao) is None
+        snapshot = notam_store.sync(icao)
+        if snapshot is None:
+            return f"⚠️ Could not find NOTAM block for {icao}."
+        if first_check:
+            return (
+                f"ℹ️ First NOTAM check for {icao} this session; no earlier snapshot to compare.\n\n"
+                + format_notams(icao, list(snapshot["records"].values()))
+            )
 
-        # Split NOTAMs by double newline
-        notams = [n.strip() for n in raw_text.split("\n\n") if n.strip()]
-        if not notams:
-            return f"✅ No NOTAMs found for {icao}."
+        since = time.time() - minutes * 60
+        changes = notam_store.changes_since(icao, since)
+        checked = datetime.fromtimestamp(snapshot["synced_at"], timezone.utc)
+        total = len(changes["new"]) + len(changes["changed"]) + len(changes["cancelled"])
+        if total == 0:
+            return (
+                f"✅ No NOTAM changes for {icao} in the last {minutes:g} minutes "
+                f"({len(snapshot['records'])} active, checked {checked:%H%MZ})."
+            )
 
-        return f"📢 NOTAMs for {icao}:\n\n" + "\n\n".join(notams[:5])  # Limit to 5
+        lines = [
+            f"🔄 NOTAM changes for {icao} in the last {minutes:g} minutes: "
+            f"{len(changes['new'])} new, {len(changes['changed'])} changed, {len(changes['cancelled'])} cancelled"
+        ]
+        for label, records in (("🆕 New", changes["new"]), ("✏️ Changed", changes["changed"]), ("🚫 Cancelled", changes["cancelled"])):
+            for record in sorted(records, key=priority)[:MAX_NOTAMS_DISPLAY]:
+                lines.append(f"{label}: {record['raw']}")
+        return "\n\n".join(lines)
 
     except requests.exceptions.Timeout:
         return f"❌ Timeout fetching NOTAMs for {icao}. Please try again."
@@ -0,0 +1,288 @@
+# app/notam_parser.py
+
+import html
+import re
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+_PRE_OPEN = re.compile(r"<pre\b[^>]*>", re.IGNORECASE)
+_PRE_CLOSE = re.compile(r"</pre\s*>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+_NOTAM_BREAK = re.compile(r"\n\s*\n|\n(?=[ \t]*!)")
+# Longest opening/closing tag we need to find across a chunk boundary
+_TAG_OVERLAP = 64
+
+# Domestic: !ORD 03/123 ORD RWY 10L/28R CLSD 2403011200-2403012000EST
+_DOMESTIC = re.compile(r"!(?P<account>[A-Z0-9]{3,4})\s+(?P<number>\d{1,2}/\d{1,4})\s+(?P<location>[A-Z0-9]{3,4})\s+(?P<body>.*)", re.DOTALL)
+_DOMESTIC_TIMES = re.compile(r"(?:WEF\s+)?(?P<start>\d{10})(?:-|\s+TIL\s+)(?P<end>\d{10}|PERM)(?P<est>EST)?")
+# ICAO: A1234/24 NOTAMN ... Q) KZAU/QMRLC/... A) KORD B) 2403011200 C) 2403012000 EST E) ...
+_ICAO_HEADER = re.compile(r"(?P<id>[A-Z]\d{4}/\d{2})\s+NOTAM(?P<action>[NRC])(?:\s+(?P<ref>[A-Z]\d{4}/\d{2}))?")
+_ICAO_ITEM = re.compile(r"(?:^|\s)(?P<item>[QABCDEFG])\)\s*")
+_ICAO_START = re.compile(r"(\d{10})")
+_ICAO_END = re.compile(r"(\d{10}|PERM)\s*(EST)?")
+
+# Domestic keywords, most operationally significant first
+KEYWORDS = (
+    "RWY", "AD", "TWY", "APRON", "OBST", "NAV", "IAP", "COM", "SVC",
+    "AIRSPACE", "SID", "STAR", "ODP", "VFP", "ROUTE", "SPECIAL", "SECURITY", "CHART", "DATA",
+)
+KEYWORD_PRIORITY = {keyword: rank for rank, keyword in enumerate(KEYWORDS)}
+_KEYWORD_SET = frozenset(KEYWORDS)
+
+# ICAO Q-code subject prefixes mapped to the domestic keyword
+Q_CODE_KEYWORDS = {
+    "QMR": "RWY", "QMX": "TWY", "QMN": "APRON", "QMA": "AD", "QF": "AD",
+    "QL": "AD", "QOB": "OBST", "QOL": "OBST", "QI": "NAV", "QN": "NAV",
+    "QG": "NAV", "QP": "IAP", "QC": "COM", "QS": "SVC", "QA": "AIRSPACE",
+    "QR": "AIRSPACE", "QW": "AIRSPACE",
+}
+
+CLOSURE_MARKERS = ("CLSD", "CLOSED")
+
+
+def _clean_block(text: str) -> str:
+    return html.unescape(_TAG.sub("", text)).replace("\r\n", "\n").strip()
+
+
+def iter_pre_blocks(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the text of each <pre> element from a stream of HTML text chunks
+
+    Only the contents of <pre> blocks are buffered; everything else is
+    discarded as it streams past, so no DOM is built.
+    """
+    buffer = ""
+    inside = False
+    scanned = 0  # Offset already searched for a closing tag
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if not inside:
+                match = _PRE_OPEN.search(buffer)
+                if match is None:
+                    buffer = buffer[-_TAG_OVERLAP:]
+                    break
+                buffer = buffer[match.end():]
+                inside, scanned = True, 0
+            else:
+                match = _PRE_CLOSE.search(buffer, scanned)
+                if match is None:
+                    scanned = max(0, len(buffer) - _TAG_OVERLAP)
+                    break
+                yield _clean_block(buffer[:match.start()])
+                buffer = buffer[match.end():]
+                inside = False
+    if inside and buffer:
+        yield _clean_block(buffer)
+
+
+def split_notams(block: str) -> list[str]:
+    """
+    Split a raw NOTAM block into individual NOTAM texts
+    """
+    # Blank lines separate ICAO-format NOTAMs; domestic ones each start with "!"
+    parts = _NOTAM_BREAK.split(block)
+    return [" ".join(part.split()) for part in parts if part.strip()]
+
+
+def parse_notam_time(value: str) -> Optional[datetime]:
+    """
+    Parse a YYMMDDHHMM NOTAM time as UTC; returns None for PERM or bad values
+    """
+    try:
+        return datetime.strptime(value, "%y%m%d%H%M").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def _keyword_from_text(text: str) -> str:
+    for word in text.split()[:3]:
+        if word in _KEYWORD_SET:
+            return word
+    return "OTHER"
+
+
+def _record(notam_id, location, keyword, text, effective, expiry, estimated, raw, action="N", replaces=None) -> dict:
+    return {
+        "id": notam_id,
+        "location": location,
+        "keyword": keyword,
+        "text": text,
+        "effective": effective,
+        "expiry": expiry,  # None means permanent
+        "estimated": estimated,
+        "closure": any(marker in text for marker in CLOSURE_MARKERS),
+        "action": action,  # N new, R replacement, C cancellation
+        "replaces": replaces,
+        "raw": raw,
+    }
+
+
+def _parse_domestic(raw: str) -> Optional[dict]:
+    match = _DOMESTIC.match(raw)
+    if not match:
+        return None
+    body = match.group("body")
+    effective = expiry = None
+    estimated = False
+    # The validity period is the last time range; text such as CREATED: may follow it
+    times = None
+    for times in _DOMESTIC_TIMES.finditer(body):
+        pass
+    if times:
+        effective = parse_notam_time(times.group("start"))
+        expiry = parse_notam_time(times.group("end"))
+        estimated = bool(times.group("est"))
+        body = body[:times.start()].rstrip()
+    return _record(
+        f"{match.group('account')} {match.group('number')}",
+        match.group("location"),
+        _keyword_from_text(body),
+        body,
+        effective,
+        expiry,
+        estimated,
+        raw,
+    )
+
+
+def _parse_icao(raw: str) -> Optional[dict]:
+    header = _ICAO_HEADER.search(raw)
+    if not header:
+        return None
+    items = {}
+    positions = list(_ICAO_ITEM.finditer(raw, header.end()))
+    for i, item in enumerate(positions):
+        end = positions[i + 1].start() if i + 1 < len(positions) else len(raw)
+        items[item.group("item")] = raw[item.end():end].strip()
+
+    keyword = None
+    q_fields = items.get("Q", "").split("/")
+    if len(q_fields) > 1:
+        q_code = q_fields[1]
+        keyword = Q_CODE_KEYWORDS.get(q_code[:3]) or Q_CODE_KEYWORDS.get(q_code[:2])
+    text = items.get("E", "")
+
+    start = _ICAO_START.match(items.get("B", ""))
+    end = _ICAO_END.match(items.get("C", ""))
+    return _record(
+        header.group("id"),
+        items.get("A", "").split()[0] if items.get("A") else None,
+        keyword or _keyword_from_text(text),
+        text,
+        parse_notam_time(start.group(1)) if start else None,
+        parse_notam_time(end.group(1)) if end else None,
+        bool(end and end.group(2)),
+        raw,
+        header.group("action"),
+        header.group("ref"),
+    )
+
+
+def parse_notam(raw: str) -> Optional[dict]:
+    """
+    Parse one domestic or ICAO-format NOTAM into a structured record
+
+    Returns:
+        Dict with id, location, keyword, text, effective/expiry (aware UTC
+        datetimes, expiry None if permanent), estimated, closure, action,
+        replaces and raw; or None if the text is not a recognizable NOTAM
+    """
+    raw = raw.strip()
+    if raw.startswith("!"):
+        return _parse_domestic(raw)
+    return _parse_icao(raw)
+
+
+def is_active(record: dict, start: datetime, end: datetime) -> bool:
+    """
+    True if the NOTAM is in effect at any point in [start, end]
+    """
+    effective, expiry = record["effective"], record["expiry"]
+    return (effective is None or effective <= end) and (expiry is None or expiry >= start)
+
+
+def priority(record: dict) -> tuple:
+    """
+    Sort key putting closures and runway/aerodrome NOTAMs first
+    """
+    return (
+        not record["closure"],
+        KEYWORD_PRIORITY.get(record["keyword"], len(KEYWORDS)),
+        record["effective"] or datetime.min.replace(tzinfo=timezone.utc),
+    )
+
+
+class NotamIndex:
+    """
+    NOTAM records indexed by keyword and effective time
+
+    Each keyword's records are kept sorted by effective time so a window
+    query bisects past NOTAMs that start after the window before checking
+    expiry.
+    """
+
+    _EARLIEST = datetime.min.replace(tzinfo=timezone.utc)
+
+    def __init__(self, records: Iterable[dict] = ()):
+        self._by_keyword: dict[str, list[dict]] = {}
+        self._starts: dict[str, list[datetime]] = {}
+        self._count = 0
+        for record in records:
+            self._by_keyword.setdefault(record["keyword"], []).append(record)
+            self._count += 1
+        for keyword, items in self._by_keyword.items():
+            items.sort(key=lambda r: r["effective"] or self._EARLIEST)
+            self._starts[keyword] = [r["effective"] or self._EARLIEST for r in items]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def keywords(self) -> dict[str, int]:
+        return {keyword: len(items) for keyword, items in self._by_keyword.items()}
+
+    def query(self, keywords: Optional[Iterable[str]] = None, hours: Optional[float] = None,
+              closures_only: bool = False, now: Optional[datetime] = None) -> list[dict]:
+        """
+        NOTAMs matching keywords that are active within the next hours
+
+        Args:
+            keywords: Keywords to include (all if None)
+            hours: Window length from now; None means any time
+            closures_only: Only return closures (CLSD)
+            now: Reference time, defaults to the current UTC time
+
+        Returns:
+            Matching records, most relevant first
+        """
+        now = now or datetime.now(timezone.utc)
+        end = now + timedelta(hours=hours) if hours is not None else None
+        selected = self._by_keyword if keywords is None else {
+            k: self._by_keyword[k] for k in (kw.upper() for kw in keywords) if k in self._by_keyword
+        }
+        results = []
+        for keyword, items in selected.items():
+            if end is not None:
+                items = items[:bisect_right(self._starts[keyword], end)]
+            for record in items:
+                if closures_only and not record["closure"]:
+                    continue
+                if end is not None and not is_active(record, now, end):
+                    continue
+                if end is None and record["expiry"] is not None and record["expiry"] < now:
+                    continue
+                results.append(record)
+        results.sort(key=priority)
+        return results
+
+
+def format_notam(record: dict) -> str:
+    """
+    One display line per NOTAM: raw text plus a short validity note
+    """
+    if record["expiry"] is None:
+        validity = "permanent"
+    else:
+        validity = f"until {record['expiry']:%d %b %H%MZ}" + (" (est)" if record["estimated"] else "")
+    return f"{record['raw']}\n  ↳ {record['keyword']}, {validity}"
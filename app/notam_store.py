@@ -0,0 +1,260 @@
+"""
+Per-airport NOTAM snapshots with change tracking for the Aviation Weather Agent
+
+Each sync sends a conditional request (ETag / Last-Modified) and hashes the
+NOTAM block, so an unchanged page is neither re-parsed nor re-diffed. The
+snapshot remembers when every NOTAM was first seen, last changed or
+cancelled, which lets callers ask for only what changed since a time.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Optional
+
+import http_client
+from config import PILOTWEB_URL, NOTAM_SYNC_MIN_INTERVAL, NOTAM_CHANGE_RETENTION
+from notam_parser import iter_pre_blocks, split_notams, parse_notam
+from report_store import report_store
+
+NOTAM_CHUNK_SIZE = 16 * 1024
+
+
+def notam_url(icao: str) -> str:
+    return f"{PILOTWEB_URL}?method=displayByICAOs&reportType=RAW&formatType=DOMESTIC&retrieveLocId={icao}"
+
+
+def parse_notam_blocks(icao: str, blocks: list[str]) -> list[dict]:
+    """
+    Parse the <pre> blocks of a PilotWeb page into NOTAM records
+    """
+    records = []
+    for block in blocks:
+        if "NO NOTAM" in block.upper():
+            continue
+        for raw in split_notams(block):
+            record = parse_notam(raw)
+            if record is None:
+                # Keep unrecognized text rather than silently dropping it
+                record = {"id": None, "location": icao, "keyword": "OTHER", "text": raw,
+                          "effective": None, "expiry": None, "estimated": False,
+                          "closure": "CLSD" in raw, "action": "N", "replaces": None, "raw": raw}
+            records.append(record)
+    return records
+
+
+def _record_key(record: dict) -> str:
+    # Unparsed NOTAMs have no ID; their text is the identity
+    return record["id"] or hashlib.sha1(record["raw"].encode()).hexdigest()[:12]
+
+
+class NotamStore:
+    """
+    Latest NOTAM snapshot per airport, keyed by NOTAM ID
+    """
+
+    def __init__(self, min_interval: float = NOTAM_SYNC_MIN_INTERVAL, retention: float = NOTAM_CHANGE_RETENTION):
+        self.min_interval = min_interval
+        self.retention = retention
+        self._snapshots: dict[str, dict] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._async_locks: dict[str, asyncio.Lock] = {}
+        self.stats = {"syncs": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "skipped": 0}
+
+    def _lock(self, icao: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(icao, threading.Lock())
+
+    def snapshot(self, icao: str) -> Optional[dict]:
+        return self._snapshots.get(icao)
+
+    def sync(self, icao: str, force: bool = False) -> Optional[dict]:
+        """
+        Bring the airport's snapshot up to date
+
+        Skips the network if the last sync was under min_interval ago.
+        Concurrent syncs for one airport share a single request. Raises
+        requests exceptions on network errors.
+
+        Returns:
+            The snapshot dict, or None if the page had no NOTAM block
+        """
+        with self._lock(icao):
+            now = time.time()
+            snapshot, headers = self._begin(icao, force, now)
+            if headers is None:
+                return snapshot
+
+            with http_client.get(notam_url(icao), "notam", headers=headers, stream=True) as response:
+                if response.status_code == 304 and snapshot:
+                    return self._not_modified(snapshot, now)
+                response.raise_for_status()
+                response.encoding = response.encoding or "utf-8"
+                blocks = list(iter_pre_blocks(response.iter_content(NOTAM_CHUNK_SIZE, decode_unicode=True)))
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+            return self._finish(icao, snapshot, blocks, etag, last_modified, now)
+
+    async def sync_async(self, icao: str, force: bool = False) -> Optional[dict]:
+        """
+        sync() for the async API service; the page is fetched through async_http
+        """
+        import async_http
+
+        async with self._async_locks.setdefault(icao, asyncio.Lock()):
+            now = time.time()
+            snapshot, headers = self._begin(icao, force, now)
+            if headers is None:
+                return snapshot
+
+            response = await async_http.get(notam_url(icao), "notam", headers=headers)
+            if response.status_code == 304 and snapshot:
+                return self._not_modified(snapshot, now)
+            response.raise_for_status()
+            blocks = list(iter_pre_blocks([response.text]))
+            return self._finish(icao, snapshot, blocks, response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"), now)
+
+    def _begin(self, icao: str, force: bool, now: float) -> tuple[Optional[dict], Optional[dict]]:
+        """
+        (snapshot, conditional request headers); headers is None when the
+        snapshot is recent enough to skip the network
+        """
+        snapshot = self._snapshots.get(icao)
+        if snapshot is None and not force:
+            snapshot = self._load(icao)
+        if snapshot and not force and now - snapshot["synced_at"] < self.min_interval:
+            self.stats["skipped"] += 1
+            return snapshot, None
+
+        headers = {}
+        if snapshot and snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+        if snapshot and snapshot.get("last_modified"):
+            headers["If-Modified-Since"] = snapshot["last_modified"]
+        self.stats["syncs"] += 1
+        return snapshot, headers
+
+    def _not_modified(self, snapshot: dict, now: float) -> dict:
+        self.stats["not_modified"] += 1
+        snapshot["synced_at"] = now
+        return snapshot
+
+    def _finish(self, icao: str, snapshot: Optional[dict], blocks: list[str],
+                etag: Optional[str], last_modified: Optional[str], now: float) -> Optional[dict]:
+        """
+        Apply a freshly downloaded page to the snapshot
+        """
+        if not blocks:
+            return None
+
+        text = "\n".join(blocks)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        if snapshot and snapshot["digest"] == digest:
+            self.stats["unchanged"] += 1
+            snapshot.update(synced_at=now, etag=etag, last_modified=last_modified)
+        else:
+            self.stats["changed"] += 1
+            snapshot = self._apply(icao, snapshot, parse_notam_blocks(icao, blocks), now)
+            snapshot.update(digest=digest, etag=etag, last_modified=last_modified, observed=now)
+            self._snapshots[icao] = snapshot
+        # One row per distinct NOTAM set; re-syncs only refresh its fetch time
+        report_store.put("notam", icao, text, snapshot["observed"], now + self.min_interval)
+        return snapshot
+
+    def _load(self, icao: str) -> Optional[dict]:
+        """
+        Snapshot from a sync another process stored recently, or None
+        """
+        stored = report_store.get_fresh("notam", icao)
+        if stored is None:
+            return None
+        snapshot = self._apply(icao, None, parse_notam_blocks(icao, [stored["text"]]), stored["fetched_at"])
+        snapshot.update(digest=hashlib.sha256(stored["text"].encode()).hexdigest(),
+                        etag=None, last_modified=None, observed=stored["observed"])
+        self._snapshots[icao] = snapshot
+        return snapshot
+
+    def _apply(self, icao: str, previous: Optional[dict], records: list[dict], now: float) -> dict:
+        """
+        Diff freshly parsed records against the previous snapshot
+        """
+        current = {}
+        cancelled_ids = set()
+        for record in records:
+            if record["action"] == "C":
+                # NOTAMC cancels the NOTAM it references
+                if record["replaces"]:
+                    cancelled_ids.add(record["replaces"])
+                continue
+            current[_record_key(record)] = record
+        # A NOTAMC can sit on the same page as the NOTAM it cancels
+        for key in cancelled_ids & current.keys():
+            del current[key]
+
+        if previous is None:
+            # First sync: everything is baseline, not "new"
+            return {
+                "icao": icao,
+                "records": current,
+                "first_seen": dict.fromkeys(current, None),
+                "changed_at": {},
+                "cancelled": {},
+                "synced_at": now,
+            }
+
+        first_seen = {}
+        changed_at = {}
+        for key, record in current.items():
+            old = previous["records"].get(key)
+            first_seen[key] = previous["first_seen"].get(key, now) if old is not None else now
+            if old is not None and old["raw"] != record["raw"]:
+                changed_at[key] = now
+            elif key in previous["changed_at"]:
+                changed_at[key] = previous["changed_at"][key]
+
+        cancelled = {
+            key: entry for key, entry in previous["cancelled"].items()
+            if now - entry["at"] < self.retention and key not in current
+        }
+        for key, record in previous["records"].items():
+            if key not in current:
+                cancelled[key] = {"record": record, "at": now}
+
+        return {
+            "icao": icao,
+            "records": current,
+            "first_seen": first_seen,
+            "changed_at": changed_at,
+            "cancelled": cancelled,
+            "synced_at": now,
+        }
+
+    def changes_since(self, icao: str, since: float) -> Optional[dict]:
+        """
+        NOTAMs that appeared, changed or were cancelled after since
+
+        Args:
+            icao: Airport code
+            since: Epoch seconds
+
+        Returns:
+            Dict with new, changed and cancelled record lists, or None if the
+            airport has never been synced
+        """
+        snapshot = self._snapshots.get(icao)
+        if snapshot is None:
+            return None
+        records = snapshot["records"]
+        seen = snapshot["first_seen"]
+        new = [record for k, record in records.items() if seen.get(k) is not None and seen[k] > since]
+        new_keys = {_record_key(r) for r in new}
+        changed = [records[k] for k, at in snapshot["changed_at"].items()
+                   if at > since and k in records and k not in new_keys]
+        cancelled = [entry["record"] for entry in snapshot["cancelled"].values() if entry["at"] > since]
+        return {"new": new, "changed": changed, "cancelled": cancelled}
+
+
+# Shared by get_notams and get_notam_updates
+notam_store = NotamStore()
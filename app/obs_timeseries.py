@@ -0,0 +1,325 @@
+"""
+Per-station time series of decoded METAR fields for trend questions
+
+Each station gets a fixed-size ring buffer: one float64 column of
+observation times and a float32 matrix with one column per field (NaN
+where a METAR omits it). Queries slice the ring and compute trends,
+extremes and rates with NumPy, so "is the pressure falling at KBFI?" is
+answered from numbers instead of comparing raw strings.
+
+A station costs OBS_SERIES_CAPACITY * (8 + 4 * len(FIELDS)) bytes, about
+5 KB at the default 128 slots, so 5,000 stations fit in ~25 MB.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from config import OBS_SERIES_CAPACITY, OBS_SERIES_MAX_STATIONS, OBS_TREND_DEFAULT_HOURS, OBS_TREND_MAX_HOURS
+from metar_interpreter import decode_metar
+from taf_interpreter import resolve_time
+from utils import validate_icao
+
+FIELDS = ("wind_dir", "wind_kt", "gust_kt", "visibility_sm", "ceiling_ft", "temperature_c", "dewpoint_c", "altimeter_inhg")
+_COLUMN = {name: index for index, name in enumerate(FIELDS)}
+
+# Tool field name -> (column, label, unit, format)
+QUERY_FIELDS = {
+    "wind": ("wind_kt", "Wind speed", "kt", "{:.0f}"),
+    "gust": ("gust_kt", "Gusts", "kt", "{:.0f}"),
+    "visibility": ("visibility_sm", "Visibility", "SM", "{:g}"),
+    "ceiling": ("ceiling_ft", "Ceiling", "ft", "{:.0f}"),
+    "temperature": ("temperature_c", "Temperature", "°C", "{:.0f}"),
+    "dewpoint": ("dewpoint_c", "Dewpoint", "°C", "{:.0f}"),
+    "altimeter": ("altimeter_inhg", "Altimeter", "inHg", "{:.2f}"),
+}
+# Unlimited ceiling is stored as this so it plots as "high" rather than missing
+NO_CEILING_FT = 99999.0
+
+
+def observation_values(decoded: dict) -> np.ndarray:
+    """
+    One row of FIELDS from a decode_metar result
+    """
+    row = np.full(len(FIELDS), np.nan, dtype=np.float32)
+    wind = decoded.get("wind") or {}
+    for name, value in (
+        ("wind_dir", wind.get("direction")),
+        ("wind_kt", wind.get("speed_kt")),
+        # No gust group means no gusts, not an unknown value
+        ("gust_kt", (wind.get("gust_kt") or 0) if wind else None),
+        ("visibility_sm", decoded.get("visibility_sm")),
+        ("ceiling_ft", decoded.get("ceiling_ft")),
+        ("temperature_c", decoded.get("temperature_c")),
+        ("dewpoint_c", decoded.get("dewpoint_c")),
+        ("altimeter_inhg", decoded.get("altimeter_inhg")),
+    ):
+        if value is not None:
+            row[_COLUMN[name]] = value
+    if decoded.get("ceiling_ft") is None and decoded.get("visibility_sm") is not None:
+        # A decoded report without BKN/OVC/VV has no ceiling
+        row[_COLUMN["ceiling_ft"]] = NO_CEILING_FT
+    return row
+
+
+class StationSeries:
+    """
+    Fixed-capacity ring of observations for one station, oldest overwritten first
+    """
+
+    def __init__(self, capacity: int = OBS_SERIES_CAPACITY):
+        self.times = np.full(capacity, np.nan, dtype=np.float64)
+        self.values = np.full((capacity, len(FIELDS)), np.nan, dtype=np.float32)
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+
+    @property
+    def latest_time(self) -> float:
+        return self.times[(self._next - 1) % self.capacity] if self.count else -np.inf
+
+    def append(self, observed: float, row: np.ndarray) -> bool:
+        """
+        Add an observation; a repeat of the latest time replaces it (corrections),
+        older ones are ignored. Returns True if stored.
+        """
+        latest = self.latest_time
+        if observed < latest:
+            return False
+        if observed == latest:
+            self.values[(self._next - 1) % self.capacity] = row
+            return True
+        self.times[self._next] = observed
+        self.values[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def latest_row(self) -> np.ndarray:
+        return self.values[(self._next - 1) % self.capacity]
+
+    def window(self, since: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (times, values) observed at or after since, oldest first (copies)
+        """
+        order = (np.arange(self.count) + self._next - self.count) % self.capacity
+        times = self.times[order]
+        keep = times >= since
+        return times[keep], self.values[order][keep]
+
+
+class ObservationSeries:
+    """
+    Ring buffers for up to max_stations stations; the least recently updated
+    station is dropped when full
+    """
+
+    def __init__(self, capacity: int = OBS_SERIES_CAPACITY, max_stations: int = OBS_SERIES_MAX_STATIONS):
+        self.capacity = capacity
+        self.max_stations = max_stations
+        self._stations: OrderedDict[str, StationSeries] = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0  # Bumped on every stored observation
+
+    def __contains__(self, icao: str) -> bool:
+        return icao in self._stations
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def latest_time(self, icao: str) -> float:
+        series = self._stations.get(icao)
+        return series.latest_time if series is not None else -np.inf
+
+    def record(self, icao: str, metar: str, observed: Optional[float] = None) -> bool:
+        """
+        Decode a METAR and add it to the station's series
+
+        Args:
+            icao: Station code
+            metar: Raw METAR text
+            observed: Epoch seconds if already known; reports not newer than the
+                station's latest are then skipped without decoding
+
+        Returns:
+            True if the observation was stored
+        """
+        if observed is not None and observed <= self.latest_time(icao):
+            return False
+        decoded = decode_metar(metar)
+        if observed is None:
+            if not decoded["time"]:
+                return False
+            t = decoded["time"]
+            observed = resolve_time(t["day"], t["hour"], t["minute"], datetime.now(timezone.utc)).timestamp()
+        row = observation_values(decoded)
+        # append() only accepts newer rows, so a new station's stored
+        # history has to go in before this observation
+        history = self._history(icao, before=observed) if icao not in self._stations else []
+        with self._lock:
+            series = self._stations.get(icao)
+            if series is None:
+                series = self._add_series(icao, history)
+            stored = series.append(observed, row)
+            if stored:
+                self._stations.move_to_end(icao)
+                self.version += 1
+            return stored
+
+    def seed(self, icao: str):
+        """
+        Create a station's series from stored history if it has none yet
+        """
+        if icao in self._stations:
+            return
+        history = self._history(icao)
+        with self._lock:
+            if history and icao not in self._stations:
+                self._add_series(icao, history)
+
+    def _history(self, icao: str, before: float = np.inf) -> list[tuple[float, np.ndarray]]:
+        """
+        Decoded METARs from the persistent report store for the last
+        OBS_TREND_MAX_HOURS, observed before before, oldest first
+        """
+        from report_store import report_store
+
+        since = datetime.now(timezone.utc).timestamp() - OBS_TREND_MAX_HOURS * 3600
+        return [
+            (row["observed"], observation_values(decode_metar(row["text"])))
+            for row in report_store.history("metar", icao, since)
+            if row["observed"] is not None and row["observed"] < before
+        ]
+
+    def _add_series(self, icao: str, history: list[tuple[float, np.ndarray]]) -> StationSeries:
+        # Called with the lock held
+        if len(self._stations) >= self.max_stations:
+            self._stations.popitem(last=False)
+        series = self._stations[icao] = StationSeries(self.capacity)
+        for observed, row in history:
+            series.append(observed, row)
+        if history:
+            self.version += 1
+        return series
+
+    def window(self, icao: str, hours: float, now: Optional[float] = None) -> tuple[np.ndarray, np.ndarray]:
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        with self._lock:
+            series = self._stations.get(icao)
+            if series is None:
+                return np.empty(0), np.empty((0, len(FIELDS)), dtype=np.float32)
+            return series.window(now - hours * 3600)
+
+    def latest(self) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """
+        (icaos, times, values) of every station's newest observation
+        """
+        with self._lock:
+            icaos = list(self._stations)
+            series = list(self._stations.values())
+            times = np.fromiter((s.latest_time for s in series), dtype=np.float64, count=len(series))
+            values = np.array([s.latest_row() for s in series], dtype=np.float32).reshape(len(series), len(FIELDS))
+        return icaos, times, values
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(s.times.nbytes + s.values.nbytes for s in self._stations.values())
+
+
+def field_stats(times: np.ndarray, column: np.ndarray) -> Optional[dict]:
+    """
+    Latest, first, min/max with times and least-squares rate per hour over
+    the non-missing values of one column
+    """
+    valid = ~np.isnan(column)
+    if not valid.any():
+        return None
+    t, v = times[valid], column[valid].astype(np.float64)
+    stats = {
+        "count": int(v.size),
+        "first": v[0], "first_time": t[0],
+        "latest": v[-1], "latest_time": t[-1],
+        "min": v.min(), "min_time": t[v.argmin()],
+        "max": v.max(), "max_time": t[v.argmax()],
+        "rate_per_hour": None,
+    }
+    if v.size >= 2 and t[-1] > t[0]:
+        hours = (t - t[0]) / 3600.0
+        stats["rate_per_hour"] = float(np.polyfit(hours, v, 1)[0])
+    return stats
+
+
+def _hhmm(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%d/%H%MZ")
+
+
+def _describe(name: str, times: np.ndarray, column: np.ndarray) -> Optional[str]:
+    field, label, unit, fmt = QUERY_FIELDS[name]
+    ceiling = field == "ceiling_ft"
+    stats = field_stats(times, column)
+    if stats is None:
+        return None
+
+    def value(v):
+        return "none" if ceiling and v >= NO_CEILING_FT else f"{fmt.format(v)} {unit}"
+
+    line = (
+        f"- {label}: now {value(stats['latest'])} ({_hhmm(stats['latest_time'])}), "
+        f"was {value(stats['first'])} ({_hhmm(stats['first_time'])}); "
+        f"min {value(stats['min'])} at {_hhmm(stats['min_time'])}, max {value(stats['max'])} at {_hhmm(stats['max_time'])}"
+    )
+    rate = stats["rate_per_hour"]
+    if rate is not None and not (ceiling and stats["max"] >= NO_CEILING_FT):
+        line += f"; trend {rate:+.{3 if field == 'altimeter_inhg' else 1}f} {unit}/h"
+    if ceiling:
+        # When did it go above/below the VFR ceiling (3000 ft)?
+        valid = ~np.isnan(column)
+        above = column[valid] >= 3000
+        flips = np.flatnonzero(above[1:] != above[:-1])
+        if flips.size:
+            index = flips[-1] + 1
+            direction = "lifted above" if above[index] else "dropped below"
+            line += f"; {direction} 3000 ft at {_hhmm(times[valid][index])}"
+    return line
+
+
+def weather_trend(icao: str, field: Optional[str] = None, hours: Optional[float] = None) -> str:
+    """
+    Summarize how observed conditions at an airport have changed
+    """
+    valid, result = validate_icao(icao)
+    if not valid:
+        return result
+    icao = result
+    if field is not None and field not in QUERY_FIELDS:
+        return f"❌ Unknown field: {field}. Use one of {', '.join(QUERY_FIELDS)}."
+    window = max(1.0, min(hours if hours is not None else OBS_TREND_DEFAULT_HOURS, OBS_TREND_MAX_HOURS))
+
+    obs_series.seed(icao)
+    times, values = obs_series.window(icao, window)
+    if times.size < 2:
+        return (
+            f"⚠️ Not enough observations for {icao} in the last {window:g} hours "
+            f"({times.size} stored). Trends build up as METARs are fetched."
+        )
+
+    names = [field] if field else list(QUERY_FIELDS)
+    lines = [f"📈 {icao} observed trend, last {window:g} hours ({times.size} METARs):"]
+    for name in names:
+        line = _describe(name, times, values[:, _COLUMN[QUERY_FIELDS[name][0]]])
+        if line:
+            lines.append(line)
+    if field == "altimeter" or field is None:
+        altimeter = field_stats(times, values[:, _COLUMN["altimeter_inhg"]])
+        if altimeter and altimeter["rate_per_hour"] is not None:
+            # Three-hour tendency of 0.06 inHg (~2 hPa) or more is notable
+            tendency = altimeter["rate_per_hour"] * 3
+            if abs(tendency) >= 0.06:
+                lines.append(f"⚠️ Pressure {'falling' if tendency < 0 else 'rising'} rapidly ({tendency:+.2f} inHg/3h)")
+    return "\n".join(lines)
+
+
+# Fed by fetch_metar and bulk ingest, and seeded from the report store
+obs_series = ObservationSeries()
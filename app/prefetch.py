@@ -0,0 +1,193 @@
+"""
+Speculative weather prefetch for airports mentioned in a user message
+
+While the model decides which tools to call, the METAR/TAF/NOTAMs for any
+ICAO codes in the user's text are fetched in the background. Matching tool
+calls are then served from the in-flight or completed results.
+"""
+import asyncio
+import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+import metrics
+from config import PREFETCH_ENABLED, PREFETCH_TOOLS, PREFETCH_MAX_STATIONS, PREFETCH_MAX_WORKERS
+from stations import station_db
+from tool_registry import is_async
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\b[A-Za-z]{4}\b")
+# Unknown codes are only trusted when written in capitals with a common ICAO prefix
+_LIKELY_ICAO = re.compile(r"[KPC][A-Z]{3}")
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+
+# Process-wide outcome counters
+prefetch_stats = {"started": 0, "hits": 0, "wasted": 0, "cancelled": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome: str, amount: int = 1):
+    with _stats_lock:
+        prefetch_stats[outcome] += amount
+
+
+def extract_icao_codes(text: str, limit: int = PREFETCH_MAX_STATIONS) -> list[str]:
+    """
+    Find likely ICAO airport codes in free text, in order of appearance
+
+    A word counts if it is a known station (any case) or an all-caps
+    four-letter word with a K, P or C prefix.
+    """
+    codes = []
+    for match in _WORD.finditer(text or ""):
+        word = match.group(0)
+        code = word.upper()
+        if code in codes:
+            continue
+        if code in station_db or (word.isupper() and _LIKELY_ICAO.fullmatch(word)):
+            codes.append(code)
+            if len(codes) >= limit:
+                break
+    return codes
+
+
+class Prefetcher:
+    """
+    Speculative fetches for one user turn
+
+    Use dispatch() in place of the normal tool dispatcher so matching tool
+    calls pick up the prefetched results, and call close() when the turn
+    ends to cancel leftovers and log wasted fetches.
+    """
+
+    def __init__(self, dispatch: Callable[[str, dict], str], tools: tuple = PREFETCH_TOOLS):
+        self._dispatch = dispatch
+        self._tools = tools
+        self._futures: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def start(self, text: str) -> "Prefetcher":
+        """
+        Begin prefetching for the ICAO codes found in text
+        """
+        if not PREFETCH_ENABLED:
+            return self
+        for icao in extract_icao_codes(text):
+            for tool in self._tools:
+                key = (tool, icao)
+                future = metrics.submit(_executor, "prefetch", self._dispatch, tool, {"icao": icao})
+                with self._lock:
+                    self._futures[key] = future
+                _count("started")
+        if self._futures:
+            logger.info(f"Prefetch started: {sorted(self._futures)}")
+        return self
+
+    def _take(self, func_name: str, args: dict) -> Optional[Future]:
+        icao = args.get("icao")
+        if not isinstance(icao, str) or set(args) != {"icao"}:
+            return None
+        with self._lock:
+            return self._futures.pop((func_name, icao.strip().upper()), None)
+
+    def dispatch(self, func_name: str, args: dict) -> str:
+        """
+        Serve a tool call from a prefetched result when one exists
+        """
+        future = self._take(func_name, args)
+        if future is not None and future.cancel():
+            # Still queued behind other sessions' prefetches; fetching now is quicker
+            _count("cancelled")
+            future = None
+        if future is not None and not future.cancelled():
+            try:
+                result = future.result()
+                _count("hits")
+                logger.info(f"Prefetch hit: {func_name} {args['icao'].strip().upper()}")
+                return result
+            except Exception as e:
+                logger.warning(f"Prefetch failed for {func_name} {args['icao']}: {e}; fetching again")
+        return self._dispatch(func_name, args)
+
+    def close(self):
+        """
+        Cancel prefetches that have not started and log unused results
+        """
+        with self._lock:
+            leftovers, self._futures = self._futures, {}
+        for (tool, icao), future in leftovers.items():
+            if future.cancel():
+                _count("cancelled")
+                logger.info(f"Prefetch cancelled: {tool} {icao}")
+            else:
+                # Completed or in-flight results still warm the report caches
+                _count("wasted")
+                logger.info(f"Prefetch wasted: {tool} {icao}")
+
+
+_background: set = set()
+
+
+class AsyncPrefetcher:
+    """
+    Prefetcher for the async API service
+
+    Prefetches run as tasks on the event loop, for the PREFETCH_TOOLS that
+    have a coroutine version.
+    """
+
+    def __init__(self, dispatch: Callable[[str, dict], Awaitable[str]], tools: tuple = PREFETCH_TOOLS):
+        self._dispatch = dispatch
+        self._tools = tuple(tool for tool in tools if is_async(tool))
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+        self._started: set = set()
+
+    def start(self, text: str) -> "AsyncPrefetcher":
+        if not PREFETCH_ENABLED:
+            return self
+        for icao in extract_icao_codes(text):
+            for tool in self._tools:
+                self._tasks[(tool, icao)] = asyncio.ensure_future(self._run(tool, icao))
+                _count("started")
+        return self
+
+    async def _run(self, tool: str, icao: str) -> str:
+        self._started.add((tool, icao))
+        return await self._dispatch(tool, {"icao": icao})
+
+    async def dispatch(self, func_name: str, args: dict) -> str:
+        icao = args.get("icao")
+        task = None
+        if isinstance(icao, str) and set(args) == {"icao"}:
+            key = (func_name, icao.strip().upper())
+            task = self._tasks.pop(key, None)
+            if task is not None and key not in self._started:
+                # Not running yet, so awaiting it would only add a wait
+                task.cancel()
+                _count("cancelled")
+                task = None
+        if task is not None:
+            try:
+                result = await task
+                _count("hits")
+                return result
+            except Exception as e:
+                logger.warning(f"Prefetch failed for {func_name} {icao}: {e}; fetching again")
+        return await self._dispatch(func_name, args)
+
+    def close(self):
+        """
+        Drop unused prefetches; in-flight ones finish in the background and
+        still warm the report caches
+        """
+        leftovers, self._tasks = self._tasks, {}
+        for task in leftovers.values():
+            _count("wasted")
+            if not task.done():
+                # The loop only keeps weak references to tasks
+                _background.add(task)
+                task.add_done_callback(_background.discard)
@@ -0,0 +1,237 @@
+"""
+Watchlist refresher for the Aviation Weather Agent
+
+Keeps the METAR and TAF of a fixed list of airports warm in the report
+cache. Each report is refetched shortly after its cache entry expires,
+which is tied to the issuance cycle (METARs from :50, TAFs every six hours
+with a short cap to catch amendments), so user tool calls find a fresh
+local copy. Due times are kept in a heap and spread with jitter; a token
+bucket caps the upstream request rate and a small pool bounds concurrency.
+
+Run headless with:
+    python app/refresher.py KSEA KPDX ...
+"""
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from config import (
+    ICAO_PATTERN,
+    WATCHLIST,
+    WATCHLIST_FILE,
+    REFRESH_PRODUCTS,
+    REFRESH_JITTER_SECONDS,
+    REFRESH_RETRY_SECONDS,
+    REFRESH_EMPTY_SECONDS,
+    REFRESH_RATE_PER_SECOND,
+    REFRESH_BURST,
+    REFRESH_MAX_WORKERS,
+)
+from circuit_breaker import STALE_PREFIX
+from metrics import counter
+from report_cache import report_cache
+from tool_registry import dispatch
+
+logger = logging.getLogger(__name__)
+
+REFRESHES = counter("awa_refresh_total", "Watchlist refreshes by product and outcome")
+
+
+def load_watchlist(path: Optional[str] = WATCHLIST_FILE, codes: Iterable[str] = WATCHLIST) -> list[str]:
+    """
+    Watchlist from config plus an optional file, de-duplicated in order
+
+    Blank lines and text after # in the file are ignored.
+    """
+    entries = list(codes)
+    if path:
+        with open(path) as f:
+            entries += [line.split("#", 1)[0].strip().upper() for line in f]
+    watchlist = []
+    for code in entries:
+        if re.match(ICAO_PATTERN, code) and code not in watchlist:
+            watchlist.append(code)
+    return watchlist
+
+
+class TokenBucket:
+    """
+    Blocking rate limiter allowing bursts of up to capacity
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> bool:
+        """
+        Take one token, waiting if needed; returns False if stop is set first
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop is not None and stop.wait(wait):
+                return False
+            if stop is None:
+                time.sleep(wait)
+
+
+class Refresher:
+    """
+    Scheduler that refreshes every (tool, airport) pair near its next issuance
+    """
+
+    def __init__(self, stations: Iterable[str], products: dict = REFRESH_PRODUCTS,
+                 rate: float = REFRESH_RATE_PER_SECOND, burst: int = REFRESH_BURST,
+                 max_workers: int = REFRESH_MAX_WORKERS, jitter: float = REFRESH_JITTER_SECONDS):
+        self.stations = list(stations)
+        self.products = products
+        self.jitter = jitter
+        self.stats = {"ok": 0, "empty": 0, "error": 0}
+        self._bucket = TokenBucket(rate, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        # Bounds submitted-but-unfinished tasks so the heap, not the pool
+        # queue, holds the backlog
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._heap: list[tuple[float, int, str, str]] = []
+        self._sequence = itertools.count()
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # First pass is spread over the jitter window instead of all at once
+        now = time.time()
+        for icao in self.stations:
+            for tool in products:
+                self._schedule(now + random.uniform(0, jitter), tool, icao)
+
+    def _schedule(self, due: float, tool: str, icao: str):
+        with self._wake:
+            heapq.heappush(self._heap, (due, next(self._sequence), tool, icao))
+            self._wake.notify()
+
+    def _next_due(self, tool: str, icao: str, outcome: str) -> float:
+        now = time.time()
+        base = now + (REFRESH_EMPTY_SECONDS if outcome == "empty" else REFRESH_RETRY_SECONDS)
+        if outcome == "ok":
+            # The cache expiry already encodes the next expected issuance
+            expires = report_cache.expires_at((self.products[tool], icao))
+            if expires is not None and expires > now:
+                base = expires
+        return base + random.uniform(0, self.jitter)
+
+    def _refresh(self, tool: str, icao: str):
+        try:
+            result = dispatch(tool, {"icao": icao})
+            if not isinstance(result, str) or result.startswith(("❌", STALE_PREFIX)):
+                outcome = "error"
+            else:
+                # Other warnings mean the station has no such report
+                outcome = "empty" if result.startswith("⚠️") else "ok"
+        except Exception as e:
+            logger.warning(f"Refresh {tool} {icao} failed: {e}")
+            outcome = "error"
+        finally:
+            self._slots.release()
+        with self._wake:
+            self.stats[outcome] += 1
+        REFRESHES.inc(product=self.products[tool], outcome=outcome)
+        self._schedule(self._next_due(tool, icao, outcome), tool, icao)
+
+    def run(self):
+        """
+        Scheduling loop; returns when stop() is called
+        """
+        logger.info(f"Refreshing {len(self.stations)} watchlist airports: {', '.join(self.stations[:10])}"
+                    + (" …" if len(self.stations) > 10 else ""))
+        while not self._stop.is_set():
+            with self._wake:
+                while not self._stop.is_set():
+                    wait = self._heap[0][0] - time.time() if self._heap else None
+                    if wait is not None and wait <= 0:
+                        _, _, tool, icao = heapq.heappop(self._heap)
+                        break
+                    self._wake.wait(wait)
+                else:
+                    return
+            self._slots.acquire()
+            if not self._bucket.acquire(self._stop):
+                self._slots.release()
+                return
+            self._executor.submit(self._refresh, tool, icao)
+
+    def start(self) -> "Refresher":
+        self._thread = threading.Thread(target=self.run, name="refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def start_refresher(stations: Optional[Iterable[str]] = None) -> bool:
+    """
+    Start the process-wide refresher for the configured watchlist, once
+
+    Returns:
+        True if the refresher is running; False if the watchlist is empty
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            try:
+                watchlist = load_watchlist(codes=stations) if stations is not None else load_watchlist()
+            except OSError as e:
+                logger.error(f"Could not read watchlist file: {e}")
+                return False
+            if not watchlist:
+                return False
+            _refresher = Refresher(watchlist).start()
+    return True
+
+
+if __name__ == "__main__":
+    import sys
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from config import BULK_INGEST_ENABLED
+    from metrics import start_metrics_server
+
+    start_metrics_server()
+    if BULK_INGEST_ENABLED:
+        from bulk_ingest import start_background_refresh
+        start_background_refresh()
+
+    codes = [code.upper() for code in sys.argv[1:]]
+    if not start_refresher(codes or None):
+        print("❌ Watchlist is empty. Set WATCHLIST, WATCHLIST_FILE or pass ICAO codes.")
+        sys.exit(1)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n👋 Refresher stopped")
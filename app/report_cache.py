@@ -0,0 +1,171 @@
+"""
+In-process report cache for the Aviation Weather Agent
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Hashable, Optional
+
+from config import (
+    REPORT_CACHE_MAX_ENTRIES,
+    METAR_ISSUE_MINUTE,
+    METAR_CACHE_DEFAULT_TTL,
+    METAR_CACHE_MIN_TTL,
+    METAR_CACHE_MAX_TTL,
+    TAF_ISSUE_INTERVAL_HOURS,
+    TAF_CACHE_DEFAULT_TTL,
+    TAF_CACHE_MIN_TTL,
+    TAF_CACHE_MAX_TTL,
+    STALE_MAX_AGE,
+)
+from metrics import CACHE_LOOKUPS
+
+
+class ReportCache:
+    """
+    Thread-safe LRU cache whose entries expire at an absolute wall-clock time
+    """
+
+    def __init__(self, max_entries: int = REPORT_CACHE_MAX_ENTRIES, name: str = "reports"):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for key, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                # Expired entries stay until evicted so get_stale can serve them
+                self.misses += 1
+                value, result = None, "miss"
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value, result = entry[0], "hit"
+        CACHE_LOOKUPS.inc(cache=self.name, result=result)
+        return value
+
+    def get_stale(self, key: Hashable, max_age: float = STALE_MAX_AGE) -> Optional[tuple[Any, float]]:
+        """
+        Return (value, age in seconds) for key even if expired, or None if
+        missing or stored more than max_age seconds ago
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry[2]
+        return (entry[0], age) if age <= max_age else None
+
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        """
+        Return the epoch time key expires (or expired) at, or None if missing
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any, expires_at: float):
+        """
+        Store value under key until the epoch time expires_at
+        """
+        with self._lock:
+            self._entries[key] = (value, expires_at, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return size and hit/miss counters for monitoring
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def parse_report_time(value) -> Optional[datetime]:
+    """
+    Parse an AVWX time block ({"dt": "2024-06-01T14:53:00Z", ...}) or ISO string
+
+    Returns:
+        Timezone-aware UTC datetime, or None if the value cannot be parsed
+    """
+    if isinstance(value, dict):
+        value = value.get("dt")
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _clamp_expiry(expires: Optional[datetime], now: float, default_ttl: int, min_ttl: int, max_ttl: int) -> float:
+    if expires is None:
+        return now + default_ttl
+    ttl = expires.timestamp() - now
+    return now + max(min_ttl, min(ttl, max_ttl))
+
+
+def metar_expiry(observed: Optional[datetime], now: Optional[float] = None) -> float:
+    """
+    Compute when a cached METAR should expire
+
+    Routine METARs are issued shortly before the hour, so an observation is
+    considered current until the next :METAR_ISSUE_MINUTE boundary after it.
+    """
+    now = time.time() if now is None else now
+    expires = None
+    if observed is not None:
+        expires = observed.replace(minute=METAR_ISSUE_MINUTE, second=0, microsecond=0)
+        if expires <= observed:
+            expires += timedelta(hours=1)
+    return _clamp_expiry(expires, now, METAR_CACHE_DEFAULT_TTL, METAR_CACHE_MIN_TTL, METAR_CACHE_MAX_TTL)
+
+
+def taf_expiry(issued: Optional[datetime], now: Optional[float] = None) -> float:
+    """
+    Compute when a cached TAF should expire
+
+    TAFs are reissued every TAF_ISSUE_INTERVAL_HOURS, but amendments can
+    appear at any time, so the TTL is capped at TAF_CACHE_MAX_TTL.
+    """
+    now = time.time() if now is None else now
+    expires = None
+    if issued is not None:
+        expires = issued + timedelta(hours=TAF_ISSUE_INTERVAL_HOURS)
+    return _clamp_expiry(expires, now, TAF_CACHE_DEFAULT_TTL, TAF_CACHE_MIN_TTL, TAF_CACHE_MAX_TTL)
+
+
+# Shared cache used by the METAR and TAF fetchers, keyed by (product, icao)
+report_cache = ReportCache()
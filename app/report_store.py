@@ -0,0 +1,275 @@
+"""
+Persistent report store shared by every process on a host
+
+METAR, TAF and NOTAM results are written to a SQLite database in WAL mode,
+keyed by product, station and observation time. Readers in any process
+(CLI, Streamlit, the headless refresher) see the same warm data without
+blocking the writer, and the rows double as a rolling history. Writes are
+queued and committed in batches by one background thread.
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import (
+    REPORT_STORE_ENABLED,
+    REPORT_STORE_PATH,
+    REPORT_STORE_RETENTION_HOURS,
+    REPORT_STORE_BATCH_SIZE,
+    REPORT_STORE_FLUSH_INTERVAL,
+    REPORT_STORE_FLUSH_TIMEOUT,
+    STALE_MAX_AGE,
+    REPORT_HISTORY_DEFAULT_HOURS,
+)
+from report_cache import report_cache
+from utils import validate_icao
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    product TEXT NOT NULL,
+    icao TEXT NOT NULL,
+    observed REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (product, icao, observed)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS reports_fetched ON reports (fetched_at);
+"""
+
+PRUNE_INTERVAL = 3600  # Seconds between retention sweeps
+
+
+class ReportStore:
+    """
+    SQLite-backed report history with a batched background writer
+
+    Every method degrades to a no-op (reads return None or []) when the
+    store is disabled or the database cannot be opened, so callers never
+    need to check.
+    """
+
+    def __init__(self, path: str = REPORT_STORE_PATH, enabled: bool = REPORT_STORE_ENABLED,
+                 retention_hours: float = REPORT_STORE_RETENTION_HOURS):
+        self.path = path
+        self.enabled = enabled
+        self.retention = retention_hours * 3600
+        self.stats = {"written": 0, "batches": 0, "read_hits": 0, "read_misses": 0}
+        self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._last_prune = 0.0
+        if enabled:
+            try:
+                self._init_db()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Report store disabled, cannot open {path}: {e}")
+                self.enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL is crash-safe with NORMAL; FULL would fsync every batch
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _init_db(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        # SQLite connections are not shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    # -- writes -----------------------------------------------------------
+
+    def put(self, product: str, icao: str, text: str, observed: Optional[float], expires_at: float):
+        """
+        Queue a report for writing; observed defaults to the fetch time
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        self._queue.put((product, icao, observed if observed is not None else now, now, expires_at, text))
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="report-store", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self):
+        connection = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + REPORT_STORE_FLUSH_INTERVAL
+            while len(batch) < REPORT_STORE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                if connection is None:
+                    connection = self._connect()
+                self._write(connection, batch)
+            except (OSError, sqlite3.Error) as e:
+                # Drop the batch but keep draining, so flush() is never left waiting
+                logger.error(f"Report store unavailable, dropped {len(batch)} rows: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, connection: sqlite3.Connection, batch: list[tuple]):
+        try:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    "INSERT OR REPLACE INTO reports (product, icao, observed, fetched_at, expires_at, text) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+                if time.time() - self._last_prune > PRUNE_INTERVAL:
+                    connection.execute("DELETE FROM reports WHERE fetched_at < ?", (time.time() - self.retention,))
+                    self._last_prune = time.time()
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except sqlite3.Error as e:
+            logger.error(f"Report store write of {len(batch)} rows failed: {e}")
+
+    def flush(self, timeout: float = REPORT_STORE_FLUSH_TIMEOUT) -> bool:
+        """
+        Block until every queued report has been written, or timeout passes
+
+        Returns:
+            True if the queue drained in time
+        """
+        if self._writer is None:
+            return True
+        end = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Report store flush gave up with {self._queue.unfinished_tasks} rows queued")
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    # -- reads ------------------------------------------------------------
+
+    def _query(self, sql: str, params: tuple) -> list[tuple]:
+        if not self.enabled:
+            return []
+        try:
+            return self._reader().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Report store read failed: {e}")
+            return []
+
+    def latest(self, product: str, icao: str) -> Optional[dict]:
+        """
+        Newest stored report for the station, fresh or not, or None
+        """
+        rows = self._query(
+            "SELECT observed, fetched_at, expires_at, text FROM reports "
+            "WHERE product = ? AND icao = ? ORDER BY observed DESC LIMIT 1",
+            (product, icao),
+        )
+        if not rows:
+            return None
+        observed, fetched_at, expires_at, text = rows[0]
+        return {"observed": observed, "fetched_at": fetched_at, "expires_at": expires_at, "text": text}
+
+    def get_fresh(self, product: str, icao: str) -> Optional[dict]:
+        """
+        Newest report if it has not expired, e.g. one another process fetched
+        """
+        record = self.latest(product, icao)
+        if record is None or record["expires_at"] <= time.time():
+            self.stats["read_misses"] += 1
+            return None
+        self.stats["read_hits"] += 1
+        return record
+
+    def last_good(self, product: str, icao: str, max_age: float) -> Optional[tuple[str, float]]:
+        """
+        (text, age in seconds) of the newest report fetched within max_age, for stale serving
+        """
+        record = self.latest(product, icao)
+        if record is None:
+            return None
+        age = time.time() - record["fetched_at"]
+        return (record["text"], age) if age <= max_age else None
+
+    def history(self, product: str, icao: str, since: float) -> list[dict]:
+        """
+        Reports observed at or after since (epoch seconds), oldest first
+        """
+        rows = self._query(
+            "SELECT observed, text FROM reports WHERE product = ? AND icao = ? AND observed >= ? ORDER BY observed",
+            (product, icao, since),
+        )
+        return [{"observed": observed, "text": text} for observed, text in rows]
+
+
+# Shared by the fetchers; one writer thread per process
+report_store = ReportStore()
+atexit.register(report_store.flush)
+
+
+def last_good(product: str, icao: str, max_age: float = STALE_MAX_AGE) -> Optional[tuple[str, float]]:
+    """
+    Last good report for stale serving: this process's cache first, then the
+    store, which survives restarts and sees other processes' fetches
+    """
+    return report_cache.get_stale((product, icao), max_age) or report_store.last_good(product, icao, max_age)
+
+
+def get_report_history(icao: str, product: str = "metar", hours: Optional[float] = None) -> str:
+    """
+    Stored METARs or TAFs for an airport over the last hours, oldest first
+    """
+    valid, result = validate_icao(icao)
+    if not valid:
+        return result
+    icao = result
+    if product not in ("metar", "taf"):
+        return f"❌ Unknown product: {product}. Use metar or taf."
+    if not report_store.enabled:
+        return "⚠️ Report history is not available (report store disabled)."
+
+    window = hours if hours is not None else REPORT_HISTORY_DEFAULT_HOURS
+    window = max(0.5, min(window, REPORT_STORE_RETENTION_HOURS))
+    rows = report_store.history(product, icao, time.time() - window * 3600)
+    label = product.upper()
+    if not rows:
+        return f"⚠️ No stored {label}s for {icao} in the last {window:g} hours. Fetch the current report instead."
+
+    lines = [f"🕒 {label} history for {icao}, last {window:g} hours ({len(rows)} reports, oldest first):"]
+    for row in rows:
+        text = row["text"]
+        if text.startswith("📄 TAF for"):
+            # Drop the header line the fetcher adds
+            text = text.partition("\n")[2]
+        text = " ".join(text.split())
+        lines.append(f"- {time.strftime('%d %H%MZ', time.gmtime(row['observed']))}: {text}")
+    return "\n".join(lines)
@@ -0,0 +1,208 @@
+"""
+Corridor weather briefing for a flight between two airports
+
+Finds the stations along the great-circle track, fetches their reports
+concurrently and returns one compact, category-annotated summary, so a
+cross-country briefing needs a single tool call.
+"""
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import requests
+
+import metrics
+from circuit_breaker import split_stale
+from config import (
+    ROUTE_DEFAULT_CORRIDOR_NM,
+    ROUTE_MAX_CORRIDOR_NM,
+    ROUTE_MAX_STATIONS,
+    ROUTE_MAX_WORKERS,
+    ROUTE_FETCH_DEADLINE,
+    ROUTE_TAF_HOURS,
+    ROUTE_NOTAM_HOURS,
+)
+from metar_interpreter import decode_metar
+from stations import station_db, lookup_station
+from taf_interpreter import parse_taf, build_timeline, CATEGORY_RANK
+from tool_registry import dispatch
+from utils import haversine_nm, track_offsets_nm
+
+# Separate from the tool executor so a briefing never waits on its own pool
+_executor = ThreadPoolExecutor(max_workers=ROUTE_MAX_WORKERS, thread_name_prefix="route")
+
+
+def _midpoint(start: tuple[float, float], end: tuple[float, float]) -> tuple[float, float]:
+    phi1, lambda1 = math.radians(start[0]), math.radians(start[1])
+    phi2, dlambda = math.radians(end[0]), math.radians(end[1] - start[1])
+    bx = math.cos(phi2) * math.cos(dlambda)
+    by = math.cos(phi2) * math.sin(dlambda)
+    phi = math.atan2(math.sin(phi1) + math.sin(phi2), math.hypot(math.cos(phi1) + bx, by))
+    lam = lambda1 + math.atan2(by, math.cos(phi1) + bx)
+    return math.degrees(phi), (math.degrees(lam) + 540) % 360 - 180
+
+
+def corridor_stations(departure: dict, destination: dict, corridor_nm: float,
+                      limit: int = ROUTE_MAX_STATIONS) -> list[dict]:
+    """
+    Stations along the track, departure first and destination last
+
+    Intermediate stations must be within corridor_nm of the great-circle
+    track and between the endpoints. When there are more than fit in
+    limit, the track is split into equal segments and the station closest
+    to the track is taken from each.
+    """
+    start = (departure["latitude"], departure["longitude"])
+    end = (destination["latitude"], destination["longitude"])
+    total = haversine_nm(*start, *end)
+    center = _midpoint(start, end)
+
+    candidates = []
+    for record in station_db.within(*center, total / 2 + corridor_nm,
+                                    exclude=(departure["icao"], destination["icao"])):
+        along, cross = track_offsets_nm(start, end, (record["latitude"], record["longitude"]))
+        if 0 <= along <= total and cross <= corridor_nm:
+            candidates.append({**record, "along_nm": along, "cross_nm": cross})
+
+    slots = max(0, limit - 2)
+    if len(candidates) > slots:
+        best = {}
+        for record in candidates:
+            segment = min(slots - 1, int(record["along_nm"] / total * slots)) if total else 0
+            if segment not in best or record["cross_nm"] < best[segment]["cross_nm"]:
+                best[segment] = record
+        candidates = list(best.values())
+    candidates.sort(key=lambda r: r["along_nm"])
+
+    return (
+        [{**departure, "along_nm": 0.0, "cross_nm": 0.0}]
+        + candidates
+        + [{**destination, "along_nm": total, "cross_nm": 0.0}]
+    )
+
+
+def _metar_line(station: dict, result: Optional[str]) -> tuple[str, Optional[str]]:
+    position = f"{station['along_nm']:.0f} nm"
+    if station["cross_nm"] >= 1:
+        position += f", {station['cross_nm']:.0f} nm off track"
+    result, stale = split_stale(result or "")
+    if not result or result.startswith(("❌", "⚠️")):
+        return f"- {station['icao']} ({position}): no METAR", None
+    category = decode_metar(result)["flight_category"]
+    note = " (stale)" if stale else ""
+    return f"- {station['icao']} ({position}): {category or 'unknown'}{note} — {result}", category
+
+
+def _taf_line(icao: str, result: Optional[str]) -> str:
+    result, stale = split_stale(result or "")
+    if not result or result.startswith(("❌", "⚠️")):
+        return f"- {icao}: no TAF"
+    if stale:
+        icao += " (stale)"
+    lines = result.strip().splitlines()
+    source = ""
+    nearby = re.search(r"found nearby at ([A-Z0-9]{4})", lines[0])
+    if nearby:
+        source = f" (from {nearby.group(1)})"
+    raw = " ".join(lines[1:]) if lines[0].startswith("📄") else result
+
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    end = now + timedelta(hours=ROUTE_TAF_HOURS)
+    window = [e for e in build_timeline(parse_taf(raw)) if now <= e["time"] < end]
+    if not window:
+        return f"- {icao}{source}: TAF does not cover the next {ROUTE_TAF_HOURS} h"
+
+    prevailing = min((e["flight_category"] for e in window if e["flight_category"]),
+                     key=CATEGORY_RANK.get, default=None)
+    worst = min((e["worst_category"] for e in window if e["worst_category"]),
+                key=CATEGORY_RANK.get, default=None)
+    line = f"- {icao}{source} next {ROUTE_TAF_HOURS} h: {prevailing or 'unknown'}"
+    if worst and worst != prevailing:
+        kinds = sorted({o["type"] for e in window for o in e["temporary"] if o["flight_category"] == worst})
+        line += f", {worst} possible ({'/'.join(kinds)})"
+    return line
+
+
+def _closures(icao: str) -> list[str]:
+    from notam_parser import NotamIndex
+    from notam_store import notam_store
+
+    try:
+        snapshot = notam_store.sync(icao)
+    except requests.exceptions.RequestException:
+        # Closures from the last good sync beat none at all
+        snapshot = notam_store.snapshot(icao)
+    if snapshot is None:
+        return []
+    index = NotamIndex(snapshot["records"].values())
+    return [r["raw"] for r in index.query(["RWY", "AD"], ROUTE_NOTAM_HOURS, closures_only=True)]
+
+
+def _result(future, deadline: float):
+    # Missing or failed reports are shown as gaps rather than failing the briefing
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except Exception:
+        return None
+
+
+def route_briefing(departure: str, destination: str, corridor_nm: Optional[float] = None) -> str:
+    """
+    METARs along the route, endpoint TAF outlook and endpoint closures in one summary
+    """
+    codes = []
+    for code in (departure, destination):
+        if not code or not isinstance(code, str):
+            return "❌ Invalid ICAO code provided."
+        code = code.strip().upper()
+        if not re.match(r'^[A-Z]{4}$', code):
+            return f"❌ Invalid ICAO format: {code}. Must be 4 letters (e.g., KSEA, KSFO)."
+        codes.append(code)
+
+    # Airports missing from the bundled table are resolved through AVWX,
+    # the same lookup the nearby-TAF search uses
+    lookups = [metrics.submit(_executor, "route", lookup_station, code) for code in codes]
+    endpoints = [future.result() for future in lookups]
+    missing = [code for code, record in zip(codes, endpoints) if record is None]
+    if missing:
+        return f"❌ Unknown airport(s) {', '.join(missing)}: not in the station database or the AVWX station API."
+
+    corridor = ROUTE_DEFAULT_CORRIDOR_NM if corridor_nm is None else min(max(float(corridor_nm), 0.0), ROUTE_MAX_CORRIDOR_NM)
+    stations = corridor_stations(endpoints[0], endpoints[1], corridor)
+    total = stations[-1]["along_nm"]
+
+    deadline = time.monotonic() + ROUTE_FETCH_DEADLINE
+    metars = [metrics.submit(_executor, "route", dispatch, "fetch_metar", {"icao": s["icao"]}) for s in stations]
+    tafs = [metrics.submit(_executor, "route", dispatch, "get_taf", {"icao": code}) for code in codes]
+    closures = [metrics.submit(_executor, "route", _closures, code) for code in codes]
+
+    lines = []
+    worst = None
+    for station, future in zip(stations, metars):
+        line, category = _metar_line(station, _result(future, deadline))
+        lines.append(line)
+        if category and (worst is None or CATEGORY_RANK[category] < CATEGORY_RANK[worst[0]]):
+            worst = (category, station["icao"])
+
+    header = f"🧭 Route briefing {codes[0]} → {codes[1]} ({total:.0f} nm, corridor ±{corridor:g} nm, {len(stations)} stations)"
+    output = [header]
+    if worst:
+        output.append(f"Worst current category along route: {worst[0]} at {worst[1]}")
+    output.append("\nCurrent conditions (along-track distance):")
+    output.extend(lines)
+
+    output.append("\nTerminal forecasts:")
+    output.extend(_taf_line(code, _result(future, deadline)) for code, future in zip(codes, tafs))
+
+    closure_lines = []
+    for code, future in zip(codes, closures):
+        for raw in (_result(future, deadline) or [])[:3]:
+            closure_lines.append(f"- {code}: {raw}")
+    if closure_lines:
+        output.append(f"\nRunway/aerodrome closures in the next {ROUTE_NOTAM_HOURS} h:")
+        output.extend(closure_lines)
+
+    return "\n".join(output)
@@ -0,0 +1,300 @@
+"""
+Offline station database with a spatial index for nearest-airport queries
+"""
+import csv
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from typing import Iterable, Optional
+
+from config import (
+    AVWX_BASE_URL,
+    STATION_DB_PATH,
+    STATION_INDEX_CELL_DEGREES,
+    STATION_LOOKUP_TIMEOUT,
+    STATION_LOOKUP_MISS_TTL,
+)
+from utils import haversine_nm, EARTH_RADIUS_NM
+
+logger = logging.getLogger(__name__)
+
+NM_PER_DEGREE = math.pi * EARTH_RADIUS_NM / 180
+
+
+class StationDatabase:
+    """
+    Station table (ICAO, name, position, elevation, timezone, TAF flag)
+    bucketed into a fixed lat/lon grid
+
+    The table is loaded on first use. Coordinates are kept in compact
+    array columns and each grid cell holds the row numbers of its stations,
+    so nearest and radius queries only touch a handful of cells. Stations
+    missing from the bundled file can be added later (see lookup_station).
+    """
+
+    def __init__(self, path: str = STATION_DB_PATH, cell_degrees: float = STATION_INDEX_CELL_DEGREES):
+        self.path = path
+        self.cell_degrees = cell_degrees
+        self._lon_cells = int(math.ceil(360 / cell_degrees))
+        self._lat_cells = int(math.ceil(180 / cell_degrees))
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            icaos, names, timezones = [], [], []
+            latitudes, longitudes, elevations = array("d"), array("d"), array("d")
+            has_taf = bytearray()
+            self._icaos, self._names, self._timezones = icaos, names, timezones
+            self._latitudes, self._longitudes, self._elevations = latitudes, longitudes, elevations
+            self._has_taf = has_taf
+            self._by_icao, self._grid = {}, {}
+            self._bundled = 0
+
+            with open(self.path, encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        latitude = float(row["latitude"])
+                        longitude = float(row["longitude"])
+                    except (TypeError, ValueError):
+                        continue
+                    self._insert(
+                        row["icao"].strip().upper(), row.get("name", ""), latitude, longitude,
+                        float(row.get("elevation_ft") or 0), row.get("timezone", ""),
+                        row.get("has_taf", "").strip() in ("1", "true", "True"),
+                    )
+            self._bundled = len(icaos)
+            self._loaded = True
+
+    def _insert(self, icao: str, name: str, latitude: float, longitude: float,
+                elevation_ft: float, timezone: str, has_taf: bool):
+        # Columns first, so a reader that finds the row in the grid can read it
+        index = len(self._icaos)
+        self._icaos.append(icao)
+        self._names.append(name)
+        self._timezones.append(timezone)
+        self._latitudes.append(latitude)
+        self._longitudes.append(longitude)
+        self._elevations.append(elevation_ft)
+        self._has_taf.append(1 if has_taf else 0)
+        self._grid.setdefault(self._cell(latitude, longitude), []).append(index)
+        self._by_icao[icao] = index
+
+    def add(self, icao: str, name: str, latitude: float, longitude: float,
+            elevation_ft: float = 0.0, timezone: str = "", has_taf: bool = False) -> dict:
+        """
+        Add a station that is not in the bundled table and return its record
+        """
+        self._load()
+        icao = icao.strip().upper()
+        with self._lock:
+            if icao not in self._by_icao:
+                self._insert(icao, name, latitude, longitude, elevation_ft, timezone, has_taf)
+            return self._record(self._by_icao[icao])
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        row = min(int((latitude + 90) // self.cell_degrees), self._lat_cells - 1)
+        col = int((longitude + 180) // self.cell_degrees) % self._lon_cells
+        return row, col
+
+    def _record(self, index: int, distance_nm: Optional[float] = None) -> dict:
+        record = {
+            "icao": self._icaos[index],
+            "name": self._names[index],
+            "latitude": self._latitudes[index],
+            "longitude": self._longitudes[index],
+            "elevation_ft": self._elevations[index],
+            "timezone": self._timezones[index],
+            "has_taf": bool(self._has_taf[index]),
+            # "table" for the bundled file, "avwx" for stations added later
+            "source": "table" if index < self._bundled else "avwx",
+        }
+        if distance_nm is not None:
+            record["distance_nm"] = round(distance_nm, 1)
+        return record
+
+    def _ring(self, center: tuple[int, int], radius: int) -> Iterable[tuple[int, int]]:
+        """
+        Yield grid cells exactly `radius` cells from center
+        """
+        row0, col0 = center
+        if 2 * radius - 1 >= self._lon_cells:
+            # The previous square already wrapped every column, so only the
+            # two new rows hold unseen cells
+            for row in (row0 - radius, row0 + radius):
+                if 0 <= row < self._lat_cells:
+                    yield from ((row, col) for col in range(self._lon_cells))
+            return
+        for row in range(row0 - radius, row0 + radius + 1):
+            if row < 0 or row >= self._lat_cells:
+                continue
+            edge = row in (row0 - radius, row0 + radius)
+            cols = range(col0 - radius, col0 + radius + 1) if edge else (col0 - radius, col0 + radius)
+            for col in cols:
+                yield row, col % self._lon_cells
+
+    def _matches(self, index: int, taf_only: bool, exclude: set) -> bool:
+        return (not taf_only or self._has_taf[index]) and self._icaos[index] not in exclude
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._icaos)
+
+    def __contains__(self, icao: str) -> bool:
+        self._load()
+        return isinstance(icao, str) and icao.strip().upper() in self._by_icao
+
+    def get(self, icao: str) -> Optional[dict]:
+        """
+        Look up a station by ICAO code
+        """
+        self._load()
+        if not isinstance(icao, str):
+            return None
+        index = self._by_icao.get(icao.strip().upper())
+        return None if index is None else self._record(index)
+
+    def distance_nm(self, icao1: str, icao2: str) -> Optional[float]:
+        """
+        Great-circle distance between two stations, or None if either is unknown
+        """
+        first, second = self.get(icao1), self.get(icao2)
+        if not first or not second:
+            return None
+        return haversine_nm(first["latitude"], first["longitude"], second["latitude"], second["longitude"])
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5,
+                taf_only: bool = False, exclude: Iterable[str] = ()) -> list[dict]:
+        """
+        Return the k stations closest to a point, nearest first
+
+        Args:
+            latitude, longitude: Query point in decimal degrees
+            k: Number of stations to return
+            taf_only: Only return stations that issue TAFs
+            exclude: ICAO codes to skip (e.g. the query airport itself)
+        """
+        self._load()
+        exclude = {code.upper() for code in exclude}
+        center = self._cell(latitude, longitude)
+        found = []
+        visited = set()
+        examined = 0
+        total = len(self._icaos)
+        # Beyond this radius the rings cover every row and wrap every column
+        max_radius = max(center[0], self._lat_cells - 1 - center[0], self._lon_cells // 2)
+
+        for radius in range(max_radius + 1):
+            for cell in self._ring(center, radius):
+                # Rings wrap around the antimeridian, so skip cells seen before
+                if cell in visited:
+                    continue
+                visited.add(cell)
+                stations = self._grid.get(cell, ())
+                examined += len(stations)
+                for index in stations:
+                    if self._matches(index, taf_only, exclude):
+                        distance = haversine_nm(latitude, longitude, self._latitudes[index], self._longitudes[index])
+                        found.append((distance, index))
+            if len(found) >= k:
+                found.sort()
+                # Anything in the next ring is at least `radius` whole cells
+                # away; longitude cells shrink toward the poles.
+                edge_latitude = min(89.9, abs(latitude) + (radius + 1) * self.cell_degrees)
+                bound = radius * self.cell_degrees * NM_PER_DEGREE * math.cos(math.radians(edge_latitude))
+                if found[k - 1][0] <= bound:
+                    break
+            if examined >= total:
+                break
+
+        found.sort()
+        return [self._record(index, distance) for distance, index in found[:k]]
+
+    def within(self, latitude: float, longitude: float, radius_nm: float,
+               taf_only: bool = False, exclude: Iterable[str] = ()) -> list[dict]:
+        """
+        Return all stations within radius_nm of a point, nearest first
+        """
+        self._load()
+        exclude = {code.upper() for code in exclude}
+        dlat = radius_nm / NM_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.9, abs(latitude) + dlat)))
+        dlon = min(180.0, dlat / max(cos_lat, 1e-6))
+
+        row_min, col_min = self._cell(max(-90.0, latitude - dlat), longitude - dlon)
+        row_max, _ = self._cell(min(90.0, latitude + dlat), longitude + dlon)
+        col_span = min(self._lon_cells - 1, int(math.ceil(2 * dlon / self.cell_degrees)) + 1)
+
+        found = []
+        for row in range(row_min, row_max + 1):
+            for offset in range(col_span + 1):
+                for index in self._grid.get((row, (col_min + offset) % self._lon_cells), ()):
+                    if not self._matches(index, taf_only, exclude):
+                        continue
+                    distance = haversine_nm(latitude, longitude, self._latitudes[index], self._longitudes[index])
+                    if distance <= radius_nm:
+                        found.append((distance, index))
+
+        found.sort()
+        return [self._record(index, distance) for distance, index in found]
+
+
+# Shared station database, loaded on first query
+station_db = StationDatabase()
+
+_misses: dict[str, float] = {}
+
+
+def station_from_avwx(data: dict) -> Optional[dict]:
+    """
+    Add a station from an AVWX /station response to station_db; None without a position
+    """
+    icao = data.get("icao")
+    latitude, longitude = data.get("latitude"), data.get("longitude")
+    if not isinstance(icao, str) or latitude is None or longitude is None:
+        return None
+    return station_db.add(icao, data.get("name") or "", float(latitude), float(longitude),
+                          float(data.get("elevation_ft") or 0))
+
+
+def lookup_station(icao: str, timeout: float = STATION_LOOKUP_TIMEOUT) -> Optional[dict]:
+    """
+    Look up a station in the bundled table, falling back to the AVWX station API
+
+    Stations found through AVWX are added to station_db so later nearest
+    and radius queries include them. Unknown codes are remembered for
+    STATION_LOOKUP_MISS_TTL seconds; network failures are not.
+    """
+    station = station_db.get(icao)
+    if station is not None or not isinstance(icao, str):
+        return station
+    icao = icao.strip().upper()
+    api_key = os.getenv("AVWX_API_KEY")
+    if not api_key or time.monotonic() - _misses.get(icao, float("-inf")) < STATION_LOOKUP_MISS_TTL:
+        return None
+
+    # Imported here so loading the table (e.g. for prefetch at startup) does not load requests
+    import requests
+    import http_client
+
+    try:
+        response = http_client.get(f"{AVWX_BASE_URL}/station/{icao}", "station", timeout=timeout,
+                                   headers={"Authorization": api_key, "Accept": "application/json"})
+        if response.status_code in (400, 404):
+            _misses[icao] = time.monotonic()
+            return None
+        response.raise_for_status()
+        station = station_from_avwx(response.json())
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"Station lookup failed for {icao}: {e}")
+        return None
+    if station is None:
+        _misses[icao] = time.monotonic()
+    return station
@@ -37,12 +37,186 @@
 
 #     except Exception as e:
 #         return f"❌ Error fetching TAF for `{icao}`: {e}"
-
 # app/taf_fetcher.py
 
+import asyncio
 import os
 import requests
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import http_client
+from config import AVWX_BASE_URL, TAF_TIMEOUT, NEARBY_AIRPORT_RADIUS, TAF_NEARBY_SEARCH_DEADLINE
+from report_cache import report_cache, parse_report_time, taf_expiry
+from report_store import report_store, last_good
+from bulk_ingest import bulk_store
+from circuit_breaker import serve_stale
+from stations import station_db, lookup_station
+from utils import haversine_nm
+
+def _response_json(response) -> dict:
+    # AVWX answers 204 No Content when a station has no current report
+    if response.status_code == 204 or not response.content:
+        return {}
+    return response.json()
+
+def _nearby_candidates(icao: str, latitude: float, longitude: float, nearby_airports: list) -> list[str]:
+    """
+    Return nearby ICAO codes sorted by distance from the primary airport
+    """
+    candidates = []
+    for index, item in enumerate(nearby_airports):
+        # Accept both bare station objects and {"station": {...}, "nautical_miles": n}
+        station = item.get("station", item)
+        nearby_icao = station.get("icao")
+        if not nearby_icao or nearby_icao == icao:
+            continue
+        distance = item.get("nautical_miles")
+        if distance is None and station.get("latitude") is not None and station.get("longitude") is not None:
+            distance = haversine_nm(latitude, longitude, station["latitude"], station["longitude"])
+        candidates.append((distance if distance is not None else float("inf"), index, nearby_icao))
+    return [nearby_icao for _, _, nearby_icao in sorted(candidates)]
+
+def _offline_candidates(icao: str):
+    """
+    Nearby TAF-issuing stations from the bundled station database, or None
+    if the airport is not in it
+    """
+    station = station_db.get(icao)
+    # The bundled table only covers its own region well, so airports added
+    # from AVWX are searched through AVWX too
+    if station is None or station["source"] != "table":
+        return None
+    nearby = station_db.nearest(station["latitude"], station["longitude"],
+                                k=NEARBY_AIRPORT_RADIUS, taf_only=True, exclude=[icao])
+    return [s["icao"] for s in nearby]
+
+def _avwx_candidates(icao: str, headers: dict, deadline: float):
+    """
+    Nearby stations from the AVWX station API, or None if the airport's
+    position is unknown or the deadline has passed
+    """
+    station = lookup_station(icao, timeout=min(TAF_TIMEOUT, TAF_NEARBY_SEARCH_DEADLINE))
+    remaining = deadline - time.monotonic()
+    if station is None or remaining <= 0:
+        return None
+
+    latitude, longitude = station["latitude"], station["longitude"]
+    nearby_url = f"{AVWX_BASE_URL}/station?near={latitude},{longitude}&n={NEARBY_AIRPORT_RADIUS}"
+    response = http_client.get(nearby_url, "station", headers=headers, timeout=min(TAF_TIMEOUT, remaining))
+    response.raise_for_status()
+    return _nearby_candidates(icao, latitude, longitude, response.json())
+
+def _probe_taf(nearby_icao: str, headers: dict, timeout: float):
+    """
+    Fetch the TAF for a nearby station; returns the response data or None
+    """
+    url = f"{AVWX_BASE_URL}/taf/{nearby_icao}"
+    response = http_client.get(url, "taf_nearby", headers=headers, timeout=timeout, retries=0)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    data = _response_json(response)
+    return data if data.get("raw") else None
+
+def _closest_finished(candidates: list[str], futures: list):
+    """
+    (icao, data) for the closest probe that has already returned a TAF, or
+    None; works for both thread futures and asyncio tasks
+    """
+    for nearby_icao, future in zip(candidates, futures):
+        if future.done() and not future.cancelled() and future.exception() is None and future.result():
+            return nearby_icao, future.result()
+    return None
+
+def _find_nearby_taf(candidates: list[str], headers: dict, deadline: float):
+    """
+    Probe candidate stations concurrently and return (icao, data) for the
+    closest one with a TAF, or None if none answers before the deadline.
+
+    Results are consumed in distance order, so a farther station that
+    answers first only wins once every closer station is known to have no
+    TAF. Remaining probes are cancelled as soon as a winner is found. When
+    the deadline passes first, the closest probe that already found a TAF wins.
+    """
+    if not candidates:
+        return None
+
+    probe_timeout = max(0.1, min(TAF_TIMEOUT, deadline - time.monotonic()))
+    executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="taf-probe")
+    try:
+        futures = [executor.submit(_probe_taf, c, headers, probe_timeout) for c in candidates]
+        for nearby_icao, future in zip(candidates, futures):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return _closest_finished(candidates, futures)
+            try:
+                data = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                return _closest_finished(candidates, futures)
+            except Exception:
+                # One failing neighbour must not abort the whole search
+                continue
+            if data:
+                return nearby_icao, data
+        return None
+    finally:
+        # In-flight requests finish in the background; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _local_taf(icao: str):
+    """
+    TAF from the cache, the shared store or bulk ingest, or None
+    """
+    cached = report_cache.get(("taf", icao))
+    if cached is not None:
+        return cached
+
+    stored = report_store.get_fresh("taf", icao)
+    if stored is not None:
+        report_cache.put(("taf", icao), stored["text"], stored["expires_at"])
+        return stored["text"]
+
+    bulk = bulk_store.get_record("taf", icao)
+    if bulk is not None:
+        taf_text = f"📄 TAF for {icao}:\n{bulk['raw']}"
+        report_cache.put(("taf", icao), taf_text, bulk["expires_at"])
+        return taf_text
+    return None
+
+def _headers(api_key: str) -> dict:
+    return {
+        "Authorization": api_key,
+        "Accept": "application/json",
+        "User-Agent": "AviationWeatherAgent/1.0"
+    }
+
+def _remember(icao: str, taf_text: str, data: dict) -> str:
+    """
+    Cache and store a TAF answer for icao, issued at the TAF's own time
+    """
+    issued = parse_report_time(data.get("time"))
+    expires_at = taf_expiry(issued)
+    report_cache.put(("taf", icao), taf_text, expires_at)
+    report_store.put("taf", icao, taf_text, issued.timestamp() if issued else None, expires_at)
+    return taf_text
+
+def _failure(icao: str, e: requests.exceptions.RequestException) -> str:
+    stale = serve_stale("TAF", e, last_good("taf", icao), ("taf", icao),
+                        lambda: get_taf(icao), http_client.breaker("taf"))
+    if stale is not None:
+        return stale
+    if isinstance(e, requests.exceptions.Timeout):
+        return f"❌ Timeout fetching TAF for {icao}. Please try again."
+    if isinstance(e, requests.exceptions.HTTPError):
+        status_code = e.response.status_code if e.response is not None else None
+        if status_code == 404:
+            return f"⚠️ TAF not found for {icao}. Please verify the airport code."
+        elif status_code == 401:
+            return f"❌ Authentication failed. Please check your AVWX API key."
+        else:
+            return f"❌ HTTP error {status_code} for {icao}: {e}"
+    return f"❌ Network error fetching TAF for {icao}: {e}"
 
 def get_taf(icao: str) -> str:
     """
@@ -58,69 +232,160 @@ def get_taf(icao: str) -> str:
     if not re.match(r'^[A-Z]{4}$', icao):
         return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
     
+    local = _local_taf(icao)
+    if local is not None:
+        return local
+
     api_key = os.getenv("AVWX_API_KEY")
     if not api_key:
         return "❌ AVWX API key not set in environment."
 
-    base_url = f"https://avwx.rest/api/taf/{icao}"
-    headers = {
-        "Authorization": api_key,
-        "Accept": "application/json",
-        "User-Agent": "AviationWeatherAgent/1.0"
-    }
+    base_url = f"{AVWX_BASE_URL}/taf/{icao}"
+    headers = _headers(api_key)
 
     try:
         # First try for the given airport
-        response = requests.get(base_url, headers=headers, timeout=10)
+        response = http_client.get(base_url, "taf", headers=headers)
         response.raise_for_status()
-        data = response.json()
+        data = _response_json(response)
 
         raw = data.get("raw", "")
         if raw:
-            return f"📄 TAF for {icao}:\n{raw}"
+            return _remember(icao, f"📄 TAF for {icao}:\n{raw}", data)
 
-        # No TAF found for primary, now search vicinity
-        search_url = f"https://avwx.rest/api/station/{icao}"
-        station_response = requests.get(search_url, headers=headers, timeout=10)
-        station_response.raise_for_status()
-        station_data = station_response.json()
-
-        latitude = station_data.get("latitude")
-        longitude = station_data.get("longitude")
-        if not latitude or not longitude:
+        # No TAF found for primary, now search vicinity within one deadline
+        deadline = time.monotonic() + TAF_NEARBY_SEARCH_DEADLINE
+        candidates = _offline_candidates(icao)
+        if candidates is None:
+            candidates = _avwx_candidates(icao, headers, deadline)
+        if candidates is None:
             return f"⚠️ No TAF available for {icao}, and unable to find nearby airports."
 
-        # Search nearby airports within 20NM
-        nearby_url = f"https://avwx.rest/api/station?near={latitude},{longitude}&n=10"
-        nearby_response = requests.get(nearby_url, headers=headers, timeout=10)
-        nearby_response.raise_for_status()
-        nearby_airports = nearby_response.json()
-
-        for station in nearby_airports:
-            nearby_icao = station.get("icao")
-            if nearby_icao and nearby_icao != icao:
-                # Try fetching TAF from nearby airport
-                nearby_taf_url = f"https://avwx.rest/api/taf/{nearby_icao}"
-                nearby_taf_response = requests.get(nearby_taf_url, headers=headers, timeout=10)
-                nearby_taf_response.raise_for_status()
-                nearby_taf_data = nearby_taf_response.json()
-                nearby_raw = nearby_taf_data.get("raw", "")
-                if nearby_raw:
-                    return f"📄 No TAF for {icao}, but found nearby at {nearby_icao}:\n{nearby_raw}"
+        found = _find_nearby_taf(candidates, headers, deadline)
+        if found:
+            nearby_icao, nearby_taf_data = found
+            taf_text = f"📄 No TAF for {icao}, but found nearby at {nearby_icao}:\n{nearby_taf_data['raw']}"
+            return _remember(icao, taf_text, nearby_taf_data)
 
         return f"⚠️ No TAF available for {icao} or nearby airports."
 
-    except requests.exceptions.Timeout:
-        return f"❌ Timeout fetching TAF for {icao}. Please try again."
-    except requests.exceptions.HTTPError as http_err:
-        if response.status_code == 404:
-            return f"⚠️ TAF not found for {icao}. Please verify the airport code."
-        elif response.status_code == 401:
-            return f"❌ Authentication failed. Please check your AVWX API key."
-        else:
-            return f"❌ HTTP error {response.status_code} for {icao}: {http_err}"
     except requests.exceptions.RequestException as e:
-        return f"❌ Network error fetching TAF for {icao}: {e}"
+        return _failure(icao, e)
     except Exception as e:
         return f"❌ Unexpected error fetching TAF for {icao}: {e}"
 
+# -- asyncio versions for the API service -------------------------------------
+
+async def _avwx_candidates_async(icao: str, headers: dict, deadline: float):
+    """
+    _avwx_candidates over async_http; deadline is event loop time
+    """
+    import async_http
+
+    loop = asyncio.get_running_loop()
+    station = station_db.get(icao)
+    if station is None:
+        # Same lookup (and miss cache) as the sync path; it is one short call
+        station = await asyncio.to_thread(lookup_station, icao, min(TAF_TIMEOUT, TAF_NEARBY_SEARCH_DEADLINE))
+    remaining = deadline - loop.time()
+    if station is None or remaining <= 0:
+        return None
+
+    latitude, longitude = station["latitude"], station["longitude"]
+    nearby_url = f"{AVWX_BASE_URL}/station?near={latitude},{longitude}&n={NEARBY_AIRPORT_RADIUS}"
+    response = await async_http.get(nearby_url, "station", headers=headers, timeout=min(TAF_TIMEOUT, remaining))
+    response.raise_for_status()
+    return _nearby_candidates(icao, latitude, longitude, response.json())
+
+async def _probe_taf_async(nearby_icao: str, headers: dict, timeout: float):
+    import async_http
+
+    response = await async_http.get(f"{AVWX_BASE_URL}/taf/{nearby_icao}", "taf_nearby", headers=headers,
+                                    timeout=timeout, retries=0)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    data = _response_json(response)
+    return data if data.get("raw") else None
+
+async def _find_nearby_taf_async(candidates: list[str], headers: dict, deadline: float):
+    """
+    _find_nearby_taf with one task per candidate instead of a thread
+    """
+    if not candidates:
+        return None
+
+    loop = asyncio.get_running_loop()
+    probe_timeout = max(0.1, min(TAF_TIMEOUT, deadline - loop.time()))
+    tasks = [asyncio.create_task(_probe_taf_async(c, headers, probe_timeout)) for c in candidates]
+    try:
+        for nearby_icao, task in zip(candidates, tasks):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return _closest_finished(candidates, tasks)
+            try:
+                data = await asyncio.wait_for(asyncio.shield(task), remaining)
+            except asyncio.TimeoutError:
+                return _closest_finished(candidates, tasks)
+            except Exception:
+                # One failing neighbour must not abort the whole search
+                continue
+            if data:
+                return nearby_icao, data
+        return None
+    finally:
+        for task in tasks:
+            if task.done() and not task.cancelled():
+                task.exception()  # Mark failures of unused probes as retrieved
+            task.cancel()
+
+async def get_taf_async(icao: str) -> str:
+    """
+    get_taf for the async API service; network calls go through async_http
+    """
+    import async_http
+
+    if not icao or not isinstance(icao, str):
+        return "❌ Invalid ICAO code provided."
+
+    icao = icao.strip().upper()
+    if not re.match(r'^[A-Z]{4}$', icao):
+        return f"❌ Invalid ICAO format: {icao}. Must be 4 letters (e.g., KSEA, KSFO)."
+
+    local = _local_taf(icao)
+    if local is not None:
+        return local
+
+    api_key = os.getenv("AVWX_API_KEY")
+    if not api_key:
+        return "❌ AVWX API key not set in environment."
+
+    headers = _headers(api_key)
+    try:
+        response = await async_http.get(f"{AVWX_BASE_URL}/taf/{icao}", "taf", headers=headers)
+        response.raise_for_status()
+        data = _response_json(response)
+
+        raw = data.get("raw", "")
+        if raw:
+            return _remember(icao, f"📄 TAF for {icao}:\n{raw}", data)
+
+        deadline = asyncio.get_running_loop().time() + TAF_NEARBY_SEARCH_DEADLINE
+        candidates = _offline_candidates(icao)
+        if candidates is None:
+            candidates = await _avwx_candidates_async(icao, headers, deadline)
+        if candidates is None:
+            return f"⚠️ No TAF available for {icao}, and unable to find nearby airports."
+
+        found = await _find_nearby_taf_async(candidates, headers, deadline)
+        if found:
+            nearby_icao, nearby_taf_data = found
+            taf_text = f"📄 No TAF for {icao}, but found nearby at {nearby_icao}:\n{nearby_taf_data['raw']}"
+            return _remember(icao, taf_text, nearby_taf_data)
+
+        return f"⚠️ No TAF available for {icao} or nearby airports."
+
+    except requests.exceptions.RequestException as e:
+        return _failure(icao, e)
+    except Exception as e:
+        return f"❌ Unexpected error fetching TAF for {icao}: {e}"
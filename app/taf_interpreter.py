@@ -1,7 +1,333 @@
 # app/taf_interpreter.py
 
-def interpret_taf(taf: str) -> str:
+import math
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from metar_interpreter import decode_groups, ceiling_from_clouds, flight_category
+
+_ISSUE_TIME = re.compile(r"(\d{2})(\d{2})(\d{2})Z")
+_VALID_PERIOD = re.compile(r"(\d{2})(\d{2})/(\d{2})(\d{2})")
+_FROM = re.compile(r"FM(\d{2})(\d{2})(\d{2})")
+_PROBABILITY = re.compile(r"PROB(\d{2})")
+
+# Worst first, for comparisons
+CATEGORY_RANK = {"LIFR": 0, "IFR": 1, "MVFR": 2, "VFR": 3}
+CONDITION_FIELDS = ("wind", "visibility_sm", "visibility_modifier", "weather", "clouds")
+
+
+def resolve_time(day: int, hour: int, minute: int, reference: datetime) -> datetime:
+    """
+    Turn a day-of-month/hour into a full UTC datetime near the reference time
+
+    Reports only carry the day of month, so pick the candidate in the previous,
+    current or next month that lies closest to the reference.
+    """
+    extra_days, hour = divmod(hour, 24)  # "24" means midnight of the next day
+    candidates = []
+    for month_offset in (-1, 0, 1):
+        year, month = reference.year, reference.month + month_offset
+        if month < 1:
+            year, month = year - 1, 12
+        elif month > 12:
+            year, month = year + 1, 1
+        try:
+            candidate = datetime(year, month, day, hour, minute, tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        candidates.append(candidate + timedelta(days=extra_days))
+    return min(candidates, key=lambda c: abs(c - reference))
+
+
+def _merge(base: dict, change: dict) -> dict:
+    """
+    Apply the fields present in a change group on top of base conditions
+    """
+    merged = dict(base)
+    for field in CONDITION_FIELDS:
+        if field in change:
+            merged[field] = change[field]
+    merged["ceiling_ft"] = ceiling_from_clouds(merged.get("clouds") or [])
+    merged["flight_category"] = flight_category(merged["ceiling_ft"], merged.get("visibility_sm"))
+    return merged
+
+
+def parse_taf(taf: str, reference: Optional[datetime] = None) -> dict:
+    """
+    Split a raw TAF into its base forecast and change groups
+
+    Args:
+        taf: Raw TAF string
+        reference: Time used to resolve day-of-month values (default: now)
+
+    Returns:
+        Dict with station, issue time, validity window, and a list of
+        groups. Each group has a type (BASE, FM, BECMG, TEMPO, PROB),
+        start/end datetimes, optional probability, and the decoded
+        condition fields it sets.
+    """
+    reference = reference or datetime.now(timezone.utc)
+    body, _, remarks = " ".join(taf.split()).partition(" RMK ")
+    tokens = body.split()
+    result = {
+        "raw": " ".join(taf.split()),
+        "station": None,
+        "amended": False,
+        "issued": None,
+        "valid_from": None,
+        "valid_to": None,
+        "groups": [],
+        "remarks": remarks or None,
+    }
+
+    i = 0
+    while i < len(tokens) and tokens[i] in ("TAF", "AMD", "COR"):
+        result["amended"] = result["amended"] or tokens[i] == "AMD"
+        i += 1
+    if i < len(tokens) and re.fullmatch(r"[A-Z][A-Z0-9]{3}", tokens[i]):
+        result["station"] = tokens[i]
+        i += 1
+    if i < len(tokens):
+        match = _ISSUE_TIME.fullmatch(tokens[i])
+        if match:
+            day, hour, minute = (int(g) for g in match.groups())
+            result["issued"] = resolve_time(day, hour, minute, reference)
+            reference = result["issued"]
+            i += 1
+    if i < len(tokens):
+        match = _VALID_PERIOD.fullmatch(tokens[i])
+        if match:
+            d1, h1, d2, h2 = (int(g) for g in match.groups())
+            result["valid_from"] = resolve_time(d1, h1, 0, reference)
+            result["valid_to"] = resolve_time(d2, h2, 0, result["valid_from"] + timedelta(hours=12))
+            i += 1
+
+    valid_from = result["valid_from"] or reference
+    valid_to = result["valid_to"] or valid_from + timedelta(hours=24)
+
+    # Walk the body, starting a new group at every change indicator
+    group = {"type": "BASE", "start": valid_from, "end": valid_to, "probability": None, "tokens": []}
+    groups = [group]
+    while i < len(tokens):
+        token = tokens[i]
+        new_group = None
+        from_match = _FROM.fullmatch(token)
+        prob_match = _PROBABILITY.fullmatch(token)
+
+        if from_match:
+            day, hour, minute = (int(g) for g in from_match.groups())
+            new_group = {"type": "FM", "start": resolve_time(day, hour, minute, valid_from),
+                         "end": valid_to, "probability": None, "tokens": []}
+        elif token in ("BECMG", "TEMPO") or prob_match:
+            new_group = {"type": token, "start": None, "end": None, "probability": None, "tokens": []}
+            if prob_match:
+                new_group["type"] = "PROB"
+                new_group["probability"] = int(prob_match.group(1))
+                if i + 1 < len(tokens) and tokens[i + 1] == "TEMPO":
+                    i += 1
+            period = _VALID_PERIOD.fullmatch(tokens[i + 1]) if i + 1 < len(tokens) else None
+            if period:
+                d1, h1, d2, h2 = (int(g) for g in period.groups())
+                new_group["start"] = resolve_time(d1, h1, 0, valid_from)
+                new_group["end"] = resolve_time(d2, h2, 0, new_group["start"] + timedelta(hours=6))
+                i += 1
+
+        if new_group is not None:
+            group = new_group
+            groups.append(group)
+        else:
+            group["tokens"].append(token)
+        i += 1
+
+    for group in groups:
+        conditions = decode_groups(group.pop("tokens"))
+        group["conditions"] = {k: v for k, v in conditions.items() if k in CONDITION_FIELDS}
+        group["unparsed"] = conditions.get("unparsed", [])
+        if group["start"] is None:
+            group["start"], group["end"] = valid_from, valid_to
+
+    # FM groups end where the next FM group begins
+    from_groups = [g for g in groups if g["type"] in ("BASE", "FM")]
+    for current, following in zip(from_groups, from_groups[1:]):
+        current["end"] = following["start"]
+
+    result["groups"] = groups
+    return result
+
+
+def build_timeline(parsed: dict) -> list[dict]:
+    """
+    Expand a parsed TAF into hourly conditions
+
+    Each hour carries the prevailing flight category, ceiling, visibility,
+    wind and weather, plus any TEMPO/PROB/BECMG conditions that may apply
+    during that hour and the worst category across all of them.
+    """
+    groups = parsed["groups"]
+    if not groups:
+        return []
+    valid_from = groups[0]["start"].replace(minute=0, second=0, microsecond=0)
+    valid_to = parsed["valid_to"] or groups[0]["end"]
+    # Whole hours from the start of the first hour; the end hour is exclusive
+    hours = math.ceil((valid_to - groups[0]["start"]) / timedelta(hours=1))
+
+    prevailing_groups = [g for g in groups if g["type"] in ("BASE", "FM")]
+    becoming = sorted((g for g in groups if g["type"] == "BECMG"), key=lambda g: g["end"])
+    temporary = [g for g in groups if g["type"] in ("TEMPO", "PROB")]
+
+    timeline = []
+    for offset in range(hours):
+        hour = valid_from + timedelta(hours=offset)
+        base, base_start = {}, valid_from
+        for group in prevailing_groups:
+            if group["start"] <= hour:
+                base = group["conditions"]
+                base_start = group["start"]
+        prevailing = _merge({}, base)
+
+        overlays = []
+        for group in becoming:
+            # Once a BECMG window is complete the change is part of the
+            # prevailing forecast; during the window it is only possible.
+            if group["start"] < base_start:
+                continue
+            if group["end"] <= hour:
+                prevailing = _merge(prevailing, group["conditions"])
+            elif group["start"] <= hour:
+                overlays.append(("BECMG", None, group["conditions"]))
+        overlays.extend(
+            (group["type"], group["probability"], group["conditions"])
+            for group in temporary
+            if group["start"] <= hour < group["end"]
+        )
+
+        entry = _summarize_hour(hour, prevailing)
+        entry["temporary"] = []
+        worst = prevailing["flight_category"]
+        for kind, probability, conditions in overlays:
+            overlay = _summarize_hour(hour, _merge(prevailing, conditions))
+            overlay.pop("time")
+            overlay["type"] = kind
+            overlay["probability"] = probability
+            entry["temporary"].append(overlay)
+            worst = _worse(worst, overlay["flight_category"])
+        entry["worst_category"] = worst
+        timeline.append(entry)
+    return timeline
+
+
+def _summarize_hour(hour: datetime, conditions: dict) -> dict:
+    return {
+        "time": hour,
+        "flight_category": conditions["flight_category"],
+        "ceiling_ft": conditions["ceiling_ft"],
+        "visibility_sm": conditions.get("visibility_sm"),
+        "visibility_modifier": conditions.get("visibility_modifier"),
+        "wind": conditions.get("wind"),
+        "weather": [w["code"] for w in conditions.get("weather") or []],
+    }
+
+
+def _worse(first: Optional[str], second: Optional[str]) -> Optional[str]:
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return first if CATEGORY_RANK[first] <= CATEGORY_RANK[second] else second
+
+
+def worst_category(timeline: list[dict], from_hour: int, to_hour: int) -> Optional[str]:
+    """
+    Worst flight category, including temporary conditions, in a UTC hour window
+
+    The window starts at the first timeline hour matching from_hour and
+    runs up to (not including) the next to_hour, so "14Z to 18Z" covers
+    14Z, 15Z, 16Z and 17Z and may cross midnight (e.g. 22 to 02).
+    """
+    worst = None
+    inside = False
+    for entry in timeline:
+        hour = entry["time"].hour
+        if not inside and hour == from_hour % 24:
+            inside = True
+        elif inside and hour == to_hour % 24:
+            break
+        if inside:
+            worst = _worse(worst, entry["worst_category"])
+    return worst
+
+
+def _format_conditions(entry: dict) -> str:
+    parts = [entry["flight_category"] or "unknown"]
+    wind = entry["wind"]
+    if wind:
+        if wind["speed_kt"] == 0:
+            parts.append("wind calm")
+        else:
+            direction = "VRB" if wind["variable"] else f"{wind['direction']:03d}°"
+            gust = f" G{wind['gust_kt']}" if wind["gust_kt"] else ""
+            parts.append(f"wind {direction} {wind['speed_kt']}{gust} kt")
+    if entry["visibility_sm"] is not None:
+        prefix = ">" if entry["visibility_modifier"] == "greater_than" else ""
+        parts.append(f"vis {prefix}{entry['visibility_sm']:g} SM")
+    if entry["weather"]:
+        parts.append(" ".join(entry["weather"]))
+    parts.append(f"ceiling {entry['ceiling_ft']:,} ft" if entry["ceiling_ft"] is not None else "no ceiling")
+    return ", ".join(parts)
+
+
+def _format_overlay(overlay: dict) -> str:
+    label = f"PROB{overlay['probability']}" if overlay["probability"] else overlay["type"]
+    return f"{label} {_format_conditions(overlay)}"
+
+
+def interpret_taf(taf: str, from_hour: Optional[int] = None, to_hour: Optional[int] = None) -> str:
     if not taf.strip():
         return "❌ No TAF provided for interpretation."
-    
-    return f"📄 Here's a plain-English summary of the TAF:\n\n\"{taf}\"\n\nPlease explain the periods, wind changes, visibility, precipitation, and cloud layers in detail."
+
+    # Accept fetcher output such as "📄 TAF for KSEA:\n<raw>"
+    lines = taf.strip().splitlines()
+    if len(lines) > 1 and lines[0].startswith("📄"):
+        taf = " ".join(lines[1:])
+
+    parsed = parse_taf(taf)
+    # Without a validity period and a decoded base or FM forecast there is
+    # nothing to put on a timeline
+    has_forecast = any(g["conditions"] for g in parsed["groups"] if g["type"] in ("BASE", "FM"))
+    if parsed["valid_from"] is None or not has_forecast:
+        return f"⚠️ Could not decode TAF: {taf.strip()}"
+    timeline = build_timeline(parsed)
+    if not timeline:
+        return f"⚠️ Could not decode TAF: {taf.strip()}"
+
+    station = parsed["station"] or "unknown station"
+    header = f"📄 Decoded TAF for {station}"
+    if parsed["issued"]:
+        header += f" issued {parsed['issued']:%d %H%MZ}"
+    header += f", valid {timeline[0]['time']:%d %HZ} to {parsed['valid_to'] or timeline[-1]['time']:%d %HZ}"
+    output = [header + ":"]
+
+    # Collapse consecutive hours with identical conditions into one line
+    runs = []
+    for entry in timeline:
+        key = (_format_conditions(entry), tuple(_format_overlay(o) for o in entry["temporary"]))
+        if runs and runs[-1][0] == key:
+            runs[-1][2] = entry["time"] + timedelta(hours=1)
+        else:
+            runs.append([key, entry["time"], entry["time"] + timedelta(hours=1)])
+    for (text, overlays), start, end in runs:
+        line = f"- {start:%d %HZ}–{end:%d %HZ}: {text}"
+        if overlays:
+            line += "; " + "; ".join(overlays)
+        output.append(line)
+
+    if from_hour is not None and to_hour is not None:
+        worst = worst_category(timeline, from_hour, to_hour)
+        output.append(f"Worst category {from_hour % 24:02d}Z–{to_hour % 24:02d}Z: {worst or 'outside forecast period'}")
+    else:
+        worst = None
+        for entry in timeline:
+            worst = _worse(worst, entry["worst_category"])
+        output.append(f"Worst category in forecast period: {worst or 'unknown'}")
+    return "\n".join(output)
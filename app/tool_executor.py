@@ -0,0 +1,127 @@
+"""
+Concurrent execution of LLM tool calls for the Aviation Weather Agent
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable
+
+import metrics
+from config import TOOL_MAX_WORKERS
+from tool_registry import tool_timeout, is_cacheable, is_async, dispatch as dispatch_sync
+
+# Bounded pool shared by every session; tool calls are network-bound
+_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
+
+def _call_fields(tool_call) -> tuple[str, str, str]:
+    """
+    Return (id, name, arguments) from an SDK tool call object or a dict
+    accumulated from streamed deltas
+    """
+    if isinstance(tool_call, dict):
+        function = tool_call["function"]
+        return tool_call["id"], function["name"], function["arguments"]
+    return tool_call.id, tool_call.function.name, tool_call.function.arguments
+
+
+def _run_one(tool_call, dispatch: Callable[[str, dict], str]) -> str:
+    _, func_name, arguments = _call_fields(tool_call)
+    try:
+        args = json.loads(arguments or "{}")
+        return dispatch(func_name, args)
+    except Exception as e:
+        return f"❌ Error executing {func_name}: {str(e)}"
+
+
+def run_tool_calls(tool_calls, dispatch: Callable[[str, dict], str]) -> list[dict]:
+    """
+    Execute the tool calls of one assistant turn concurrently
+
+    Identical calls to cacheable tools run once, and each call is bounded
+    by its registry timeout.
+
+    Args:
+        tool_calls: The tool_calls list from an assistant message, as SDK
+            objects or plain dicts
+        dispatch: Callable taking (func_name, args) and returning the tool output
+
+    Returns:
+        Tool messages in the same order as tool_calls, ready to append to the
+        conversation
+    """
+    if len(tool_calls) == 1 and tool_timeout(_call_fields(tool_calls[0])[1]) is None:
+        results = [_run_one(tool_calls[0], dispatch)]
+    else:
+        started = time.monotonic()
+        futures = {}
+        pending = []
+        for tool_call in tool_calls:
+            _, func_name, arguments = _call_fields(tool_call)
+            key = (func_name, arguments) if is_cacheable(func_name) else id(tool_call)
+            if key not in futures:
+                futures[key] = metrics.submit(_executor, "tool", _run_one, tool_call, dispatch)
+            pending.append((func_name, futures[key]))
+
+        results = []
+        for func_name, future in pending:
+            timeout = tool_timeout(func_name)
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                results.append(f"❌ {func_name} timed out after {timeout:g}s")
+
+    return [
+        {"role": "tool", "tool_call_id": _call_fields(tool_call)[0], "content": result}
+        for tool_call, result in zip(tool_calls, results)
+    ]
+
+
+async def _run_one_async(tool_call, dispatch: Callable[[str, dict], Awaitable[str]]) -> str:
+    _, func_name, arguments = _call_fields(tool_call)
+    if not is_async(func_name):
+        # Blocking tools run on the shared pool without holding up the event loop
+        return await asyncio.wrap_future(metrics.submit(_executor, "tool", _run_one, tool_call, dispatch_sync))
+    try:
+        args = json.loads(arguments or "{}")
+        return await dispatch(func_name, args)
+    except Exception as e:
+        return f"❌ Error executing {func_name}: {str(e)}"
+
+
+async def run_tool_calls_async(tool_calls, dispatch: Callable[[str, dict], Awaitable[str]]) -> list[dict]:
+    """
+    run_tool_calls for the async API service
+
+    Tools with a coroutine version are awaited through dispatch; the rest
+    run on the shared tool pool. Deduplication and timeouts match
+    run_tool_calls.
+    """
+    tasks = {}
+    pending = []
+    for tool_call in tool_calls:
+        _, func_name, arguments = _call_fields(tool_call)
+        key = (func_name, arguments) if is_cacheable(func_name) else id(tool_call)
+        if key not in tasks:
+            tasks[key] = asyncio.ensure_future(_run_one_async(tool_call, dispatch))
+        pending.append((func_name, tasks[key]))
+
+    started = asyncio.get_running_loop().time()
+    results = []
+    for func_name, task in pending:
+        timeout = tool_timeout(func_name)
+        remaining = None if timeout is None else max(0.0, timeout - (asyncio.get_running_loop().time() - started))
+        try:
+            # shield: a duplicate call may still be waiting on the same task
+            results.append(await asyncio.wait_for(asyncio.shield(task), remaining))
+        except asyncio.TimeoutError:
+            results.append(f"❌ {func_name} timed out after {timeout:g}s")
+
+    for task in tasks.values():
+        task.cancel()
+    return [
+        {"role": "tool", "tool_call_id": _call_fields(tool_call)[0], "content": result}
+        for tool_call, result in zip(tool_calls, results)
+    ]
@@ -0,0 +1,301 @@
+"""
+Single registry of LLM tools for the Aviation Weather Agent
+
+Each tool is declared once with its schema, implementing module, timeout
+and cacheability. Modules are imported on first use so the front ends
+start without loading requests or the fetchers.
+"""
+import importlib
+import threading
+import time
+from typing import Callable, Optional
+
+from config import (
+    METAR_TIMEOUT,
+    TAF_TIMEOUT,
+    NOTAM_TIMEOUT,
+    WEB_SEARCH_TIMEOUT,
+    TAF_NEARBY_SEARCH_DEADLINE,
+    ROUTE_FETCH_DEADLINE,
+    ALTERNATE_FETCH_DEADLINE,
+)
+from metrics import TOOL_SECONDS, TOOL_CALLS, span
+from utils import log_api_call
+
+_ICAO_PARAM = {"type": "string", "description": "The ICAO code for the airport (e.g. KSEA, KSFO)"}
+
+# name -> spec; "timeout" bounds the whole call, "cacheable" marks tools whose
+# result depends only on their arguments for the length of a turn, and
+# "async_function" names a coroutine version used by the API service
+TOOLS = {
+    "fetch_metar": {
+        "module": "metar_fetcher",
+        "function": "fetch_metar",
+        "async_function": "fetch_metar_async",
+        "timeout": METAR_TIMEOUT * 2,
+        "cacheable": True,
+        "description": "Fetch the latest METAR report for an ICAO airport code.",
+        "parameters": {
+            "type": "object",
+            "properties": {"icao": _ICAO_PARAM},
+            "required": ["icao"]
+        }
+    },
+    "get_taf": {
+        "module": "taf_fetcher",
+        "function": "get_taf",
+        "async_function": "get_taf_async",
+        "timeout": TAF_TIMEOUT + TAF_NEARBY_SEARCH_DEADLINE,
+        "cacheable": True,
+        "description": "Fetch the latest TAF forecast for an ICAO airport code, or the nearest TAF if the airport has none.",
+        "parameters": {
+            "type": "object",
+            "properties": {"icao": _ICAO_PARAM},
+            "required": ["icao"]
+        }
+    },
+    "interpret_metar": {
+        "module": "metar_interpreter",
+        "function": "interpret_metar",
+        "timeout": None,
+        "cacheable": True,
+        "description": "Interpret a raw METAR weather report into human-friendly flight conditions.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "metar": {"type": "string", "description": "The raw METAR string to interpret."}
+            },
+            "required": ["metar"]
+        }
+    },
+    "interpret_taf": {
+        "module": "taf_interpreter",
+        "function": "interpret_taf",
+        "timeout": None,
+        "cacheable": True,
+        "description": "Decode a raw TAF forecast into an hourly timeline of flight categories, ceiling, visibility and wind.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "taf": {"type": "string", "description": "The raw TAF string to interpret."},
+                "from_hour": {"type": "integer", "description": "Optional start of a UTC hour window (0-23) to report the worst flight category for."},
+                "to_hour": {"type": "integer", "description": "Optional end of the UTC hour window (0-23, exclusive)."}
+            },
+            "required": ["taf"]
+        }
+    },
+    "get_notams": {
+        "module": "notam_fetcher",
+        "function": "get_notams",
+        "async_function": "get_notams_async",
+        "timeout": NOTAM_TIMEOUT * 2,
+        "cacheable": True,
+        "description": "Get NOTAMs for an ICAO airport code, most relevant first (closures, runways, aerodrome).",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "icao": _ICAO_PARAM,
+                "keyword": {
+                    "type": "string",
+                    "enum": ["RWY", "AD", "TWY", "APRON", "OBST", "NAV", "IAP", "COM", "SVC", "AIRSPACE"],
+                    "description": "Optional NOTAM keyword to filter on (e.g. RWY for runway NOTAMs)."
+                },
+                "hours": {"type": "number", "description": "Only NOTAMs active within this many hours from now (default 24)."}
+            },
+            "required": ["icao"]
+        }
+    },
+    "get_notam_updates": {
+        "module": "notam_fetcher",
+        "function": "get_notam_updates",
+        "timeout": NOTAM_TIMEOUT * 2,
+        "cacheable": True,
+        "description": "List only the NOTAMs for an airport that are new, changed or cancelled recently. Use when re-checking NOTAMs already reviewed.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "icao": _ICAO_PARAM,
+                "since_minutes": {"type": "number", "description": "Look-back window in minutes (default 30)."}
+            },
+            "required": ["icao"]
+        }
+    },
+    "get_report_history": {
+        "module": "report_store",
+        "function": "get_report_history",
+        "timeout": None,
+        "cacheable": True,
+        "description": "List the METARs or TAFs already stored for an airport over the last hours, oldest first. Use for trend questions like how conditions changed today; it does not fetch new reports.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "icao": _ICAO_PARAM,
+                "product": {"type": "string", "enum": ["metar", "taf"], "description": "Report type (default metar)."},
+                "hours": {"type": "number", "description": "Look-back window in hours (default 12, max 72)."}
+            },
+            "required": ["icao"]
+        }
+    },
+    "weather_trend": {
+        "module": "obs_timeseries",
+        "function": "weather_trend",
+        "timeout": None,
+        "cacheable": True,
+        "description": "Summarize how observed conditions at an airport changed over recent hours: current vs earlier values, min/max with times and hourly trend for wind, gusts, visibility, ceiling, temperature, dewpoint and altimeter. Use for questions like 'is the ceiling lifting' or 'is pressure falling'.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "icao": _ICAO_PARAM,
+                "field": {
+                    "type": "string",
+                    "enum": ["wind", "gust", "visibility", "ceiling", "temperature", "dewpoint", "altimeter"],
+                    "description": "Optional single field to report; all fields when omitted."
+                },
+                "hours": {"type": "number", "description": "Look-back window in hours (default 6, max 48)."}
+            },
+            "required": ["icao"]
+        }
+    },
+    "find_vfr_alternates": {
+        "module": "category_map",
+        "function": "find_vfr_alternates",
+        "timeout": ALTERNATE_FETCH_DEADLINE + 5,
+        "cacheable": True,
+        "description": "List the nearest airports currently reporting VFR within a radius of an airport, with distance, ceiling and visibility, plus a count of stations by flight category. Fetches current METARs for nearby stations as needed. Use for diversion or alternate planning.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "icao": _ICAO_PARAM,
+                "radius_nm": {"type": "number", "description": "Search radius in nautical miles (default 150, max 500)."},
+                "limit": {"type": "integer", "description": "Number of alternates to list (default 5, max 20)."}
+            },
+            "required": ["icao"]
+        }
+    },
+    "route_briefing": {
+        "module": "route_briefing",
+        "function": "route_briefing",
+        "timeout": ROUTE_FETCH_DEADLINE + 5,
+        "cacheable": True,
+        "description": "Brief a flight between two airports in one call: METARs with flight categories for stations along the route corridor, endpoint TAF outlook and runway closures. Prefer this over separate METAR/TAF/NOTAM calls for cross-country questions.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "departure": {"type": "string", "description": "Departure ICAO code (e.g. KSEA)"},
+                "destination": {"type": "string", "description": "Destination ICAO code (e.g. KPDX)"},
+                "corridor_nm": {"type": "number", "description": "Half-width of the route corridor in nautical miles (default 25)."}
+            },
+            "required": ["departure", "destination"]
+        }
+    },
+    "search_web": {
+        "module": "web_search",
+        "function": "search_web",
+        "timeout": WEB_SEARCH_TIMEOUT * 2,
+        "cacheable": True,
+        "description": "Search the web for recent aviation updates, news, or regulations.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "The search query."}
+            },
+            "required": ["query"]
+        }
+    },
+}
+
+_callables: dict[tuple[str, str], Callable] = {}
+_import_lock = threading.Lock()
+
+
+def get_tool_schemas(names: Optional[list[str]] = None) -> list[dict]:
+    """
+    Tool definitions in the ChatCompletions "tools" format
+
+    The list is built in registry order so the prompt prefix stays
+    byte-identical between requests.
+    """
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": spec["description"],
+                "parameters": spec["parameters"]
+            }
+        }
+        for name, spec in TOOLS.items()
+        if names is None or name in names
+    ]
+
+
+def tool_timeout(name: str) -> Optional[float]:
+    spec = TOOLS.get(name)
+    return spec["timeout"] if spec else None
+
+
+def is_cacheable(name: str) -> bool:
+    spec = TOOLS.get(name)
+    return bool(spec and spec["cacheable"])
+
+
+def is_async(name: str) -> bool:
+    spec = TOOLS.get(name)
+    return bool(spec and spec.get("async_function"))
+
+
+def _resolve(name: str, attribute: str = "function") -> Callable:
+    func = _callables.get((name, attribute))
+    if func is None:
+        spec = TOOLS[name]
+        with _import_lock:
+            func = _callables.get((name, attribute))
+            if func is None:
+                module = importlib.import_module(spec["module"])
+                func = _callables[(name, attribute)] = getattr(module, spec[attribute])
+    return func
+
+
+def _record_call(name: str, args: dict, result, started: float):
+    # Tools report failures as ❌ strings rather than raising
+    ok = isinstance(result, str) and not result.startswith("❌")
+    TOOL_SECONDS.observe(time.perf_counter() - started, tool=name)
+    TOOL_CALLS.inc(tool=name, outcome="ok" if ok else "error")
+    log_api_call(name, args, ok, None if ok else (result or "exception"))
+
+
+def dispatch(name: str, args: dict) -> str:
+    """
+    Call a registered tool by name
+
+    Args:
+        name: Tool name from the model's tool call
+        args: Decoded JSON arguments
+
+    Returns:
+        The tool output, or an error string for unknown tools
+    """
+    if name not in TOOLS:
+        return f"❌ Unknown tool: {name}"
+    started = time.perf_counter()
+    result = None
+    with span(f"tool.{name}", args=args):
+        try:
+            result = _resolve(name)(**args)
+            return result
+        finally:
+            _record_call(name, args, result, started)
+
+
+async def dispatch_async(name: str, args: dict) -> str:
+    """
+    Await the coroutine version of a tool; only for tools where is_async() is True
+    """
+    started = time.perf_counter()
+    result = None
+    with span(f"tool.{name}", args=args):
+        try:
+            result = await _resolve(name, "async_function")(**args)
+            return result
+        finally:
+            _record_call(name, args, result, started)
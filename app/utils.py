@@ -2,6 +2,7 @@
 Utility functions for the Aviation Weather Agent
 """
 import re
+import math
 import logging
 from typing import Optional
 from config import ICAO_PATTERN, ERROR_MESSAGES
@@ -13,6 +14,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_NM = 3440.065
+
 def validate_icao(icao: str) -> tuple[bool, Optional[str]]:
     """
     Validate ICAO airport code format
@@ -86,6 +89,54 @@ def truncate_text(text: str, max_length: int = 1000) -> str:
     
     return text[:max_length] + "... [truncated]"
 
+def haversine_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points
+    
+    Args:
+        lat1, lon1: First point in decimal degrees
+        lat2, lon2: Second point in decimal degrees
+        
+    Returns:
+        Distance in nautical miles
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * math.asin(math.sqrt(a))
+
+def initial_bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Initial great-circle bearing from the first point to the second, in radians
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlambda = math.radians(lon2 - lon1)
+    y = math.sin(dlambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlambda)
+    return math.atan2(y, x)
+
+def track_offsets_nm(start: tuple[float, float], end: tuple[float, float],
+                     point: tuple[float, float]) -> tuple[float, float]:
+    """
+    Position of a point relative to the great-circle track from start to end
+    
+    Args:
+        start, end: (lat, lon) of the track endpoints
+        point: (lat, lon) of the point
+        
+    Returns:
+        (along_track_nm, cross_track_nm); along-track is negative behind the
+        start, cross-track is unsigned
+    """
+    d13 = haversine_nm(*start, *point) / EARTH_RADIUS_NM
+    theta = initial_bearing(*start, *point) - initial_bearing(*start, *end)
+    cross = math.asin(max(-1.0, min(1.0, math.sin(d13) * math.sin(theta))))
+    along = math.acos(max(-1.0, min(1.0, math.cos(d13) / max(math.cos(cross), 1e-12))))
+    if math.cos(theta) < 0:
+        along = -along
+    return along * EARTH_RADIUS_NM, abs(cross) * EARTH_RADIUS_NM
+
 def log_api_call(function_name: str, parameters: dict, success: bool, error: str = None):
     """
     Log API calls for debugging and monitoring
@@ -1,30 +1,104 @@
-import requests
-from bs4 import BeautifulSoup
+import html
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.parse import urlparse, parse_qs
 
-def search_web(query: str) -> str:
+import http_client
+from config import (
+    WEB_SEARCH_URL,
+    WEB_SEARCH_TIMEOUT,
+    WEB_SEARCH_MAX_RESULTS,
+    WEB_SEARCH_CACHE_TTL,
+    WEB_SEARCH_CACHE_MAX_ENTRIES,
+    WEB_SEARCH_MAX_WORKERS,
+)
+from report_cache import ReportCache
+
+# <a ... class="result__a" ... href="...">title</a>, attributes in any order
+_RESULT_LINK = re.compile(r'<a\b([^>]*\bclass="[^"]*\bresult__a\b[^"]*"[^>]*)>(.*?)</a>', re.IGNORECASE | re.DOTALL)
+_HREF = re.compile(r'\bhref="([^"]*)"', re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+_QUERY_TOKEN = re.compile(r"[a-z0-9§]+(?:\.[a-z0-9]+)*")
+
+_search_cache = ReportCache(WEB_SEARCH_CACHE_MAX_ENTRIES, name="web_search")
+_executor = ThreadPoolExecutor(max_workers=WEB_SEARCH_MAX_WORKERS, thread_name_prefix="search")
+_in_flight: dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a query: lowercase words, punctuation and spacing ignored
+
+    "14 CFR 91.155?" and "14 cfr  91.155" share a key.
+    """
+    return " ".join(_QUERY_TOKEN.findall(query.lower()))
+
+
+def _result_url(href: str) -> str:
+    # DuckDuckGo wraps results in a redirect: //duckduckgo.com/l/?uddg=<url>
+    href = html.unescape(href)
+    target = parse_qs(urlparse(href).query).get("uddg")
+    return target[0] if target else href
+
+
+def extract_results(page: str, limit: int = WEB_SEARCH_MAX_RESULTS) -> list[tuple[str, str]]:
+    """
+    (title, url) pairs for the first limit result links in a results page
+    """
+    results = []
+    for match in _RESULT_LINK.finditer(page):
+        href = _HREF.search(match.group(1))
+        if not href:
+            continue
+        title = html.unescape(_TAG.sub("", match.group(2))).strip()
+        results.append((title, _result_url(href.group(1))))
+        if len(results) >= limit:
+            break
+    return results
+
+
+def _search(key: str, query: str) -> str:
     try:
-        url = "https://html.duckduckgo.com/html/"
-        params = {"q": query}
         headers = {
             "User-Agent": "Mozilla/5.0 (AviationWeatherAgent)"
         }
-
-        response = requests.post(url, data=params, headers=headers)
+        response = http_client.post(WEB_SEARCH_URL, "web_search", data={"q": query}, headers=headers)
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        results = soup.find_all("a", class_="result__a", limit=3)
-
+        results = extract_results(response.text)
         if not results:
             return f"⚠️ No web results found for '{query}'."
 
-        output = ""
-        for result in results:
-            title = result.text.strip()
-            link = result["href"]
-            output += f"🔗 {title}\n{link}\n\n"
+        output = "\n\n".join(f"🔗 {title}\n{link}" for title, link in results)
+        _search_cache.put(key, output, time.time() + WEB_SEARCH_CACHE_TTL)
+        return output
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
 
-        return output.strip()
 
+def search_web(query: str) -> str:
+    if not query or not isinstance(query, str) or not normalize_query(query):
+        return "❌ Empty search query."
+
+    key = normalize_query(query)
+    cached = _search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Identical concurrent queries share one request
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _in_flight[key] = _executor.submit(_search, key, query)
+
+    try:
+        return future.result(timeout=WEB_SEARCH_TIMEOUT)
+    except FutureTimeoutError:
+        # The request keeps running and fills the cache for the next ask
+        return f"❌ Web search timed out after {WEB_SEARCH_TIMEOUT}s for '{query}'."
     except Exception as e:
         return f"❌ Error during web search: {e}"
@@ -0,0 +1,78 @@
+"""
+Compare two benchmark result files
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json [--threshold 0.10]
+
+Prints p50/p95/p99 and allocation changes per benchmark and exits with
+status 1 if any p50 or p95 regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "alloc_peak_kb_p50")
+GATED = ("p50_ms", "p95_ms")
+
+
+def _change(before, after):
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return 0.0 if after == 0 else float("inf")
+    return (after - before) / before
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list[str]:
+    """
+    Print the comparison table; returns the names of regressed benchmarks
+    """
+    base_results, new_results = baseline["results"], candidate["results"]
+    print(f"Baseline {baseline['meta']['revision']}  →  candidate {candidate['meta']['revision']}")
+    print(f"{'benchmark':<28}" + "".join(f"{metric:>24}" for metric in METRICS))
+
+    regressions = []
+    for name in sorted(set(base_results) | set(new_results)):
+        before, after = base_results.get(name), new_results.get(name)
+        if before is None or after is None:
+            print(f"{name:<28}  {'only in baseline' if after is None else 'only in candidate'}")
+            continue
+        cells = []
+        regressed = False
+        for metric in METRICS:
+            change = _change(before.get(metric), after.get(metric))
+            if change is None:
+                cells.append(f"{'-':>24}")
+                continue
+            flag = ""
+            if metric in GATED and change > threshold:
+                flag, regressed = " ⚠️", True
+            cells.append(f"{before[metric]:9.3f} → {after[metric]:9.3f}{change:+6.0%}{flag}".rjust(24))
+        print(f"{name:<28}" + "".join(cells))
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed p50/p95 slowdown (fraction)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
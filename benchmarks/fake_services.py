@@ -0,0 +1,408 @@
+"""
+Local stand-ins for AVWX, PilotWeb, DuckDuckGo and OpenAI
+
+One threaded HTTP server replays the fixtures in benchmarks/fixtures with
+configurable latency, jitter and error injection per service. Report
+times in the fixtures are templates filled in relative to the current
+time, so caches and TAF timelines behave as they would against live data.
+
+Routes:
+    GET  /avwx/metar/{icao}, /avwx/taf/{icao}, /avwx/station/{icao}, /avwx/station?near=
+    GET  /pilotweb?...&retrieveLocId={icao}
+    POST /ddg
+    POST /openai/v1/chat/completions  (plain and stream=true)
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SERVICES = ("avwx", "pilotweb", "ddg", "openai")
+
+_PLACEHOLDER = re.compile(r"\{(obs|obs_pk|issued|valid|fm[+-]\d+|tempo[+-]\d+/[+-]\d+|n[+-]\d+)\}")
+
+
+def _load_json(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return json.load(f)
+
+
+def render_template(text: str, now: Optional[datetime] = None) -> str:
+    """
+    Fill report-time placeholders relative to now
+
+    {obs}: last routine METAR time (DDHHMM, :53), {obs_pk}: a peak-wind
+    time (HHMM) before it, {issued}: latest 6-hourly TAF issue (DDHHMM),
+    {valid}: its 30-hour validity (DDHH/DDHH), {fm+N}: FM group time N hours
+    into the validity (DDHHMM), {tempo+A/+B}: change window (DDHH/DDHH),
+    {n+N}: NOTAM time N hours from now (YYMMDDHHMM).
+    """
+    now = now or datetime.now(timezone.utc)
+    observed = now.replace(minute=53, second=0, microsecond=0)
+    if observed > now:
+        observed -= timedelta(hours=1)
+    issue_hour = now.hour // 6 * 6
+    valid_from = now.replace(hour=issue_hour, minute=0, second=0, microsecond=0)
+    issued = valid_from - timedelta(minutes=40)
+
+    def ddhh(moment: datetime) -> str:
+        # TAFs write the end of day as 24Z of the previous day
+        if moment.hour == 0 and moment > valid_from:
+            return f"{(moment - timedelta(days=1)).day:02d}24"
+        return f"{moment:%d%H}"
+
+    def replace(match) -> str:
+        key = match.group(1)
+        if key == "obs":
+            return f"{observed:%d%H%M}"
+        if key == "obs_pk":
+            return f"{observed - timedelta(minutes=21):%H%M}"
+        if key == "issued":
+            return f"{issued:%d%H%M}"
+        if key == "valid":
+            return f"{ddhh(valid_from)}/{ddhh(valid_from + timedelta(hours=30))}"
+        if key.startswith("fm"):
+            return f"{valid_from + timedelta(hours=int(key[2:])):%d%H%M}"
+        if key.startswith("tempo"):
+            start, end = (int(part) for part in key[5:].split("/"))
+            return f"{ddhh(valid_from + timedelta(hours=start))}/{ddhh(valid_from + timedelta(hours=end))}"
+        return f"{now + timedelta(hours=int(key[1:])):%y%m%d%H%M}"
+
+    return _PLACEHOLDER.sub(replace, text)
+
+
+class FakeServices:
+    """
+    Threaded fake upstream server
+
+    Args:
+        latency_ms: Base response latency per service (dict or one number)
+        jitter_ms: Uniform random jitter added to the latency
+        error_rate: Fraction of requests answered with 503, per service
+        token_ms: Delay between streamed OpenAI chunks
+        seed: Random seed for jitter and error injection
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms: float = 0.0, error_rate=0.0,
+                 token_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = self._per_service(latency_ms)
+        self.error_rate = self._per_service(error_rate)
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.counts = {service: {"requests": 0, "errors": 0} for service in SERVICES}
+        self.counts_lock = threading.Lock()
+
+        self.metars = _load_json("avwx_metar.json")
+        self.tafs = _load_json("avwx_taf.json")
+        self.script = _load_json("openai_script.json")
+        with open(os.path.join(FIXTURES_DIR, "ddg_results.html")) as f:
+            self.search_page = f.read()
+        self.notam_pages = {}
+        for name in os.listdir(FIXTURES_DIR):
+            match = re.fullmatch(r"pilotweb_([A-Z0-9]{4})\.html", name)
+            if match:
+                with open(os.path.join(FIXTURES_DIR, name)) as f:
+                    self.notam_pages[match.group(1)] = f.read()
+
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def _per_service(value) -> dict:
+        if isinstance(value, dict):
+            return {service: float(value.get(service, 0.0)) for service in SERVICES}
+        return dict.fromkeys(SERVICES, float(value))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """
+        Environment variables that point the app at this server
+        """
+        return {
+            "AVWX_API_KEY": "bench",
+            "AVWX_BASE_URL": f"{self.base_url}/avwx",
+            "PILOTWEB_URL": f"{self.base_url}/pilotweb",
+            "WEB_SEARCH_URL": f"{self.base_url}/ddg",
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"{self.base_url}/openai/v1",
+            "BULK_INGEST_ENABLED": "false",
+        }
+
+    def start(self) -> "FakeServices":
+        services = self
+
+        class Handler(_Handler):
+            fake = services
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeServices":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def delay(self, service: str):
+        with self.random_lock:
+            jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        total = self.latency_ms[service] + jitter
+        if total > 0:
+            time.sleep(total / 1000)
+
+    def inject_error(self, service: str) -> bool:
+        with self.random_lock:
+            failed = self.random.random() < self.error_rate[service]
+        with self.counts_lock:
+            self.counts[service]["requests"] += 1
+            if failed:
+                self.counts[service]["errors"] += 1
+        return failed
+
+    def chat_response(self, body: dict) -> dict:
+        """
+        Scripted assistant message for a chat completion request
+        """
+        messages = body.get("messages", [])
+        user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        scenario = next(
+            (s for s in self.script["scenarios"] if s["match"].lower() in user.lower()),
+            None,
+        )
+        answered = bool(messages) and messages[-1].get("role") == "tool"
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 1
+
+        if scenario and body.get("tools") and not answered:
+            tool_calls = [
+                {
+                    "id": f"call_{i}",
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+                }
+                for i, call in enumerate(scenario["tool_calls"])
+            ]
+            message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+            finish_reason = "tool_calls"
+            completion_tokens = sum(len(c["function"]["arguments"]) for c in tool_calls) // 4 + 1
+        else:
+            content = scenario["reply"] if scenario else self.script["default_reply"]
+            message = {"role": "assistant", "content": content}
+            finish_reason = "stop"
+            completion_tokens = len(content) // 4 + 1
+
+        return {
+            "message": message,
+            "finish_reason": finish_reason,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; otherwise Nagle plus delayed ACK
+    # adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+    fake: FakeServices = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- helpers ---------------------------------------------------------
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, payload):
+        self._send(status, json.dumps(payload).encode())
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _service(self, path: str) -> Optional[str]:
+        first = path.strip("/").split("/", 1)[0]
+        return first if first in SERVICES else None
+
+    def _guard(self, service: str) -> bool:
+        """
+        Apply latency and error injection; returns False if an error was sent
+        """
+        self.fake.delay(service)
+        if self.fake.inject_error(service):
+            self._send_json(503, {"error": "injected failure"})
+            return False
+        return True
+
+    # -- routes ----------------------------------------------------------
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self._service(url.path)
+        if service is None:
+            return self._send_json(404, {"error": "unknown route"})
+        if not self._guard(service):
+            return
+
+        parts = url.path.strip("/").split("/")
+        if service == "avwx":
+            return self._avwx(parts[1:], parse_qs(url.query))
+        if service == "pilotweb":
+            return self._pilotweb(parse_qs(url.query))
+        self._send_json(405, {"error": "method not allowed"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        service = self._service(url.path)
+        body = self._read_body()
+        if service is None:
+            return self._send_json(404, {"error": "unknown route"})
+        if not self._guard(service):
+            return
+
+        if service == "ddg":
+            return self._send(200, self.fake.search_page.encode(), "text/html; charset=utf-8")
+        if service == "openai" and url.path.endswith("/chat/completions"):
+            return self._chat(json.loads(body or b"{}"))
+        self._send_json(404, {"error": "unknown route"})
+
+    def _avwx(self, parts: list[str], query: dict):
+        now = datetime.now(timezone.utc)
+        if len(parts) == 2 and parts[0] in ("metar", "taf"):
+            icao = parts[1].upper()
+            table = self.fake.metars if parts[0] == "metar" else self.fake.tafs
+            if icao not in table:
+                return self._send_json(404, {"error": f"{icao} not found"})
+            raw = render_template(table[icao], now)
+            stamp = re.search(r"\b(\d{2})(\d{2})(\d{2})Z\b", raw)
+            report_time = now.replace(day=int(stamp.group(1)), hour=int(stamp.group(2)),
+                                      minute=int(stamp.group(3)), second=0, microsecond=0)
+            if report_time > now:
+                report_time -= timedelta(days=1)
+            return self._send_json(200, {
+                "raw": raw,
+                "station": icao,
+                "time": {"repr": stamp.group(0), "dt": report_time.isoformat()},
+            })
+        if parts == ["station"] and "near" in query:
+            return self._send_json(200, [])
+        return self._send_json(404, {"error": "station not found"})
+
+    def _pilotweb(self, query: dict):
+        icao = (query.get("retrieveLocId") or [""])[0].upper()
+        page = self.fake.notam_pages.get(icao)
+        if page is None:
+            page = "<html><body><PRE>NO NOTAMS FOUND</PRE></body></html>"
+        # Times move with the clock, so the ETag only changes hourly
+        body = render_template(page, datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)).encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers={"ETag": etag})
+        self._send(200, body, "text/html; charset=utf-8", {"ETag": etag})
+
+    def _chat(self, body: dict):
+        reply = self.fake.chat_response(body)
+        created = int(time.time())
+        model = body.get("model", "gpt-4o-mini")
+        if not body.get("stream"):
+            return self._send_json(200, {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": reply["message"], "finish_reason": reply["finish_reason"]}],
+                "usage": reply["usage"],
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def emit(delta: dict, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            if self.fake.token_ms:
+                time.sleep(self.fake.token_ms / 1000)
+
+        message = reply["message"]
+        emit({"role": "assistant", "content": ""})
+        for index, call in enumerate(message.get("tool_calls") or []):
+            emit({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                  "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            arguments = call["function"]["arguments"]
+            for start in range(0, len(arguments), 8):
+                emit({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + 8]}}]})
+        for token in re.findall(r"\S+\s*", message.get("content") or ""):
+            emit({"content": token})
+        emit({}, reply["finish_reason"])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [], "usage": reply["usage"]}
+            self._write_chunk(f"data: {json.dumps(usage)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the fake upstream services until interrupted")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with FakeServices(args.latency_ms, args.jitter_ms, args.error_rate) as fake:
+        print("Export these to point the app at the fake services:")
+        for name, value in fake.env().items():
+            print(f"export {name}={value}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
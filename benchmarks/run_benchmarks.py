@@ -0,0 +1,249 @@
+"""
+Offline benchmark suite for the Aviation Weather Agent
+
+Starts the fake upstream services, points the app at them through the
+environment and times the parsers, each fetcher (cold and cached), the
+route briefing and a full chat turn. Timings are reported as
+p50/p95/p99 and allocations as tracemalloc peak bytes per call. Results
+are written to JSON for comparison between commits with compare.py.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --latency-ms 40 --jitter-ms 20 --error-rate 0.05
+    python benchmarks/run_benchmarks.py --only parse. --iterations 500
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APP_DIR = os.path.join(REPO_DIR, "app")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+sys.path.insert(0, BENCH_DIR)
+from fake_services import FakeServices, render_template, FIXTURES_DIR  # noqa: E402
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Linear-interpolated percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(samples_ms: list[float]) -> dict:
+    ordered = sorted(samples_ms)
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "mean_ms": total / len(ordered),
+        "min_ms": ordered[0],
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": ordered[-1],
+        "ops_per_sec": len(ordered) / (total / 1000) if total else None,
+    }
+
+
+def run_benchmark(setup, func, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    """
+    Time func over iterations calls, calling setup (untimed) before each
+
+    Allocation is measured in a separate pass so tracemalloc overhead does
+    not distort the timings.
+    """
+    errors = 0
+    for _ in range(warmup):
+        setup()
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        setup()
+        start = time.perf_counter_ns()
+        result = func()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+        if isinstance(result, str) and result.startswith("❌"):
+            errors += 1
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            setup()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    summary = summarize(samples)
+    summary["errors"] = errors
+    if peaks:
+        peaks.sort()
+        summary["alloc_peak_kb_p50"] = percentile(peaks, 0.5) / 1024
+        summary["alloc_peak_kb_max"] = peaks[-1] / 1024
+    return summary
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_benchmarks(fake: FakeServices) -> list[tuple]:
+    """
+    (name, setup, func) triples; imports the app after the environment is set
+    """
+    sys.path.insert(0, APP_DIR)
+    from metar_interpreter import decode_metar
+    from taf_interpreter import parse_taf, build_timeline
+    from notam_parser import iter_pre_blocks, split_notams, parse_notam, NotamIndex
+    from report_cache import report_cache
+    from notam_store import notam_store
+    import web_search
+    from tool_registry import dispatch
+
+    metar = render_template(fake.metars["KSEA"])
+    taf = render_template(fake.tafs["KPDX"])
+    notam_page = render_template(fake.notam_pages["KORD"])
+    notam_chunks = [notam_page[i:i + 16384] for i in range(0, len(notam_page), 16384)]
+    with open(os.path.join(FIXTURES_DIR, "ddg_results.html")) as f:
+        search_page = f.read()
+
+    def parse_notams():
+        records = [parse_notam(raw) for block in iter_pre_blocks(notam_chunks) for raw in split_notams(block)]
+        return NotamIndex(r for r in records if r).query(["RWY"], 6, closures_only=True)
+
+    def nothing():
+        pass
+
+    def cold_reports():
+        report_cache.clear()
+
+    def cold_notams():
+        # Drop snapshots so every call downloads and parses the page
+        notam_store._snapshots.clear()
+
+    def cold_search():
+        web_search._search_cache.clear()
+
+    def cold_all():
+        cold_reports()
+        cold_notams()
+
+    benchmarks = [
+        ("parse.decode_metar", nothing, lambda: decode_metar(metar)),
+        ("parse.taf_timeline", nothing, lambda: build_timeline(parse_taf(taf))),
+        ("parse.notams_kord", nothing, parse_notams),
+        ("parse.search_results", nothing, lambda: web_search.extract_results(search_page)),
+        ("fetch.metar_cold", cold_reports, lambda: dispatch("fetch_metar", {"icao": "KSEA"})),
+        ("fetch.metar_cached", nothing, lambda: dispatch("fetch_metar", {"icao": "KSEA"})),
+        ("fetch.taf_cold", cold_reports, lambda: dispatch("get_taf", {"icao": "KPDX"})),
+        ("fetch.taf_nearby_fallback", cold_reports, lambda: dispatch("get_taf", {"icao": "KTIW"})),
+        ("fetch.notams_cold", cold_notams, lambda: dispatch("get_notams", {"icao": "KORD"})),
+        ("fetch.notams_conditional", nothing, lambda: notam_store.sync("KORD", force=True)),
+        ("fetch.search_cold", cold_search, lambda: dispatch("search_web", {"query": "14 CFR 91.155"})),
+        ("fetch.search_cached", nothing, lambda: dispatch("search_web", {"query": "14 CFR 91.155"})),
+        ("tool.route_briefing_cold", cold_all,
+         lambda: dispatch("route_briefing", {"departure": "KSEA", "destination": "KPDX"})),
+    ]
+
+    try:
+        import app as chat_app
+        from history import ConversationHistory
+    except ImportError as e:
+        print(f"⚠️ Skipping chat benchmarks: {e}")
+        return benchmarks
+
+    def chat_turn(question: str):
+        def turn():
+            history = ConversationHistory([{"role": "system", "content": "You are an aviation weather assistant."}])
+            return chat_app.run_turn(history, question)
+        return turn
+
+    benchmarks += [
+        ("chat.turn_metar_taf", cold_all, chat_turn("What's the weather at KSEA right now?")),
+        ("chat.turn_route", cold_all, chat_turn("Brief me for a flight from KSEA to KPDX")),
+        ("chat.turn_no_tools", nothing, chat_turn("Hello there")),
+    ]
+    return benchmarks
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--alloc-iterations", type=int, default=20, help="Calls measured under tracemalloc")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Upstream latency for every fake service")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream requests answered with 503")
+    parser.add_argument("--only", default="", help="Comma-separated name prefixes to run (e.g. parse.,fetch.metar)")
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<time>_<rev>.json)")
+    args = parser.parse_args(argv)
+
+    fake = FakeServices(args.latency_ms, args.jitter_ms, args.error_rate).start()
+    os.environ.update(fake.env())
+    # A persistent store would turn the cold benchmarks into disk hits
+    os.environ.setdefault("REPORT_STORE_ENABLED", "false")
+    try:
+        prefixes = [p for p in args.only.split(",") if p]
+        results = {}
+        for name, setup, func in build_benchmarks(fake):
+            if prefixes and not any(name.startswith(p) for p in prefixes):
+                continue
+            summary = run_benchmark(setup, func, args.iterations, args.warmup, args.alloc_iterations)
+            results[name] = summary
+            print(
+                f"{name:<28} p50 {summary['p50_ms']:9.3f} ms  p95 {summary['p95_ms']:9.3f} ms  "
+                f"p99 {summary['p99_ms']:9.3f} ms  peak {summary.get('alloc_peak_kb_p50', 0):8.1f} KiB"
+                + (f"  errors {summary['errors']}" if summary["errors"] else "")
+            )
+    finally:
+        fake.stop()
+
+    revision = git_revision()
+    stamp = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "revision": revision,
+            "timestamp": stamp.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "upstream_requests": fake.counts,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{stamp:%Y%m%dT%H%M%SZ}_{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Regression tests for session eviction in the HTTP API
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "app"))
+
+os.environ["REPORT_STORE_ENABLED"] = "false"
+
+from api_server import SessionStore  # noqa: E402
+
+
+class SessionEvictionTest(unittest.IsolatedAsyncioTestCase):
+    async def test_locked_session_does_not_block_eviction(self):
+        store = SessionStore(max_sessions=3, ttl=3600)
+        busy_id, busy = store.get()
+        await busy["lock"].acquire()
+        try:
+            for _ in range(10):
+                store.get()
+            self.assertEqual(len(store), 3)
+            # The session mid-turn survives; idle ones behind it were evicted
+            self.assertEqual(store.get(busy_id)[1], busy)
+        finally:
+            busy["lock"].release()
+
+    async def test_expired_sessions_are_dropped(self):
+        store = SessionStore(max_sessions=10, ttl=0)
+        first_id, _ = store.get()
+        second_id, _ = store.get()
+        self.assertEqual(list(store._sessions), [second_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Regression tests for circuit breaker probes in the async HTTP client
+
+Run with:
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+import requests
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "app"))
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from fake_services import FakeServices  # noqa: E402
+
+# config reads the upstream URLs at import, so the fakes start first
+_fake = FakeServices(latency_ms={"avwx": 1000}).start()
+os.environ.update(_fake.env())
+os.environ["REPORT_STORE_ENABLED"] = "false"
+
+import async_http  # noqa: E402
+import http_client  # noqa: E402
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError  # noqa: E402
+
+# Another test module may have imported config first, so use the fake's URL directly
+AVWX_BASE_URL = _fake.env()["AVWX_BASE_URL"]
+
+
+def tearDownModule():
+    _fake.stop()
+
+
+def _open(circuit: CircuitBreaker):
+    """
+    Put a circuit in the open state with its open period already over
+    """
+    with circuit._lock:
+        circuit.state = OPEN
+        circuit.failures = circuit.failure_threshold
+        circuit.opened_at = time.monotonic() - circuit.open_seconds - 1
+        circuit._probing = False
+
+
+class CancelledProbeTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await async_http.close()
+        circuit = http_client.breaker("metar")
+        with circuit._lock:
+            circuit.state, circuit.failures, circuit._probing = CLOSED, 0, False
+
+    async def test_cancelled_probe_releases_circuit(self):
+        circuit = http_client.breaker("metar")
+        _open(circuit)
+
+        task = asyncio.ensure_future(async_http.get(f"{AVWX_BASE_URL}/metar/KSEA", "metar",
+                                                    headers={"Authorization": "test"}))
+        await asyncio.sleep(0.3)
+        self.assertEqual(circuit.state, HALF_OPEN)
+        self.assertTrue(circuit._probing)
+
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        self.assertFalse(circuit._probing)
+        # The next call is admitted as the new probe instead of being suspended
+        self.assertTrue(circuit.before_request())
+        circuit.record(True)
+        self.assertEqual(circuit.state, CLOSED)
+
+    async def test_sync_client_recovers_after_cancelled_probe(self):
+        circuit = http_client.breaker("metar")
+        _open(circuit)
+
+        task = asyncio.ensure_future(async_http.get(f"{AVWX_BASE_URL}/metar/KSEA", "metar",
+                                                    headers={"Authorization": "test"}))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        response = await asyncio.to_thread(http_client.get, f"{AVWX_BASE_URL}/metar/KSEA", "metar",
+                                           headers={"Authorization": "test"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(circuit.state, CLOSED)
+
+    async def test_deadline_timeouts_do_not_open_circuit(self):
+        circuit = http_client.breaker("metar")
+        for _ in range(circuit.failure_threshold):
+            with async_http.deadline(0.05):
+                with self.assertRaises(requests.exceptions.Timeout):
+                    await async_http.get(f"{AVWX_BASE_URL}/metar/KSEA", "metar",
+                                         headers={"Authorization": "test"})
+        self.assertEqual(circuit.state, CLOSED)
+        self.assertEqual(circuit.failures, 0)
+
+    async def test_deadline_timeout_releases_probe(self):
+        circuit = http_client.breaker("metar")
+        _open(circuit)
+        with async_http.deadline(0.05):
+            with self.assertRaises(requests.exceptions.Timeout):
+                await async_http.get(f"{AVWX_BASE_URL}/metar/KSEA", "metar",
+                                     headers={"Authorization": "test"})
+        self.assertEqual(circuit.state, HALF_OPEN)
+        self.assertFalse(circuit._probing)
+
+
+class ProbeExpiryTest(unittest.TestCase):
+    def test_unrecorded_probe_expires(self):
+        circuit = CircuitBreaker("test", slow_call_seconds=1.0, probe_timeout=0.05,
+                                 failure_threshold=1, open_seconds=0.05)
+        circuit.before_request()
+        circuit.record(False)
+        time.sleep(0.06)
+        self.assertTrue(circuit.before_request())
+
+        # The probe never reports back; once it is older than the timeout the
+        # circuit re-opens and later admits a new probe
+        with self.assertRaises(CircuitOpenError):
+            circuit.before_request()
+        time.sleep(0.06)
+        with self.assertRaises(CircuitOpenError):
+            circuit.before_request()
+        self.assertEqual(circuit.state, OPEN)
+        time.sleep(0.06)
+        self.assertTrue(circuit.before_request())
+
+
+if __name__ == "__main__":
+    unittest.main()
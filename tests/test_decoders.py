@@ -0,0 +1,160 @@
+"""
+Decode tests for the METAR, TAF and NOTAM parsers against the benchmark fixtures
+
+Run with:
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "app"))
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from fake_services import FIXTURES_DIR, render_template  # noqa: E402
+from metar_interpreter import decode_metar, flight_category, interpret_metar  # noqa: E402
+from notam_parser import NotamIndex, iter_pre_blocks, parse_notam, split_notams  # noqa: E402
+from taf_interpreter import build_timeline, interpret_taf, parse_taf, worst_category  # noqa: E402
+
+NOW = datetime(2026, 10, 18, 14, 37, tzinfo=timezone.utc)
+
+
+def _fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return {icao: render_template(text, NOW) for icao, text in json.load(f).items()}
+
+
+METARS = _fixture("avwx_metar.json")
+TAFS = _fixture("avwx_taf.json")
+
+
+class MetarDecodeTest(unittest.TestCase):
+    def test_fixtures_decode_fully(self):
+        for icao, raw in METARS.items():
+            with self.subTest(icao=icao):
+                decoded = decode_metar(raw)
+                self.assertEqual(decoded["station"], icao)
+                self.assertEqual(decoded["time"]["repr"], "181353Z")
+                self.assertEqual(decoded["unparsed"], [])
+                self.assertEqual(decoded["flight_category"],
+                                 flight_category(decoded["ceiling_ft"], decoded["visibility_sm"]))
+
+    def test_ksea_fields(self):
+        decoded = decode_metar(METARS["KSEA"])
+        self.assertEqual(decoded["wind"]["direction"], 170)
+        self.assertEqual(decoded["wind"]["speed_kt"], 12)
+        self.assertEqual(decoded["wind"]["gust_kt"], 20)
+        self.assertEqual(decoded["visibility_sm"], 10.0)
+        self.assertEqual([w["code"] for w in decoded["weather"]], ["-RA"])
+        self.assertEqual(decoded["ceiling_ft"], 3500)
+        # Tenths from the T group in the remarks win over the body's 12/09
+        self.assertEqual(decoded["temperature_c"], 11.7)
+        self.assertEqual(decoded["dewpoint_c"], 9.4)
+        self.assertEqual(decoded["altimeter_inhg"], 29.98)
+        self.assertEqual(decoded["flight_category"], "VFR")
+
+    def test_categories(self):
+        expected = {"KSEA": "VFR", "KPAE": "MVFR", "KTIW": "MVFR", "KKLS": "IFR", "KSFO": "VFR"}
+        for icao, category in expected.items():
+            with self.subTest(icao=icao):
+                self.assertEqual(decode_metar(METARS[icao])["flight_category"], category)
+
+    def test_low_ifr(self):
+        decoded = decode_metar("KSEA 181453Z AUTO 00000KT 1/4SM FG VV002 M01/M01 A3001")
+        self.assertEqual(decoded["visibility_sm"], 0.25)
+        self.assertEqual(decoded["ceiling_ft"], 200)
+        self.assertEqual(decoded["temperature_c"], -1)
+        self.assertEqual(decoded["flight_category"], "LIFR")
+
+    def test_garbage_is_not_decoded(self):
+        self.assertTrue(interpret_metar("garbage").startswith("⚠️ Could not decode METAR"))
+        self.assertTrue(interpret_metar("KSEA garbage").startswith("⚠️ Could not decode METAR"))
+        self.assertTrue(interpret_metar(METARS["KSEA"]).startswith("📝 Decoded METAR for KSEA"))
+
+
+class TafTimelineTest(unittest.TestCase):
+    def test_fixtures_cover_validity_period(self):
+        for icao, raw in TAFS.items():
+            with self.subTest(icao=icao):
+                parsed = parse_taf(raw, NOW)
+                timeline = build_timeline(parsed)
+                self.assertEqual(parsed["station"], icao)
+                self.assertEqual(parsed["valid_from"], datetime(2026, 10, 18, 12, tzinfo=timezone.utc))
+                self.assertEqual(parsed["valid_to"], datetime(2026, 10, 19, 18, tzinfo=timezone.utc))
+                self.assertEqual(len(timeline), 30)
+                self.assertEqual(timeline[0]["time"], parsed["valid_from"])
+                self.assertEqual(timeline[-1]["time"], parsed["valid_to"] - timedelta(hours=1))
+                self.assertTrue(all(not g["unparsed"] for g in parsed["groups"]))
+
+    def test_ksea_groups(self):
+        parsed = parse_taf(TAFS["KSEA"], NOW)
+        self.assertEqual([g["type"] for g in parsed["groups"]], ["BASE", "TEMPO", "FM", "FM"])
+        timeline = build_timeline(parsed)
+        by_hour = {entry["time"]: entry for entry in timeline}
+        start = parsed["valid_from"]
+
+        # TEMPO 4SM BKN015 for the 2nd to 6th hour, over a VFR base
+        during = by_hour[start + timedelta(hours=3)]
+        self.assertEqual(during["flight_category"], "VFR")
+        self.assertEqual([o["type"] for o in during["temporary"]], ["TEMPO"])
+        self.assertEqual(during["worst_category"], "MVFR")
+        self.assertEqual(by_hour[start + timedelta(hours=7)]["temporary"], [])
+
+        # First FM group takes over 8 hours in
+        self.assertEqual(by_hour[start + timedelta(hours=8)]["wind"]["direction"], 190)
+        self.assertEqual(worst_category(timeline, 14, 16), "MVFR")
+
+    def test_prob_and_becmg(self):
+        olm = build_timeline(parse_taf(TAFS["KOLM"], NOW))
+        self.assertTrue(any(o["type"] == "PROB" and o["probability"] == 30
+                            for entry in olm for o in entry["temporary"]))
+        pdx = parse_taf(TAFS["KPDX"], NOW)
+        self.assertIn("BECMG", [g["type"] for g in pdx["groups"]])
+
+    def test_garbage_is_not_decoded(self):
+        self.assertTrue(interpret_taf("garbage").startswith("⚠️ Could not decode TAF"))
+        self.assertTrue(interpret_taf("TAF KSEA 181130Z 1812/1912").startswith("⚠️ Could not decode TAF"))
+
+
+class NotamParseTest(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(FIXTURES_DIR, "pilotweb_KORD.html")) as f:
+            page = render_template(f.read(), NOW)
+        self.raws = [raw for block in iter_pre_blocks([page]) for raw in split_notams(block)]
+        self.records = [parse_notam(raw) for raw in self.raws]
+
+    def test_every_notam_parses(self):
+        self.assertEqual(len(self.raws), 160)
+        self.assertNotIn(None, self.records)
+        first = self.records[0]
+        self.assertEqual(first["id"], "ORD 10/100")
+        self.assertEqual(first["keyword"], "NAV")
+        self.assertEqual(first["effective"], datetime(2026, 10, 18, 15, 37, tzinfo=timezone.utc))
+        self.assertEqual(first["expiry"], datetime(2026, 10, 18, 17, 37, tzinfo=timezone.utc))
+
+    def test_estimated_expiry(self):
+        record = next(r for r in self.records if r["id"] == "ORD 10/101")
+        self.assertTrue(record["estimated"])
+        self.assertEqual(record["keyword"], "AIRSPACE")
+
+    def test_index_query(self):
+        index = NotamIndex(self.records)
+        self.assertEqual(len(index), 160)
+        self.assertEqual(index.keywords()["RWY"], 33)
+        runway = index.query(["rwy"], hours=24, now=NOW)
+        self.assertTrue(runway)
+        self.assertTrue(all(r["keyword"] == "RWY" for r in runway))
+        end = NOW + timedelta(hours=24)
+        for record in runway:
+            self.assertTrue(record["effective"] is None or record["effective"] <= end)
+            self.assertTrue(record["expiry"] is None or record["expiry"] >= NOW)
+        closures = index.query(hours=24, closures_only=True, now=NOW)
+        self.assertTrue(all(r["closure"] for r in closures))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Regression tests for NOTAM cancellations in the NOTAM snapshot store
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "app"))
+
+os.environ["REPORT_STORE_ENABLED"] = "false"
+
+from notam_store import NotamStore  # noqa: E402
+
+CLOSURE = """A1200/26 NOTAMN
+Q) KZAU/QMRLC/IV/NBO/A/000/999/
+A) KORD B) 2610180000 C) 2610250000
+E) RWY 10L/28R CLSD"""
+
+TAXIWAY = """A1201/26 NOTAMN
+Q) KZAU/QMXLC/IV/M/A/000/999/
+A) KORD B) 2610180000 C) 2610250000
+E) TWY B CLSD"""
+
+CANCEL_CLOSURE = """A1234/26 NOTAMC A1200/26
+Q) KZAU/QMRXX/IV/NBO/A/000/999/
+A) KORD B) 2610181500
+E) REF NOTAM CANCELLED"""
+
+
+def _page(*notams: str) -> list[str]:
+    return ["\n\n".join(notams)]
+
+
+class NotamCancellationTest(unittest.TestCase):
+    def setUp(self):
+        self.store = NotamStore()
+
+    def test_cancellation_in_first_snapshot(self):
+        snapshot = self.store._finish("KORD", None, _page(CLOSURE, TAXIWAY, CANCEL_CLOSURE), None, None, 100.0)
+        self.assertEqual(list(snapshot["records"]), ["A1201/26"])
+        self.assertEqual(set(snapshot["first_seen"]), {"A1201/26"})
+        self.assertEqual(self.store.changes_since("KORD", 0), {"new": [], "changed": [], "cancelled": []})
+
+    def test_cancellation_in_later_snapshot(self):
+        first = self.store._finish("KORD", None, _page(CLOSURE, TAXIWAY), None, None, 100.0)
+        self.assertIn("A1200/26", first["records"])
+
+        # Pages keep listing a cancelled NOTAM alongside its NOTAMC for a while
+        changed_closure = CLOSURE.replace("CLSD", "CLSD EXC TAX")
+        second = self.store._finish("KORD", first, _page(changed_closure, TAXIWAY, CANCEL_CLOSURE),
+                                    None, None, 200.0)
+        self.assertEqual(list(second["records"]), ["A1201/26"])
+        self.assertNotIn("A1200/26", second["first_seen"])
+        self.assertNotIn("A1200/26", second["changed_at"])
+
+        changes = self.store.changes_since("KORD", 150.0)
+        self.assertEqual(changes["new"], [])
+        self.assertEqual(changes["changed"], [])
+        self.assertEqual([r["id"] for r in changes["cancelled"]], ["A1200/26"])
+
+    def test_changes_since_ignores_stale_keys(self):
+        snapshot = self.store._finish("KORD", None, _page(CLOSURE, TAXIWAY), None, None, 100.0)
+        # Snapshots written before cancelled keys were pruned can still carry them
+        del snapshot["records"]["A1200/26"]
+        snapshot["first_seen"]["A1200/26"] = 120.0
+        snapshot["changed_at"]["A1200/26"] = 120.0
+        self.assertEqual(self.store.changes_since("KORD", 110.0), {"new": [], "changed": [], "cancelled": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
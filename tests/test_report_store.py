@@ -0,0 +1,44 @@
+"""
+Regression tests for the report store's background writer
+
+Run with:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "app"))
+
+os.environ["REPORT_STORE_ENABLED"] = "false"
+
+from report_store import ReportStore  # noqa: E402
+
+
+class WriterFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "reports.db")
+        self.store = ReportStore(path=self.path, enabled=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_flush_returns_when_writer_cannot_connect(self):
+        self.store.path = os.path.join(self.tmp.name, "missing", "reports.db")
+        self.store.put("metar", "KSEA", "KSEA 181353Z 17012G20KT 10SM", None, 0)
+        self.assertTrue(self.store.flush(timeout=5))
+        self.assertEqual(self.store.stats["written"], 0)
+
+        # The writer survives and writes once the database is reachable again
+        self.store.path = self.path
+        self.store.put("metar", "KSEA", "KSEA 181453Z 17012G20KT 10SM", None, 0)
+        self.assertTrue(self.store.flush(timeout=5))
+        self.assertEqual(self.store.stats["written"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()